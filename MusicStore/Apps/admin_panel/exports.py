@@ -0,0 +1,174 @@
+"""
+Потоковая выгрузка товаров и заказов (CSV / NDJSON) для партнеров и бухгалтерии.
+
+Строки читаются серверным курсором (QuerySet.iterator(chunk_size=...)) и
+сразу отдаются клиенту через StreamingHttpResponse: память не зависит от
+размера таблицы, а заголовок CSV уходит клиенту еще до выполнения запроса.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from Apps.catalog.models import Products
+from Apps.orders.models import Orders
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+PRODUCT_FIELDS = (
+    ('id', 'products_id'),
+    ('sku', 'products_sku'),
+    ('name', 'products_name'),
+    ('brand', 'products_brand__brands_name'),
+    ('category', 'products_category__categories_name'),
+    ('price', 'products_price'),
+    ('stock', 'products_stock'),
+    ('main_image', 'card__product_cards_image_url'),
+    ('created_at', 'products_created_at'),
+    ('updated_at', 'products_updated_at'),
+)
+
+ORDER_FIELDS = (
+    ('order_id', 'orders_id'),
+    ('date', 'orders_date'),
+    ('status', 'orders_status__order_statuses_name'),
+    ('customer_email', 'orders_user__users_email'),
+    ('total_amount', 'orders_total_amount'),
+    ('payment_method', 'orders_payment_method__payment_methods_name'),
+    ('delivery_method', 'orders_delivery_method__delivery_methods_name'),
+)
+
+ORDER_ITEM_FIELDS = (
+    ('product_id', 'orderitems__order_items_product_id'),
+    ('product_name', 'orderitems__order_items_product__products_name'),
+    ('quantity', 'orderitems__order_items_quantity'),
+    ('price', 'orderitems__order_items_price_at_purchase'),
+)
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def _date_param(request, name):
+    raw = request.GET.get(name, '').strip()
+    if not raw:
+        return None
+    value = parse_date(raw)
+    if value is None:
+        raise ExportFilterError(f'Некорректная дата {name}: ожидается ГГГГ-ММ-ДД')
+    return value
+
+
+def date_range_filter(request, field):
+    """
+    Условия фильтра по ?date_from / ?date_to (включительно) для поля даты-времени.
+    Границы переводятся во время без функций над колонкой — работает индекс.
+    """
+    conditions = {}
+    date_from = _date_param(request, 'date_from')
+    date_to = _date_param(request, 'date_to')
+    if date_from:
+        conditions[f'{field}__gte'] = timezone.make_aware(datetime.combine(date_from, time.min))
+    if date_to:
+        conditions[f'{field}__lt'] = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return conditions
+
+
+class _Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_rows(header, rows):
+    writer = csv.writer(_Echo())
+    # BOM — чтобы Excel открыл UTF-8 с кириллицей
+    yield '﻿' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def _ndjson_rows(objects):
+    for obj in objects:
+        yield json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _streaming_response(chunks, export_format, filename):
+    content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{export_format}"'
+    # Не даем прокси (nginx) буферизовать ответ целиком
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_products(request, export_format):
+    """Товары с брендом, категорией, главным изображением и остатком."""
+    products = Products.objects.filter(**date_range_filter(request, 'products_updated_at'))
+    # Те же фильтры, что и в списке товаров админ-панели
+    for param, field in (('category', 'products_category_id'), ('brand', 'products_brand_id')):
+        value = request.GET.get(param, '')
+        if value:
+            if not value.isdigit():
+                raise ExportFilterError(f'Некорректный параметр {param}')
+            products = products.filter(**{field: value})
+    products = (products
+                .order_by('products_id')
+                .values_list(*(path for _, path in PRODUCT_FIELDS)))
+    header = [name for name, _ in PRODUCT_FIELDS]
+    rows = products.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if export_format == 'csv':
+        chunks = _csv_rows(header, rows)
+    else:
+        chunks = _ndjson_rows(dict(zip(header, row)) for row in rows)
+    return _streaming_response(chunks, export_format, 'products')
+
+
+def _order_rows(request):
+    orders = Orders.objects.filter(**date_range_filter(request, 'orders_date'))
+    statuses = [s for s in request.GET.getlist('status') if s]
+    if statuses:
+        if not all(s.isdigit() for s in statuses):
+            raise ExportFilterError('Некорректный статус заказа')
+        orders = orders.filter(orders_status_id__in=statuses)
+    # Заказ и его позиции одним запросом (LEFT JOIN), строки заказа идут подряд
+    return (orders
+            .order_by('orders_id', 'orderitems__order_items_id')
+            .values_list(*(path for _, path in ORDER_FIELDS + ORDER_ITEM_FIELDS))
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+
+
+def _group_orders(rows):
+    """Собирает подряд идущие строки позиций в заказ с вложенным списком items."""
+    order_size = len(ORDER_FIELDS)
+    item_names = [name for name, _ in ORDER_ITEM_FIELDS]
+    current = None
+    for row in rows:
+        if current is None or current['order_id'] != row[0]:
+            if current is not None:
+                yield current
+            current = dict(zip((name for name, _ in ORDER_FIELDS), row[:order_size]))
+            current['items'] = []
+        if row[order_size] is not None:
+            current['items'].append(dict(zip(item_names, row[order_size:])))
+    if current is not None:
+        yield current
+
+
+def export_orders(request, export_format):
+    """Заказы с позициями: в CSV — строка на позицию, в NDJSON — объект на заказ."""
+    rows = _order_rows(request)
+    if export_format == 'csv':
+        header = [name for name, _ in ORDER_FIELDS] + [f'item_{name}' for name, _ in ORDER_ITEM_FIELDS]
+        chunks = _csv_rows(header, rows)
+    else:
+        chunks = _ndjson_rows(_group_orders(rows))
+    return _streaming_response(chunks, export_format, 'orders')
@@ -7,6 +7,7 @@ urlpatterns = [
     
     # Товары
     path('products/', views.admin_products, name='admin_products'),
+    path('products/export/', views.admin_export_products, name='admin_export_products'),
     path('products/create/', views.admin_product_create, name='admin_product_create'),
     path('products/<int:product_id>/', views.admin_product_edit, name='admin_product_edit'),
     path('products/<int:product_id>/delete/', views.admin_product_delete, name='admin_product_delete'),
@@ -29,6 +30,7 @@ urlpatterns = [
     
     # Заказы
     path('orders/', views.admin_orders, name='admin_orders'),
+    path('orders/export/', views.admin_export_orders, name='admin_export_orders'),
     path('orders/<int:order_id>/', views.admin_order_detail, name='admin_order_detail'),
     path('orders/<int:order_id>/delete/', views.admin_order_delete, name='admin_order_delete'),
     
@@ -3,19 +3,24 @@ from django.contrib import messages
 from django.db import connection, transaction
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.db.models import Sum, Count, Avg, Q
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
 from .decorators import admin_required
+from .exports import EXPORT_FORMATS, ExportFilterError, export_products, export_orders
 from .forms import ProductForm, CategoryForm, BrandForm, OrderForm, ProductImageForm, ProductCharacteristicForm
 from Apps.catalog.models import Products, Categories, Brands, Productimages, Productcharacteristics
+from Apps.catalog.search import search_products
+from Apps.catalog.storage import save_upload
+from Apps.catalog.signals import categories_changed, brands_changed, products_changed, stock_changed
 from Apps.orders.models import Orders, Orderitems, Orderstatuses, Orderhistory
 from Apps.users.models import Users
 from Apps.payments.models import Paymentmethods, Deliverymethods
 from Apps.cart.models import Carts, Cartitems
 from Apps.extras.models import Reviews
+from Apps.extras.ratings import set_review_approved, delete_review
 
 
 @admin_required
@@ -54,8 +59,9 @@ def admin_products(request):
     
     # Поиск
     search_query = request.GET.get('search', '')
-    if search_query:
-        products = products.filter(products_name__icontains=search_query)
+    if search_query.strip():
+        # Полнотекстовый поиск; при нем сначала наиболее релевантные товары
+        products = search_products(products, search_query).order_by('-search_rank', '-products_id')
     
     # Фильтр по категории
     category_filter = request.GET.get('category', '')
@@ -86,6 +92,18 @@ def admin_products(request):
     return render(request, 'admin_panel/products/list.html', context)
 
 
+@admin_required
+def admin_export_products(request):
+    """Потоковая выгрузка товаров (?format=csv|ndjson, date_from/date_to, category, brand)"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    try:
+        return export_products(request, export_format)
+    except ExportFilterError as e:
+        return HttpResponseBadRequest(str(e))
+
+
 @admin_required
 def admin_product_create(request):
     """Создание товара"""
@@ -112,6 +130,7 @@ def admin_product_create(request):
                     ]
                 )
                 product_id = cursor.fetchone()[0]
+            products_changed.send(sender=Products, product_ids=[product_id])
             messages.success(request, f'Товар "{product.products_name}" успешно создан!')
             return redirect('admin_product_edit', product_id=product_id)
     else:
@@ -147,6 +166,7 @@ def admin_product_edit(request, product_id):
                         product_id,
                     ]
                 )
+            products_changed.send(sender=Products, product_ids=[product_id])
             messages.success(request, f'Товар "{product.products_name}" успешно обновлен!')
             return redirect('admin_product_edit', product_id=product_id)
     else:
@@ -178,6 +198,7 @@ def admin_product_delete(request, product_id):
         # Используем raw SQL для удаления товара
         with connection.cursor() as cursor:
             cursor.execute("DELETE FROM products WHERE products_id = %s", [product_id])
+        products_changed.send(sender=Products, product_ids=[product_id])
         messages.success(request, f'Товар "{product_name}" успешно удален!')
         return redirect('admin_products')
     
@@ -196,21 +217,8 @@ def admin_product_add_image(request, product_id):
             uploaded = form.cleaned_data.get('image_file')
             image_url = ''
             if uploaded:
-                from django.core.files.storage import default_storage
-                from django.utils.text import get_valid_filename
-                import os
-                filename = get_valid_filename(uploaded.name)
-                subdir = os.path.join('product_images', str(product_id))
-                path = default_storage.save(os.path.join(subdir, filename), uploaded)
-                # Получаем URL к файлу
-                try:
-                    from django.core.files.storage import FileSystemStorage
-                    # Для FileSystemStorage storage.url даст MEDIA_URL + path
-                    image_url = default_storage.url(path)
-                except Exception:
-                    # Фоллбек на относительный путь
-                    from django.conf import settings
-                    image_url = f"{settings.MEDIA_URL}{path}"
+                # Имя файла — хеш содержимого: одинаковые фото хранятся один раз
+                image_url = save_upload(uploaded)
 
             # Если это главное изображение, снимаем флаг с других
             if form.cleaned_data['product_images_is_main']:
@@ -231,6 +239,8 @@ def admin_product_add_image(request, product_id):
                         form.cleaned_data['product_images_is_main'] or False,
                     ]
                 )
+                image_id = cursor.fetchone()[0]
+            products_changed.send(sender=Productimages, product_ids=[product_id])
             messages.success(request, 'Изображение успешно добавлено!')
             return redirect('admin_product_edit', product_id=product_id)
     else:
@@ -259,6 +269,7 @@ def admin_product_add_characteristic(request, product_id):
                         form.cleaned_data['product_characteristics_value'],
                     ]
                 )
+            products_changed.send(sender=Productcharacteristics, product_ids=[product_id])
             messages.success(request, 'Характеристика успешно добавлена!')
             return redirect('admin_product_edit', product_id=product_id)
     else:
@@ -297,6 +308,7 @@ def admin_category_create(request):
                     ]
                 )
                 category_id = cursor.fetchone()[0]
+            categories_changed.send(sender=Categories, category_ids=[category_id])
             messages.success(request, f'Категория "{cleaned_data["categories_name"]}" успешно создана!')
             return redirect('admin_categories')
     else:
@@ -325,6 +337,7 @@ def admin_category_edit(request, category_id):
                         category_id,
                     ]
                 )
+            categories_changed.send(sender=Categories, category_ids=[category_id])
             messages.success(request, f'Категория "{category.categories_name}" успешно обновлена!')
             return redirect('admin_categories')
     else:
@@ -342,6 +355,7 @@ def admin_category_delete(request, category_id):
         category_name = category.categories_name
         with connection.cursor() as cursor:
             cursor.execute("DELETE FROM categories WHERE categories_id = %s", [category_id])
+        categories_changed.send(sender=Categories, category_ids=[category_id])
         messages.success(request, f'Категория "{category_name}" успешно удалена!')
         return redirect('admin_categories')
     
@@ -368,17 +382,7 @@ def admin_brand_create(request):
             logo_url = ''
             uploaded = cleaned_data.get('image_file')
             if uploaded:
-                from django.core.files.storage import default_storage
-                from django.utils.text import get_valid_filename
-                import os
-                filename = get_valid_filename(uploaded.name)
-                subdir = os.path.join('brand_logos')
-                path = default_storage.save(os.path.join(subdir, filename), uploaded)
-                try:
-                    logo_url = default_storage.url(path)
-                except Exception:
-                    from django.conf import settings
-                    logo_url = f"{settings.MEDIA_URL}{path}"
+                logo_url = save_upload(uploaded)
             with connection.cursor() as cursor:
                 cursor.execute(
                     """INSERT INTO brands (brands_name, brands_description, brands_logo_url)
@@ -391,6 +395,7 @@ def admin_brand_create(request):
                     ]
                 )
                 brand_id = cursor.fetchone()[0]
+            brands_changed.send(sender=Brands, brand_ids=[brand_id])
             messages.success(request, f'Бренд "{cleaned_data["brands_name"]}" успешно создан!')
             return redirect('admin_brands')
     else:
@@ -411,17 +416,7 @@ def admin_brand_edit(request, brand_id):
             logo_url = brand.brands_logo_url or ''
             uploaded = cleaned_data.get('image_file')
             if uploaded:
-                from django.core.files.storage import default_storage
-                from django.utils.text import get_valid_filename
-                import os
-                filename = get_valid_filename(uploaded.name)
-                subdir = os.path.join('brand_logos', str(brand_id))
-                path = default_storage.save(os.path.join(subdir, filename), uploaded)
-                try:
-                    logo_url = default_storage.url(path)
-                except Exception:
-                    from django.conf import settings
-                    logo_url = f"{settings.MEDIA_URL}{path}"
+                logo_url = save_upload(uploaded)
             with connection.cursor() as cursor:
                 cursor.execute(
                     """UPDATE brands 
@@ -434,6 +429,7 @@ def admin_brand_edit(request, brand_id):
                         brand_id,
                     ]
                 )
+            brands_changed.send(sender=Brands, brand_ids=[brand_id])
             messages.success(request, f'Бренд "{brand.brands_name}" успешно обновлен!')
             return redirect('admin_brands')
     else:
@@ -451,6 +447,7 @@ def admin_brand_delete(request, brand_id):
         brand_name = brand.brands_name
         with connection.cursor() as cursor:
             cursor.execute("DELETE FROM brands WHERE brands_id = %s", [brand_id])
+        brands_changed.send(sender=Brands, brand_ids=[brand_id])
         messages.success(request, f'Бренд "{brand_name}" успешно удален!')
         return redirect('admin_brands')
     
@@ -496,6 +493,18 @@ def admin_orders(request):
     return render(request, 'admin_panel/orders/list.html', context)
 
 
+@admin_required
+def admin_export_orders(request):
+    """Потоковая выгрузка заказов с позициями (?format=csv|ndjson, date_from/date_to, status)"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    try:
+        return export_orders(request, export_format)
+    except ExportFilterError as e:
+        return HttpResponseBadRequest(str(e))
+
+
 @admin_required
 def admin_order_detail(request, order_id):
     """Детали заказа"""
@@ -603,6 +612,12 @@ def admin_order_detail(request, order_id):
                                     failed_count += 1
                                     failed_products.append(f"{product_name} (ошибка: {str(e)})")
                         
+                        # Каталогу — после фиксации отмены, когда остатки уже видны
+                        returned_ids = [row[0] for row in order_items_data]
+                        transaction.on_commit(
+                            lambda: stock_changed.send(sender=Orders, product_ids=returned_ids)
+                        )
+                        
                         if returned_count > 0:
                             msg = f'Заказ #{order_id} отменен. {returned_count} товар(ов) возвращено на склад!'
                             if returned_products:
@@ -716,11 +731,7 @@ def admin_review_approve(request, review_id):
     review = get_object_or_404(Reviews, pk=review_id)
     
     if request.method == 'POST':
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "UPDATE reviews SET reviews_approved = TRUE WHERE reviews_id = %s",
-                [review_id]
-            )
+        set_review_approved(review_id, True)
         messages.success(request, f'Отзыв #{review_id} одобрен и опубликован.')
         return redirect('admin_reviews')
     
@@ -736,11 +747,7 @@ def admin_review_reject(request, review_id):
     review = get_object_or_404(Reviews, pk=review_id)
     
     if request.method == 'POST':
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "UPDATE reviews SET reviews_approved = FALSE WHERE reviews_id = %s",
-                [review_id]
-            )
+        set_review_approved(review_id, False)
         messages.success(request, f'Отзыв #{review_id} отклонен.')
         return redirect('admin_reviews')
     
@@ -756,11 +763,7 @@ def admin_review_delete(request, review_id):
     review = get_object_or_404(Reviews, pk=review_id)
     
     if request.method == 'POST':
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "DELETE FROM reviews WHERE reviews_id = %s",
-                [review_id]
-            )
+        delete_review(review_id)
         messages.success(request, f'Отзыв #{review_id} удален.')
         return redirect('admin_reviews')
     
@@ -1710,6 +1713,7 @@ def admin_product_delete_image(request, product_id, image_id):
     if request.method == 'POST':
         with connection.cursor() as cursor:
             cursor.execute("DELETE FROM productimages WHERE product_images_id = %s", [image_id])
+        products_changed.send(sender=Productimages, product_ids=[product_id])
         messages.success(request, 'Изображение успешно удалено!')
         return redirect('admin_product_edit', product_id=product_id)
     
@@ -1725,6 +1729,7 @@ def admin_product_delete_characteristic(request, product_id, characteristic_id):
     if request.method == 'POST':
         with connection.cursor() as cursor:
             cursor.execute("DELETE FROM productcharacteristics WHERE product_characteristics_id = %s", [characteristic_id])
+        products_changed.send(sender=Productcharacteristics, product_ids=[product_id])
         messages.success(request, 'Характеристика успешно удалена!')
         return redirect('admin_product_edit', product_id=product_id)
     
@@ -0,0 +1,49 @@
+from rest_framework import serializers, views, status, permissions
+from rest_framework.response import Response
+
+from Apps.users.models import Users
+from Apps.users.store_user import require_store_user_id
+from .operations import add_items
+
+CART_ADD_ITEMS_LIMIT = 100
+
+
+class CartAddItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartAddItemsSerializer(serializers.Serializer):
+    items = CartAddItemSerializer(many=True, allow_empty=False, max_length=CART_ADD_ITEMS_LIMIT)
+
+
+class CartAddItemsAPIView(views.APIView):
+    """
+    Добавление нескольких товаров в корзину одним запросом к БД.
+    POST {"items": [{"product_id": 1, "quantity": 2}, ...]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CartAddItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            user_id = require_store_user_id(request)
+        except Users.DoesNotExist:
+            return Response({'detail': 'Профиль пользователя не найден.'}, status=status.HTTP_404_NOT_FOUND)
+
+        results = add_items(
+            user_id, [(item['product_id'], item['quantity']) for item in serializer.validated_data['items']]
+        )
+        items = [
+            {
+                'product_id': r.product_id,
+                'requested': r.requested,
+                'status': 'added' if r.added else ('insufficient_stock' if r.found else 'not_found'),
+                'quantity': r.quantity,
+                'stock': r.stock,
+            }
+            for r in results
+        ]
+        # Часть товаров может не добавиться — статус каждой позиции в ответе
+        return Response({'items': items}, status=status.HTTP_200_OK)
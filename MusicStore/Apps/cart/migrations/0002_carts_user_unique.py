@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+# Лишние корзины пользователя (остались от гонки при создании) сливаются в
+# самую раннюю: количества одинаковых товаров складываются.
+CREATE_SQL = """
+CREATE TEMP TABLE cart_duplicates ON COMMIT DROP AS
+SELECT carts_id, keep_id
+FROM (
+    SELECT carts_id, min(carts_id) OVER (PARTITION BY carts_user_id) AS keep_id
+    FROM carts
+) c
+WHERE carts_id <> keep_id;
+
+INSERT INTO cartitems (cart_items_cart_id, cart_items_product_id, cart_items_quantity, cart_items_added_at)
+SELECT d.keep_id, ci.cart_items_product_id, sum(ci.cart_items_quantity), min(ci.cart_items_added_at)
+FROM cartitems ci
+JOIN cart_duplicates d ON d.carts_id = ci.cart_items_cart_id
+GROUP BY d.keep_id, ci.cart_items_product_id
+ON CONFLICT (cart_items_cart_id, cart_items_product_id) DO UPDATE
+    SET cart_items_quantity = cartitems.cart_items_quantity + EXCLUDED.cart_items_quantity;
+
+DELETE FROM cartitems WHERE cart_items_cart_id IN (SELECT carts_id FROM cart_duplicates);
+DELETE FROM carts WHERE carts_id IN (SELECT carts_id FROM cart_duplicates);
+
+-- Отложенные проверки внешних ключей после удаления не дают создать индекс
+SET CONSTRAINTS ALL IMMEDIATE;
+CREATE UNIQUE INDEX IF NOT EXISTS carts_user_key ON carts (carts_user_id);
+"""
+
+REVERSE_SQL = "DROP INDEX IF EXISTS carts_user_key;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='carts',
+            constraint=models.UniqueConstraint(fields=('carts_user',), name='carts_user_key'),
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
@@ -17,6 +17,10 @@ class Carts(models.Model):
     class Meta:
         managed = False
         db_table = 'carts'
+        # Одна корзина на пользователя (upsert в Apps.cart.operations)
+        constraints = [
+            models.UniqueConstraint(fields=['carts_user'], name='carts_user_key'),
+        ]
 # This is an auto-generated Django model module.
 # You'll have to do the following manually to clean this up:
 #   * Rearrange models' order
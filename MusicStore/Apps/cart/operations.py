@@ -0,0 +1,109 @@
+"""
+Добавление товаров в корзину одним запросом.
+
+Раньше добавление занимало до шести запросов (профиль, товар, корзина,
+создание корзины, позиция, UPDATE/INSERT) и было подвержено гонкам: два
+одновременных клика натыкались на уникальность (корзина, товар) или
+превышали остаток. Теперь корзина создается upsert'ом по уникальному
+carts(carts_user_id), а позиции — INSERT ... ON CONFLICT DO UPDATE с
+условием на остаток. Конфликтующая строка позиции блокируется и условие
+перепроверяется на ее актуальной версии, поэтому одновременные добавления
+не теряются и не превышают products_stock.
+"""
+from typing import Iterable, NamedTuple
+
+from django.db import connection
+from django.utils import timezone
+
+_ADD_ITEMS_SQL = """
+WITH cart AS (
+    INSERT INTO carts (carts_user_id, carts_created_at)
+    VALUES (%s, %s)
+    ON CONFLICT (carts_user_id) DO UPDATE SET carts_user_id = EXCLUDED.carts_user_id
+    RETURNING carts_id
+), requested AS (
+    SELECT product_id, sum(quantity)::int AS quantity
+    FROM unnest(%s::int[], %s::int[]) AS r(product_id, quantity)
+    GROUP BY product_id
+), upserted AS (
+    INSERT INTO cartitems (cart_items_cart_id, cart_items_product_id, cart_items_quantity, cart_items_added_at)
+    SELECT cart.carts_id, p.products_id, requested.quantity, %s
+    FROM cart
+    CROSS JOIN requested
+    JOIN products p ON p.products_id = requested.product_id
+    WHERE requested.quantity <= p.products_stock
+    -- Одинаковый порядок строк во всех запросах — без взаимных блокировок
+    ORDER BY p.products_id
+    ON CONFLICT (cart_items_cart_id, cart_items_product_id) DO UPDATE
+        SET cart_items_quantity = cartitems.cart_items_quantity + EXCLUDED.cart_items_quantity
+        WHERE cartitems.cart_items_quantity + EXCLUDED.cart_items_quantity <= (
+            SELECT products_stock FROM products WHERE products_id = EXCLUDED.cart_items_product_id
+        )
+    RETURNING cart_items_product_id, cart_items_quantity, xmax = 0 AS created
+)
+SELECT requested.product_id, requested.quantity, p.products_name, p.products_stock,
+       upserted.cart_items_quantity, coalesce(upserted.created, FALSE)
+FROM requested
+LEFT JOIN products p ON p.products_id = requested.product_id
+LEFT JOIN upserted ON upserted.cart_items_product_id = requested.product_id
+ORDER BY requested.product_id
+"""
+
+
+class CartAddResult(NamedTuple):
+    product_id: int
+    requested: int
+    product_name: str | None    # None — товара нет
+    stock: int | None
+    quantity: int | None        # количество в корзине после добавления; None — не добавлен
+    created: bool               # позиция появилась в корзине впервые
+
+    @property
+    def added(self):
+        return self.quantity is not None
+
+    @property
+    def found(self):
+        return self.product_name is not None
+
+
+def add_items(user_id: int, items: Iterable[tuple[int, int]]) -> list[CartAddResult]:
+    """
+    Добавляет в корзину пользователя пары (product_id, quantity) одним
+    запросом; корзина создается при необходимости. Повторы товара
+    суммируются. Товар не добавляется, если итоговое количество в корзине
+    превысило бы остаток. Возвращает результат по каждому товару.
+    """
+    product_ids, quantities = [], []
+    for product_id, quantity in items:
+        if quantity < 1:
+            raise ValueError('Количество товара должно быть положительным.')
+        product_ids.append(product_id)
+        quantities.append(quantity)
+    if not product_ids:
+        return []
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(_ADD_ITEMS_SQL, [user_id, now, product_ids, quantities, now])
+        return [CartAddResult(*row) for row in cursor.fetchall()]
+
+
+def add_item(user_id: int, product_id: int, quantity: int = 1) -> CartAddResult:
+    """Добавляет один товар (см. add_items)."""
+    return add_items(user_id, [(product_id, quantity)])[0]
+
+
+def get_cart_quantities(user_id: int, product_ids: Iterable[int]) -> dict[int, int]:
+    """Количество в корзине пользователя для тех из product_ids, что в ней есть."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """SELECT ci.cart_items_product_id, ci.cart_items_quantity
+               FROM carts c
+               JOIN cartitems ci ON ci.cart_items_cart_id = c.carts_id
+               WHERE c.carts_user_id = %s AND ci.cart_items_product_id = ANY(%s)""",
+            [user_id, product_ids]
+        )
+        return dict(cursor.fetchall())
@@ -1,3 +1,116 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from Apps.catalog.models import Brands, Categories, Products
+from Apps.users.models import Users
+from .models import Carts, Cartitems
+from .operations import add_item, add_items, get_cart_quantities
+
+
+class AddItemsTests(TestCase):
+    """Добавление в корзину одним запросом (Apps.cart.operations)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(categories_name='Гитары')
+        brand = Brands.objects.create(brands_name='Yamaha')
+        cls.user = Users.objects.create(
+            users_email='buyer@example.com', users_password_hash='!',
+            users_first_name='Иван', users_last_name='Иванов',
+        )
+        cls.guitar = Products.objects.create(
+            products_name='Гитара', products_price=Decimal('100.00'), products_stock=3,
+            products_category=category, products_brand=brand,
+        )
+        cls.strings = Products.objects.create(
+            products_name='Струны', products_price=Decimal('5.00'), products_stock=10,
+            products_category=category, products_brand=brand,
+        )
+
+    def _quantity(self, product):
+        return Cartitems.objects.get(
+            cart_items_cart__carts_user=self.user, cart_items_product=product
+        ).cart_items_quantity
+
+    def test_creates_cart_and_item(self):
+        result = add_item(self.user.users_id, self.guitar.products_id, 2)
+
+        self.assertTrue(result.found)
+        self.assertTrue(result.added)
+        self.assertTrue(result.created)
+        self.assertEqual(result.quantity, 2)
+        self.assertEqual(result.stock, 3)
+        self.assertEqual(Carts.objects.filter(carts_user=self.user).count(), 1)
+        self.assertEqual(self._quantity(self.guitar), 2)
+
+    def test_merges_into_existing_item(self):
+        add_item(self.user.users_id, self.strings.products_id, 2)
+        result = add_item(self.user.users_id, self.strings.products_id, 3)
+
+        self.assertTrue(result.added)
+        self.assertFalse(result.created)
+        self.assertEqual(result.quantity, 5)
+        self.assertEqual(self._quantity(self.strings), 5)
+        self.assertEqual(Carts.objects.filter(carts_user=self.user).count(), 1)
+        self.assertEqual(Cartitems.objects.filter(cart_items_product=self.strings).count(), 1)
+
+    def test_repeated_product_in_one_call_is_summed(self):
+        results = add_items(self.user.users_id, [
+            (self.strings.products_id, 1),
+            (self.guitar.products_id, 1),
+            (self.strings.products_id, 2),
+        ])
+
+        self.assertEqual([r.product_id for r in results], [self.guitar.products_id, self.strings.products_id])
+        self.assertEqual(results[1].requested, 3)
+        self.assertEqual(self._quantity(self.strings), 3)
+
+    def test_new_item_over_stock_is_rejected(self):
+        result = add_item(self.user.users_id, self.guitar.products_id, 4)
+
+        self.assertTrue(result.found)
+        self.assertFalse(result.added)
+        self.assertFalse(result.created)
+        self.assertEqual(result.stock, 3)
+        self.assertFalse(Cartitems.objects.filter(cart_items_product=self.guitar).exists())
+
+    def test_merge_over_stock_keeps_existing_quantity(self):
+        add_item(self.user.users_id, self.guitar.products_id, 2)
+        result = add_item(self.user.users_id, self.guitar.products_id, 2)
+
+        self.assertFalse(result.added)
+        self.assertEqual(self._quantity(self.guitar), 2)
+
+        # Ровно до остатка — можно
+        self.assertTrue(add_item(self.user.users_id, self.guitar.products_id, 1).added)
+        self.assertEqual(self._quantity(self.guitar), 3)
+
+    def test_missing_product(self):
+        missing_id = self.strings.products_id + 1000
+        results = add_items(self.user.users_id, [(missing_id, 1), (self.strings.products_id, 1)])
+
+        self.assertEqual(results[0].product_id, self.strings.products_id)
+        missing = results[1]
+        self.assertEqual(missing.product_id, missing_id)
+        self.assertFalse(missing.found)
+        self.assertFalse(missing.added)
+        self.assertIsNone(missing.stock)
+        # Остальные товары запроса добавляются
+        self.assertTrue(results[0].added)
+        self.assertFalse(Cartitems.objects.filter(cart_items_product_id=missing_id).exists())
+
+    def test_non_positive_quantity(self):
+        with self.assertRaises(ValueError):
+            add_items(self.user.users_id, [(self.guitar.products_id, 0)])
+        self.assertEqual(add_items(self.user.users_id, []), [])
+        self.assertFalse(Carts.objects.filter(carts_user=self.user).exists())
+
+    def test_cart_quantities(self):
+        add_item(self.user.users_id, self.strings.products_id, 4)
+
+        self.assertEqual(
+            get_cart_quantities(self.user.users_id, [self.guitar.products_id, self.strings.products_id]),
+            {self.strings.products_id: 4},
+        )
+        self.assertEqual(get_cart_quantities(self.user.users_id, []), {})
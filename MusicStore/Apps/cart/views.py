@@ -1,70 +1,39 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import connection
-from django.utils import timezone
 from .models import Carts, Cartitems
+from .operations import add_item
 from Apps.users.models import Users
-from Apps.catalog.models import Products
+from Apps.users.store_user import require_store_user_id
+from Apps.catalog.recommendations import get_cart_recommendations
+from Apps.users.utils import get_user_favorite_ids
 
 
 @login_required
 def add_to_cart(request, product_id):
-    """Добавление товара в корзину"""
+    """Добавление товара в корзину (один запрос, см. Apps.cart.operations)"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        product = get_object_or_404(Products, products_id=product_id)
+        user_id = require_store_user_id(request)
         
         # Получаем количество из запроса (по умолчанию 1)
         quantity = int(request.GET.get('quantity', 1))
         if quantity < 1:
             quantity = 1
         
-        # Проверяем наличие товара на складе
-        if product.products_stock < quantity:
-            messages.warning(request, f'Недостаточно товара на складе. В наличии: {product.products_stock} шт.')
+        # Корзина создается при необходимости, остаток проверяется в том же запросе
+        result = add_item(user_id, product_id, quantity)
+        if not result.found:
+            messages.error(request, 'Товар не найден.')
+            return redirect('catalog')
+        if not result.added:
+            messages.warning(request, f'Недостаточно товара на складе. В наличии: {result.stock} шт.')
             return redirect('catalog')
         
-        # Получаем или создаем корзину для пользователя
-        cart = Carts.objects.filter(carts_user=user_model).first()
-        if not cart:
-            # Создаем новую корзину через raw SQL, так как managed = False
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "INSERT INTO carts (carts_user_id, carts_created_at) VALUES (%s, %s) RETURNING carts_id",
-                    [user_model.users_id, timezone.now()]
-                )
-                cart_id = cursor.fetchone()[0]
-                cart = Carts.objects.get(carts_id=cart_id)
-        
-        # Проверяем, есть ли уже этот товар в корзине
-        cart_item = Cartitems.objects.filter(
-            cart_items_cart=cart,
-            cart_items_product=product
-        ).first()
-        
-        if cart_item:
-            # Если товар уже есть, увеличиваем количество
-            new_quantity = cart_item.cart_items_quantity + quantity
-            if new_quantity > product.products_stock:
-                messages.warning(request, f'Недостаточно товара на складе. Максимальное количество: {product.products_stock} шт.')
-                return redirect('catalog')
-            
-            # Обновляем количество через raw SQL
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "UPDATE cartitems SET cart_items_quantity = %s WHERE cart_items_id = %s",
-                    [new_quantity, cart_item.cart_items_id]
-                )
-            messages.success(request, f'Количество товара "{product.products_name}" обновлено в корзине.')
+        if result.created:
+            messages.success(request, f'Товар "{result.product_name}" добавлен в корзину.')
         else:
-            # Создаем новый элемент корзины через raw SQL
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "INSERT INTO cartitems (cart_items_cart_id, cart_items_product_id, cart_items_quantity, cart_items_added_at) VALUES (%s, %s, %s, %s) RETURNING cart_items_id",
-                    [cart.carts_id, product.products_id, quantity, timezone.now()]
-                )
-            messages.success(request, f'Товар "{product.products_name}" добавлен в корзину.')
+            messages.success(request, f'Количество товара "{result.product_name}" обновлено в корзине.')
         
         # Перенаправляем обратно на каталог или на страницу корзины
         redirect_to = request.GET.get('next', 'catalog')
@@ -84,8 +53,8 @@ def add_to_cart(request, product_id):
 def cart_view(request):
     """Страница корзины пользователя"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        cart = Carts.objects.filter(carts_user=user_model).first()
+        user_id = require_store_user_id(request)
+        cart = Carts.objects.filter(carts_user_id=user_id).first()
         
         if cart:
             cart_items = Cartitems.objects.filter(cart_items_cart=cart)
@@ -103,10 +72,21 @@ def cart_view(request):
                 'item_total': item_total,
             })
         
+        # «С этими товарами покупают» — по готовым рекомендациям товаров корзины
+        recommendations = get_cart_recommendations(
+            item['item'].cart_items_product_id for item in cart_items_with_total
+        )
+        favorite_ids = (
+            get_user_favorite_ids(user_id, [p.products_id for p in recommendations])
+            if recommendations else set()
+        )
+        
         context = {
             'cart': cart,
             'cart_items_with_total': cart_items_with_total,
             'total': total,
+            'recommendations': recommendations,
+            'favorite_ids': favorite_ids,
         }
     except Users.DoesNotExist:
         messages.error(request, 'Профиль пользователя не найден.')
@@ -119,8 +99,8 @@ def cart_view(request):
 def remove_from_cart(request, item_id):
     """Удаление товара из корзины"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        cart = Carts.objects.filter(carts_user=user_model).first()
+        user_id = require_store_user_id(request)
+        cart = Carts.objects.filter(carts_user_id=user_id).first()
         
         if not cart:
             messages.error(request, 'Корзина не найдена.')
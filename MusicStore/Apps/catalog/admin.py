@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from .models import Categories, Brands, Products, Productimages, Productcharacteristics
+from .storage import save_upload
 
 
 @admin.register(Categories)
@@ -170,9 +171,6 @@ class ProductAdmin(admin.ModelAdmin):
     
     def save_formset(self, request, form, formset, change):
         """Сохраняем inline с поддержкой загрузки файлов и удалений."""
-        from django.core.files.storage import default_storage
-        from django.utils.text import get_valid_filename
-        import os
         # Сначала удаляем помеченные к удалению объекты
         for obj in formset.deleted_objects:
             obj.delete()
@@ -184,17 +182,7 @@ class ProductAdmin(admin.ModelAdmin):
             if isinstance(obj, Productimages):
                 uploaded = inline_form.cleaned_data.get('upload_image')
                 if uploaded:
-                    product_id = form.instance.products_id if form.instance and form.instance.pk else obj.product_images_product_id
-                    product_id = product_id or 'new'
-                    filename = get_valid_filename(uploaded.name)
-                    subdir = os.path.join('product_images', str(product_id))
-                    path = default_storage.save(os.path.join(subdir, filename), uploaded)
-                    try:
-                        image_url = default_storage.url(path)
-                    except Exception:
-                        from django.conf import settings
-                        image_url = f"{settings.MEDIA_URL}{path}"
-                    obj.product_images_url = image_url
+                    obj.product_images_url = save_upload(uploaded)
             obj.save()
             inline_form.save_m2m()
     
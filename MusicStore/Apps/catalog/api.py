@@ -17,15 +17,61 @@ class BrandViewSet(viewsets.ModelViewSet):
     queryset = Brands.objects.all().order_by('brands_name')
     serializer_class = BrandSerializer
 
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import Products, Categories, Brands
 from .serializers import ProductSerializer, CategorySerializer, BrandSerializer
+from .attributes import parse_attribute_filters, filter_by_attributes
+from .conditional import api_product_condition, api_list_condition
+from .category_tree import get_category_tree
+from .suggest import suggest as get_suggestions, SUGGEST_LIMIT, SUGGEST_MAX_LIMIT
 
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Products.objects.all().order_by('-products_id')
     serializer_class = ProductSerializer
 
+    def get_queryset(self):
+        """
+        Фильтры списка: ?category=ID (с подкатегориями), ?brand=ID,
+        ?attr=ключ:значение (можно несколько; по индексу характеристик).
+        """
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        category = params.get('category', '').strip()
+        if category.isdigit():
+            queryset = queryset.filter(
+                products_category_id__in=get_category_tree().subtree_ids(int(category))
+            )
+        brand = params.get('brand', '').strip()
+        if brand.isdigit():
+            queryset = queryset.filter(products_brand_id=int(brand))
+        return filter_by_attributes(queryset, parse_attribute_filters(params.getlist('attr')))
+
+    @method_decorator(api_list_condition)
+    def list(self, request, *args, **kwargs):
+        """Список с ETag: при неизменном каталоге клиент получает 304."""
+        return super().list(request, *args, **kwargs)
+
+    @method_decorator(api_product_condition)
+    def retrieve(self, request, *args, **kwargs):
+        """Товар с ETag/Last-Modified (строка товара, карточка, отзывы)."""
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Подсказки поиска: /api/products/suggest/?q=...&limit=N"""
+        try:
+            limit = int(request.query_params.get('limit', SUGGEST_LIMIT))
+        except (TypeError, ValueError):
+            limit = SUGGEST_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        return Response(get_suggestions(request.query_params.get('q', ''), limit))
+
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Categories.objects.all().order_by('categories_name')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Apps.catalog'
+
+    def ready(self):
+        # Подключаем обработчики сигналов об изменении каталога
+        from . import signals, category_tree, search, facets, attributes, cards, page_cache  # noqa: F401
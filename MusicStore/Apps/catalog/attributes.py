@@ -0,0 +1,122 @@
+"""
+Индекс характеристик товаров для фильтрации.
+
+Характеристики (Productcharacteristics) денормализуются в колонку
+products.products_attributes (jsonb {ключ: значение}, ключ и значение
+нормализованы) с GIN-индексом jsonb_path_ops. Фильтр по нескольким
+характеристикам превращается в проверки @> по индексу вместо EAV-соединений.
+Колонка пересчитывается для затронутых товаров по сигналу products_changed.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import JSONField, Q
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+
+from .signals import products_changed
+from .versions import get_version
+
+# Та же нормализация, что и normalize_attribute(): нижний регистр, одиночные пробелы
+_NORMALIZE_SQL = "lower(regexp_replace(btrim({}), '\\s+', ' ', 'g'))"
+
+_REFRESH_SQL = """
+UPDATE products SET products_attributes = coalesce(
+    (SELECT jsonb_object_agg({key}, {value})
+       FROM productcharacteristics
+      WHERE product_characteristics_product_id = products_id),
+    '{{}}'::jsonb)
+WHERE {where}
+"""
+
+_OPTIONS_SQL = """
+SELECT attr.key, attr.value, COUNT(*)
+  FROM products, jsonb_each_text(products.products_attributes) AS attr
+ GROUP BY attr.key, attr.value
+ ORDER BY attr.key, attr.value
+"""
+
+OPTIONS_CACHE_TIMEOUT = 60 * 10
+# Ключи с большим числом значений (серийные номера и т.п.) в фильтр не выводим
+OPTIONS_MAX_VALUES = 30
+
+
+def normalize_attribute(text):
+    return ' '.join((text or '').lower().split())
+
+
+def refresh_attributes(product_ids=None):
+    """Пересчитывает индекс характеристик для товаров (без аргумента — для всех)."""
+    if product_ids is not None and not product_ids:
+        return 0
+    if product_ids is None:
+        where, params = 'TRUE', []
+    else:
+        where, params = 'products_id = ANY(%s)', [list(product_ids)]
+    sql = _REFRESH_SQL.format(
+        key=_NORMALIZE_SQL.format('product_characteristics_key'),
+        value=_NORMALIZE_SQL.format('product_characteristics_value'),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def parse_attribute_filters(values):
+    """
+    Разбирает параметры вида «ключ:значение» в {ключ: [значения]}.
+    Некорректные и пустые элементы пропускаются.
+    """
+    filters = {}
+    for item in values:
+        key, sep, value = item.partition(':')
+        key, value = normalize_attribute(key), normalize_attribute(value)
+        if not sep or not key or not value:
+            continue
+        filters.setdefault(key, set()).add(value)
+    return {key: sorted(vals) for key, vals in sorted(filters.items())}
+
+
+def filter_by_attributes(queryset, filters):
+    """
+    Фильтрует товары по характеристикам: значения одного ключа объединяются
+    через ИЛИ, разные ключи — через И. Каждая проверка — @> по GIN-индексу.
+    """
+    if not filters:
+        return queryset
+    queryset = queryset.alias(
+        attributes=RawSQL('products.products_attributes', [], output_field=JSONField())
+    )
+    for key, values in filters.items():
+        condition = Q()
+        for value in values:
+            condition |= Q(attributes__contains={key: value})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def attribute_options():
+    """
+    Доступные для фильтра характеристики: [{'key', 'values': [{'value', 'count'}]}].
+    Кешируется до изменения каталога (штамп версии фасетов).
+    """
+    cache_key = f'catalog:attribute-options:{get_version("facets")}'
+    options = cache.get(cache_key)
+    if options is None:
+        grouped = {}
+        with connection.cursor() as cursor:
+            cursor.execute(_OPTIONS_SQL)
+            for key, value, count in cursor.fetchall():
+                grouped.setdefault(key, []).append({'value': value, 'count': count})
+        options = [
+            {'key': key, 'values': values}
+            for key, values in grouped.items()
+            if len(values) <= OPTIONS_MAX_VALUES
+        ]
+        cache.set(cache_key, options, OPTIONS_CACHE_TIMEOUT)
+    return options
+
+
+@receiver(products_changed)
+def _on_products_changed(sender, product_ids, **kwargs):
+    refresh_attributes(product_ids)
@@ -0,0 +1,148 @@
+"""
+Кеш HTML-фрагментов карточек товаров.
+
+Разметка карточки одинакова для всех посетителей, кроме нескольких
+персональных элементов (кнопка избранного, кнопка корзины с количеством
+товара в корзине, дата добавления в избранное). Фрагмент кешируется по ID товара, products_updated_at и
+product_cards_updated_at (меняется при пересчете карточки: изображение,
+рейтинг, остаток), а на месте персональных элементов оставляется метка.
+При выводе страницы все фрагменты читаются одним get_many, метки
+заменяются заранее отрисованными вариантами — без рендеринга шаблонов.
+"""
+from django.core.cache import cache
+from django.template.defaultfilters import date as date_filter
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.timezone import template_localtime
+
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Меняется вместе с составом записи кеша, чтобы не читать записи прежнего вида
+_CARD_LAYOUT = 2
+
+_ACTIONS_SLOT = '<!--card-actions-->'
+_ADDED_AT_SLOT = '<!--card-added-at-->'
+_CART_SLOT = '<!--card-cart-->'
+_QUANTITY_SLOT = '<!--card-cart-quantity-->'
+
+# Состояния кнопок карточки каталога
+ACTIONS_ANONYMOUS = 'anonymous'
+ACTIONS_FAVORITE = 'favorite'
+ACTIONS_REGULAR = 'regular'
+
+# Состояния кнопки корзины
+CART_ADD = 'add'
+CART_IN_CART = 'in_cart'
+
+
+def _stamp(value):
+    # Микросекунды: два пересчета карточки в одну секунду дают разные ключи
+    return int(value.timestamp() * 1_000_000) if value is not None else 0
+
+
+def _card_key(variant, product):
+    card = getattr(product, 'card', None)
+    return 'catalog:card:{}:{}:{}:{}:{}'.format(
+        _CARD_LAYOUT,
+        variant,
+        product.products_id,
+        _stamp(product.products_updated_at),
+        _stamp(card.product_cards_updated_at if card is not None else None),
+    )
+
+
+def _render_cart_buttons(variant, product):
+    return {
+        state: render_to_string('catalog/_card_cart_button.html', {
+            'product': product,
+            'variant': variant,
+            'state': state,
+            'quantity_slot': mark_safe(_QUANTITY_SLOT),
+        })
+        for state in (CART_ADD, CART_IN_CART)
+    }
+
+
+def _render_catalog_card(product):
+    html = render_to_string('catalog/_product_card.html', {
+        'product': product,
+        'actions_slot': mark_safe(_ACTIONS_SLOT),
+    })
+    actions = {
+        state: render_to_string('catalog/_product_card_actions.html', {
+            'product': product,
+            'state': state,
+            'cart_slot': mark_safe(_CART_SLOT),
+        })
+        for state in (ACTIONS_ANONYMOUS, ACTIONS_FAVORITE, ACTIONS_REGULAR)
+    }
+    return {'html': html, 'actions': actions, 'cart': _render_cart_buttons('catalog', product)}
+
+
+def _render_favorite_card(product):
+    html = render_to_string('catalog/_favorite_card.html', {
+        'product': product,
+        'added_at_slot': mark_safe(_ADDED_AT_SLOT),
+        'cart_slot': mark_safe(_CART_SLOT),
+    })
+    return {'html': html, 'cart': _render_cart_buttons('favorite', product)}
+
+
+_RENDERERS = {
+    'catalog': _render_catalog_card,
+    'favorite': _render_favorite_card,
+}
+
+
+def _cached_cards(variant, products):
+    """Записи кеша для товаров (в порядке products); недостающие рендерятся и сохраняются."""
+    keys = [_card_key(variant, product) for product in products]
+    entries = cache.get_many(keys)
+    missing = {}
+    for key, product in zip(keys, products):
+        if key not in entries:
+            entries[key] = missing[key] = _RENDERERS[variant](product)
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+    return [entries[key] for key in keys]
+
+
+def _cart_button(entry, quantity):
+    if quantity:
+        return entry['cart'][CART_IN_CART].replace(_QUANTITY_SLOT, str(quantity))
+    return entry['cart'][CART_ADD]
+
+
+def render_product_cards(products, is_authenticated, favorite_ids=(), cart_quantities=None):
+    """
+    Карточки каталога с кнопками избранного/корзины для текущего посетителя.
+    cart_quantities — {ID товара: количество в корзине} (Apps.cart.operations).
+    """
+    cart_quantities = cart_quantities or {}
+    products = list(products)
+    parts = []
+    for product, entry in zip(products, _cached_cards('catalog', products)):
+        if not is_authenticated:
+            state = ACTIONS_ANONYMOUS
+        elif product.products_id in favorite_ids:
+            state = ACTIONS_FAVORITE
+        else:
+            state = ACTIONS_REGULAR
+        actions = entry['actions'][state].replace(
+            _CART_SLOT, _cart_button(entry, cart_quantities.get(product.products_id))
+        )
+        parts.append(entry['html'].replace(_ACTIONS_SLOT, actions))
+    return mark_safe(''.join(parts))
+
+
+def render_favorite_cards(favorites, cart_quantities=None):
+    """Карточки раздела «Избранное» с датой добавления и состоянием корзины."""
+    cart_quantities = cart_quantities or {}
+    favorites = list(favorites)
+    products = [favorite.favorites_product for favorite in favorites]
+    parts = []
+    for favorite, entry in zip(favorites, _cached_cards('favorite', products)):
+        added_at = date_filter(template_localtime(favorite.favorites_added_at), 'd.m.Y H:i')
+        cart_button = _cart_button(entry, cart_quantities.get(favorite.favorites_product_id))
+        parts.append(entry['html'].replace(_ADDED_AT_SLOT, added_at).replace(_CART_SLOT, cart_button))
+    return mark_safe(''.join(parts))
@@ -0,0 +1,136 @@
+"""
+Проекция карточек товаров (таблица productcards).
+
+Списки товаров (каталог, избранное, главная) берут название бренда и
+категории, главное изображение и рейтинг (из сводки productratings) из
+одной строки productcards, присоединенной к товару по первичному ключу,
+вместо отдельных запросов к изображениям и ленивой подгрузки связей.
+Строки пересчитываются для затронутых товаров по сигналам каталога и отзывов.
+"""
+from django.db import connection
+from django.dispatch import receiver
+
+from Apps.extras.signals import reviews_changed
+from .signals import products_changed, brands_changed, categories_changed, stock_changed
+
+_UPSERT_SQL = """
+INSERT INTO productcards (
+    product_cards_product_id, product_cards_name, product_cards_price, product_cards_stock,
+    product_cards_brand_name, product_cards_category_name, product_cards_image_url,
+    product_cards_image_webp_srcset, product_cards_image_jpeg_srcset,
+    product_cards_rating_avg, product_cards_reviews_count, product_cards_updated_at
+)
+SELECT p.products_id, p.products_name, p.products_price, p.products_stock,
+       b.brands_name, c.categories_name, img.product_images_url,
+       {srcset_webp}, {srcset_jpeg},
+       round(r.product_ratings_sum::numeric / nullif(r.product_ratings_count, 0), 2),
+       coalesce(r.product_ratings_count, 0), now()
+  FROM products p
+  JOIN brands b ON b.brands_id = p.products_brand_id
+  JOIN categories c ON c.categories_id = p.products_category_id
+  LEFT JOIN productratings r ON r.product_ratings_product_id = p.products_id
+  LEFT JOIN LATERAL (
+      SELECT i.product_images_id, i.product_images_url FROM productimages i
+       WHERE i.product_images_product_id = p.products_id
+       ORDER BY i.product_images_is_main DESC NULLS LAST, i.product_images_id
+       LIMIT 1
+  ) img ON TRUE
+ WHERE {where}
+ON CONFLICT (product_cards_product_id) DO UPDATE SET
+    product_cards_name = EXCLUDED.product_cards_name,
+    product_cards_price = EXCLUDED.product_cards_price,
+    product_cards_stock = EXCLUDED.product_cards_stock,
+    product_cards_brand_name = EXCLUDED.product_cards_brand_name,
+    product_cards_category_name = EXCLUDED.product_cards_category_name,
+    product_cards_image_url = EXCLUDED.product_cards_image_url,
+    product_cards_image_webp_srcset = EXCLUDED.product_cards_image_webp_srcset,
+    product_cards_image_jpeg_srcset = EXCLUDED.product_cards_image_jpeg_srcset,
+    product_cards_rating_avg = EXCLUDED.product_cards_rating_avg,
+    product_cards_reviews_count = EXCLUDED.product_cards_reviews_count,
+    product_cards_updated_at = EXCLUDED.product_cards_updated_at
+"""
+
+# srcset главного изображения: «url ширинаw, ...» по возрастанию ширины
+_SRCSET_SQL = """(SELECT string_agg(d.product_image_derivatives_url || ' '
+                          || d.product_image_derivatives_width || 'w', ', '
+                          ORDER BY d.product_image_derivatives_width)
+     FROM productimagederivatives d
+    WHERE d.product_image_derivatives_image_id = img.product_images_id
+      AND d.product_image_derivatives_format = '{}')"""
+
+
+def refresh_product_cards(product_ids=None, category_ids=None, brand_ids=None):
+    """
+    Пересчитывает карточки товаров из переданных наборов ID.
+    Без аргументов пересчитывает все карточки. Карточки удаленных товаров
+    удаляет внешний ключ (ON DELETE CASCADE).
+    """
+    conditions = []
+    params = []
+    for column, ids in (
+        ('p.products_id', product_ids),
+        ('p.products_category_id', category_ids),
+        ('p.products_brand_id', brand_ids),
+    ):
+        if ids:
+            conditions.append(f'{column} = ANY(%s)')
+            params.append(list(ids))
+    if not conditions:
+        if product_ids is not None or category_ids is not None or brand_ids is not None:
+            return 0
+        conditions.append('TRUE')
+    with connection.cursor() as cursor:
+        sql = _UPSERT_SQL.format(
+            where=' OR '.join(conditions),
+            srcset_webp=_SRCSET_SQL.format('webp'),
+            srcset_jpeg=_SRCSET_SQL.format('jpeg'),
+        )
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def refresh_card_stock(product_ids):
+    """
+    Переносит в карточки только остаток товаров (без пересборки карточки).
+    Штамп обновляется лишь у изменившихся строк: от него зависят кеш
+    фрагментов и ETag страницы товара.
+    """
+    if not product_ids:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """UPDATE productcards c
+                  SET product_cards_stock = p.products_stock, product_cards_updated_at = now()
+                 FROM products p
+                WHERE p.products_id = c.product_cards_product_id
+                  AND c.product_cards_product_id = ANY(%s)
+                  AND c.product_cards_stock IS DISTINCT FROM p.products_stock""",
+            [list(product_ids)]
+        )
+        return cursor.rowcount
+
+
+def with_cards(queryset):
+    """Присоединяет карточку к товарам одним JOIN (product.card)."""
+    return queryset.select_related('card')
+
+
+@receiver(products_changed)
+@receiver(reviews_changed)
+def _on_products_changed(sender, product_ids, **kwargs):
+    refresh_product_cards(product_ids=product_ids)
+
+
+@receiver(stock_changed)
+def _on_stock_changed(sender, product_ids, **kwargs):
+    refresh_card_stock(product_ids)
+
+
+@receiver(categories_changed)
+def _on_categories_changed(sender, category_ids, **kwargs):
+    refresh_product_cards(category_ids=category_ids)
+
+
+@receiver(brands_changed)
+def _on_brands_changed(sender, brand_ids, **kwargs):
+    refresh_product_cards(brand_ids=brand_ids)
@@ -0,0 +1,440 @@
+"""
+Массовый импорт каталога из прайс-листа (CSV или JSONL).
+
+Файл читается потоком: каждая строка проверяется и сразу передается в
+PostgreSQL через COPY во временную таблицу import_rows, поэтому память не
+растет с размером файла. Дальше все делается set-based запросами:
+недостающие бренды и категории добавляются по уникальному имени, товары —
+INSERT ... ON CONFLICT (products_sku), характеристики — ON CONFLICT
+(товар, ключ), изображения — только новые URL товара. Изменившиеся товары
+получают один сигнал products_changed (карточки, поиск, индекс
+характеристик пересчитываются пачкой).
+
+Формат строки (ключи CSV-заголовка и JSON-объекта):
+    sku           артикул — ключ товара (обязателен);
+    name, brand, category, price — обязательны для новых товаров;
+    stock, description — необязательны;
+    images        список URL (в CSV — через «|»);
+    characteristics — объект {ключ: значение} (в CSV — колонки «attr:ключ»).
+Пустые значения не затирают данные существующего товара.
+"""
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+
+from .models import Brands, Categories, Products
+from .signals import brands_changed, categories_changed, products_changed
+
+CSV_ATTR_PREFIX = 'attr:'
+CSV_IMAGES_SEPARATOR = '|'
+# Сколько изменений показывать в отчете
+DIFF_SAMPLE_SIZE = 20
+# С какого числа измененных товаров обновлять статистику таблиц после загрузки
+ANALYZE_THRESHOLD = 1000
+
+_FIELD_LIMITS = {
+    'sku': 64, 'name': 255, 'brand': 100, 'category': 100,
+    'characteristics': 100,  # ключ характеристики
+    'images': 255,  # URL изображения
+}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _check_length(value, field):
+    limit = _FIELD_LIMITS.get(field)
+    if limit and len(value) > limit:
+        raise ImportRowError(f'{field}: длиннее {limit} символов')
+    return value
+
+
+def _text(value, field):
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    return _check_length(value, field)
+
+
+def _price(value):
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        price = Decimal(str(value).replace(' ', '').replace(',', '.')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ImportRowError(f'price: некорректная цена {value!r}')
+    if price < 0 or price >= Decimal('1e8'):
+        raise ImportRowError(f'price: недопустимая цена {value!r}')
+    return price
+
+
+def _stock(value):
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        stock = int(str(value).replace(' ', ''))
+    except ValueError:
+        raise ImportRowError(f'stock: некорректный остаток {value!r}')
+    if stock < 0:
+        raise ImportRowError(f'stock: отрицательный остаток {value!r}')
+    return stock
+
+
+def _normalize(record):
+    """Проверенная строка для COPY из словаря записи файла."""
+    sku = _text(record.get('sku'), 'sku')
+    if sku is None:
+        raise ImportRowError('sku: не указан артикул')
+    images = record.get('images') or []
+    if isinstance(images, str):
+        images = images.split(CSV_IMAGES_SEPARATOR)
+    images = [_check_length(url.strip(), 'images') for url in images if url and url.strip()]
+    characteristics = {
+        _check_length(str(key).strip(), 'characteristics'): str(value).strip()
+        for key, value in (record.get('characteristics') or {}).items()
+        if str(key).strip() and value is not None and str(value).strip()
+    }
+    return [
+        sku,
+        _text(record.get('name'), 'name'),
+        _text(record.get('brand'), 'brand'),
+        _text(record.get('category'), 'category'),
+        _price(record.get('price')),
+        _stock(record.get('stock')),
+        _text(record.get('description'), 'description'),
+        json.dumps(images, ensure_ascii=False),
+        json.dumps(characteristics, ensure_ascii=False),
+    ]
+
+
+def read_csv(stream):
+    """Записи CSV-файла (разделитель , ; или табуляция определяется автоматически)."""
+    sample = stream.read(64 * 1024)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    for row in csv.DictReader(stream, dialect=dialect):
+        record = {'characteristics': {}}
+        for key, value in row.items():
+            if key is None:
+                continue
+            key = key.strip()
+            if key.lower().startswith(CSV_ATTR_PREFIX):
+                record['characteristics'][key[len(CSV_ATTR_PREFIX):]] = value
+            else:
+                record[key.lower()] = value
+        yield record
+
+
+def read_jsonl(stream):
+    """Записи JSONL-файла (пустые строки пропускаются)."""
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield ImportRowError(f'некорректный JSON: {exc.msg}')
+
+
+class _CopySource(io.RawIOBase):
+    """Файлоподобный поток CSV-строк для cursor.copy_expert из генератора."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._buffer = b''
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line, lineterminator='\n')
+
+    def readable(self):
+        return True
+
+    def _next_chunk(self):
+        row = next(self._rows, None)
+        if row is None:
+            return b''
+        self._line.seek(0)
+        self._line.truncate()
+        self._writer.writerow(['' if value is None else value for value in row])
+        return self._line.getvalue().encode('utf-8')
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+_STAGE_SQL = """
+CREATE TEMP TABLE import_rows (
+    line integer NOT NULL,
+    sku varchar(64) NOT NULL,
+    name varchar(255),
+    brand varchar(100),
+    category varchar(100),
+    price numeric(10, 2),
+    stock integer,
+    description text,
+    images jsonb NOT NULL,
+    characteristics jsonb NOT NULL
+) ON COMMIT DROP
+"""
+
+# Строки, которые попадут в products: существующий товар или новый со всеми
+# обязательными полями. Неполные строки не должны создавать бренды и категории
+_MERGEABLE = ("(i.product_id IS NOT NULL OR (i.name IS NOT NULL AND i.brand IS NOT NULL"
+              " AND i.category IS NOT NULL AND i.price IS NOT NULL))")
+
+# Последняя строка с артикулом побеждает; заодно подтягиваем текущий товар
+_PREPARE_SQL = """
+CREATE TEMP TABLE import_products ON COMMIT DROP AS
+SELECT DISTINCT ON (r.sku) r.*, p.products_id AS product_id
+FROM import_rows r
+LEFT JOIN products p ON p.products_sku = r.sku
+ORDER BY r.sku, r.line DESC;
+CREATE UNIQUE INDEX ON import_products (sku);
+ANALYZE import_products;
+"""
+
+_DIFF_SQL = f"""
+SELECT
+    (SELECT count(*) FROM import_rows),
+    (SELECT count(*) FROM import_products),
+    (SELECT count(DISTINCT i.brand) FROM import_products i
+      WHERE i.brand IS NOT NULL AND {_MERGEABLE}
+        AND NOT EXISTS (SELECT 1 FROM brands b WHERE b.brands_name = i.brand)),
+    (SELECT count(DISTINCT i.category) FROM import_products i
+      WHERE i.category IS NOT NULL AND {_MERGEABLE}
+        AND NOT EXISTS (SELECT 1 FROM categories c WHERE c.categories_name = i.category)),
+    (SELECT count(*) FROM import_products WHERE product_id IS NULL
+        AND name IS NOT NULL AND brand IS NOT NULL AND category IS NOT NULL AND price IS NOT NULL),
+    (SELECT count(*) FROM import_products WHERE product_id IS NULL
+        AND (name IS NULL OR brand IS NULL OR category IS NULL OR price IS NULL))
+"""
+
+# Изменения существующих товаров: (артикул, поле, было, станет)
+_CHANGES_SQL = """
+SELECT i.sku, f.field, f.old_value, f.new_value
+FROM import_products i
+JOIN products p ON p.products_id = i.product_id
+JOIN brands b ON b.brands_id = p.products_brand_id
+JOIN categories c ON c.categories_id = p.products_category_id
+CROSS JOIN LATERAL (VALUES
+    ('name', p.products_name, i.name),
+    ('brand', b.brands_name, i.brand),
+    ('category', c.categories_name, i.category),
+    ('price', p.products_price::text, i.price::text),
+    ('stock', p.products_stock::text, i.stock::text),
+    ('description', p.products_description, i.description)
+) AS f(field, old_value, new_value)
+WHERE f.new_value IS NOT NULL AND f.new_value IS DISTINCT FROM f.old_value
+ORDER BY i.sku, f.field
+"""
+
+_ENSURE_BRANDS_SQL = f"""
+INSERT INTO brands (brands_name)
+SELECT DISTINCT i.brand FROM import_products i WHERE i.brand IS NOT NULL AND {_MERGEABLE}
+ON CONFLICT (brands_name) DO NOTHING
+RETURNING brands_id
+"""
+
+_ENSURE_CATEGORIES_SQL = f"""
+INSERT INTO categories (categories_name)
+SELECT DISTINCT i.category FROM import_products i WHERE i.category IS NOT NULL AND {_MERGEABLE}
+ON CONFLICT (categories_name) DO NOTHING
+RETURNING categories_id
+"""
+
+# Пустые поля берутся из текущего товара: NOT NULL проверяется до ON CONFLICT
+_MERGE_PRODUCTS_SQL = f"""
+INSERT INTO products (
+    products_sku, products_name, products_description, products_price, products_stock,
+    products_category_id, products_brand_id, products_created_at, products_updated_at
+)
+SELECT i.sku,
+       coalesce(i.name, p.products_name),
+       coalesce(i.description, p.products_description, ''),
+       coalesce(i.price, p.products_price),
+       coalesce(i.stock, p.products_stock, 0),
+       coalesce(c.categories_id, p.products_category_id),
+       coalesce(b.brands_id, p.products_brand_id),
+       now(), now()
+FROM import_products i
+LEFT JOIN products p ON p.products_id = i.product_id
+LEFT JOIN brands b ON b.brands_name = i.brand
+LEFT JOIN categories c ON c.categories_name = i.category
+WHERE {_MERGEABLE}
+ON CONFLICT (products_sku) DO UPDATE SET
+    products_name = EXCLUDED.products_name,
+    products_description = EXCLUDED.products_description,
+    products_price = EXCLUDED.products_price,
+    products_stock = EXCLUDED.products_stock,
+    products_category_id = EXCLUDED.products_category_id,
+    products_brand_id = EXCLUDED.products_brand_id,
+    products_updated_at = EXCLUDED.products_updated_at
+WHERE (products.products_name, products.products_description, products.products_price,
+       products.products_stock, products.products_category_id, products.products_brand_id)
+      IS DISTINCT FROM
+      (EXCLUDED.products_name, EXCLUDED.products_description, EXCLUDED.products_price,
+       EXCLUDED.products_stock, EXCLUDED.products_category_id, EXCLUDED.products_brand_id)
+RETURNING products_id, (xmax = 0) AS inserted
+"""
+
+_MERGE_CHARACTERISTICS_SQL = """
+INSERT INTO productcharacteristics (
+    product_characteristics_product_id, product_characteristics_key, product_characteristics_value
+)
+SELECT p.products_id, attr.key, attr.value
+FROM import_products i
+JOIN products p ON p.products_sku = i.sku
+CROSS JOIN LATERAL jsonb_each_text(i.characteristics) AS attr
+ON CONFLICT (product_characteristics_product_id, product_characteristics_key) DO UPDATE SET
+    product_characteristics_value = EXCLUDED.product_characteristics_value
+WHERE productcharacteristics.product_characteristics_value IS DISTINCT FROM EXCLUDED.product_characteristics_value
+RETURNING product_characteristics_product_id
+"""
+
+# Первое изображение становится главным, если у товара главного еще нет
+_MERGE_IMAGES_SQL = """
+INSERT INTO productimages (product_images_product_id, product_images_url, product_images_is_main)
+SELECT p.products_id, img.url,
+       img.position = 1 AND NOT EXISTS (
+           SELECT 1 FROM productimages m
+           WHERE m.product_images_product_id = p.products_id AND m.product_images_is_main)
+FROM import_products i
+JOIN products p ON p.products_sku = i.sku
+CROSS JOIN LATERAL (
+    SELECT DISTINCT ON (e.url) e.url, e.position
+    FROM jsonb_array_elements_text(i.images) WITH ORDINALITY AS e(url, position)
+    ORDER BY e.url, e.position
+) AS img
+WHERE NOT EXISTS (
+    SELECT 1 FROM productimages x
+    WHERE x.product_images_product_id = p.products_id AND x.product_images_url = img.url)
+RETURNING product_images_product_id
+"""
+
+
+class ImportResult:
+    """Итоги импорта (или пробного прогона)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.errors = []
+        self.unique_skus = 0
+        self.new_brands = 0
+        self.new_categories = 0
+        self.new_products = 0
+        self.incomplete = 0
+        self.changed_products = 0
+        self.changes = []
+        self.inserted_products = 0
+        self.updated_products = 0
+        self.characteristics = 0
+        self.images = 0
+
+
+def _copy_rows(cursor, records, result):
+    def rows():
+        for line, record in enumerate(records, start=1):
+            try:
+                if isinstance(record, ImportRowError):
+                    raise record
+                if not isinstance(record, dict):
+                    raise ImportRowError('запись должна быть объектом')
+                row = _normalize(record)
+            except ImportRowError as exc:
+                result.errors.append((line, str(exc)))
+                continue
+            result.rows += 1
+            yield [line] + row
+
+    cursor.copy_expert(
+        """COPY import_rows (line, sku, name, brand, category, price, stock,
+                             description, images, characteristics)
+           FROM STDIN WITH (FORMAT csv)""",
+        _CopySource(rows()),
+    )
+
+
+def import_catalog(records, dry_run=False):
+    """
+    Импортирует записи (словари, см. read_csv/read_jsonl) одним
+    транзакционным проходом. При dry_run только считает изменения.
+    """
+    result = ImportResult()
+    with transaction.atomic():
+        # Через курсор psycopg2: COPY Django-обертка курсора не поддерживает
+        with connection.cursor() as cursor:
+            cursor.execute(_STAGE_SQL)
+            _copy_rows(cursor.cursor, records, result)
+            cursor.execute(_PREPARE_SQL)
+
+            cursor.execute(_DIFF_SQL)
+            (_, result.unique_skus, result.new_brands, result.new_categories,
+             result.new_products, result.incomplete) = cursor.fetchone()
+            cursor.execute(_CHANGES_SQL)
+            changed_skus = set()
+            for sku, field, old_value, new_value in cursor.fetchall():
+                changed_skus.add(sku)
+                if len(result.changes) < DIFF_SAMPLE_SIZE:
+                    result.changes.append((sku, field, old_value, new_value))
+            result.changed_products = len(changed_skus)
+
+            if dry_run:
+                transaction.set_rollback(True)
+                return result
+
+            cursor.execute(_ENSURE_BRANDS_SQL)
+            brand_ids = [r[0] for r in cursor.fetchall()]
+            cursor.execute(_ENSURE_CATEGORIES_SQL)
+            category_ids = [r[0] for r in cursor.fetchall()]
+            # Сигналы о новых брендах и категориях — после фиксации, иначе другой
+            # процесс пересоберет дерево категорий и снимки без них под новой
+            # версией; товары целиком пересчитает products_changed ниже
+            if category_ids:
+                transaction.on_commit(
+                    lambda: categories_changed.send(sender=Categories, category_ids=category_ids)
+                )
+            if brand_ids:
+                transaction.on_commit(lambda: brands_changed.send(sender=Brands, brand_ids=brand_ids))
+
+            cursor.execute(_MERGE_PRODUCTS_SQL)
+            product_ids = set()
+            for product_id, inserted in cursor.fetchall():
+                product_ids.add(product_id)
+                if inserted:
+                    result.inserted_products += 1
+                else:
+                    result.updated_products += 1
+
+            cursor.execute(_MERGE_CHARACTERISTICS_SQL)
+            rows = cursor.fetchall()
+            result.characteristics = len(rows)
+            product_ids.update(r[0] for r in rows)
+            cursor.execute(_MERGE_IMAGES_SQL)
+            rows = cursor.fetchall()
+            result.images = len(rows)
+            product_ids.update(r[0] for r in rows)
+
+            if len(product_ids) >= ANALYZE_THRESHOLD:
+                # Статистика планировщика устарела после массовой вставки — без
+                # нее пересчет карточек по сигналам ниже выбирает seq scan в цикле
+                cursor.execute("ANALYZE products, productimages, productcharacteristics")
+
+        if product_ids:
+            changed_ids = sorted(product_ids)
+            transaction.on_commit(lambda: products_changed.send(sender=Products, product_ids=changed_ids))
+    return result
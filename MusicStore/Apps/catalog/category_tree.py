@@ -0,0 +1,138 @@
+"""
+Дерево категорий в памяти процесса.
+
+Строится одним запросом и хранит для каждого узла глубину, цепочку предков
+(для хлебных крошек) и готовое множество ID поддерева. Актуальность
+проверяется по штампу версии в кеше, поэтому фильтр по поддереву не делает
+запросов к БД независимо от глубины иерархии.
+"""
+import threading
+
+from django.dispatch import receiver
+
+from .models import Categories
+from .signals import categories_changed
+from .versions import get_version, bump_version
+
+VERSION_NAME = 'categories'
+
+
+class CategoryNode:
+    """Узел дерева категорий."""
+    __slots__ = ('id', 'name', 'parent_id', 'depth', 'children', 'ancestor_ids', 'descendant_ids')
+
+    def __init__(self, category_id, name, parent_id):
+        self.id = category_id
+        self.name = name
+        self.parent_id = parent_id
+        self.depth = 0
+        self.children = []
+        self.ancestor_ids = ()
+        self.descendant_ids = frozenset((category_id,))
+
+    def __repr__(self):
+        return f'<CategoryNode {self.id} {self.name!r}>'
+
+
+class CategoryTree:
+    """Неизменяемый снимок иерархии категорий."""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.nodes = {cid: CategoryNode(cid, name, parent_id) for cid, name, parent_id in rows}
+        self.roots = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.parent_id)
+            if parent is None or parent is node:
+                self.roots.append(node)
+            else:
+                parent.children.append(node)
+        self.roots.sort(key=lambda n: n.name)
+        for node in self.nodes.values():
+            node.children.sort(key=lambda n: n.name)
+        self._annotate()
+
+    def _annotate(self):
+        """Проставляет глубину, предков и поддеревья (итеративно, без рекурсии)."""
+        order = []
+        stack = [(root, ()) for root in reversed(self.roots)]
+        visited = set()
+        while stack:
+            node, ancestors = stack.pop()
+            if node.id in visited:
+                continue
+            visited.add(node.id)
+            node.ancestor_ids = ancestors
+            node.depth = len(ancestors)
+            order.append(node)
+            for child in reversed(node.children):
+                stack.append((child, ancestors + (node.id,)))
+        # Узлы в цикле (некорректные данные) не достижимы из корней — делаем их корнями
+        for node in self.nodes.values():
+            if node.id not in visited:
+                node.children = []
+                self.roots.append(node)
+                order.append(node)
+        for node in reversed(order):
+            if node.children:
+                ids = {node.id}
+                for child in node.children:
+                    ids.update(child.descendant_ids)
+                node.descendant_ids = frozenset(ids)
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+    def subtree_ids(self, category_id):
+        """ID категории и всех ее потомков; для неизвестного ID — только он сам."""
+        node = self.nodes.get(category_id)
+        if node is None:
+            return frozenset((category_id,))
+        return node.descendant_ids
+
+    def walk(self):
+        """Все узлы в порядке обхода в глубину (родитель перед детьми)."""
+        stack = list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def path(self, category_id):
+        """Цепочка узлов от корня до категории включительно."""
+        node = self.nodes.get(category_id)
+        if node is None:
+            return []
+        return [self.nodes[cid] for cid in node.ancestor_ids] + [node]
+
+
+_tree = None
+_lock = threading.Lock()
+
+
+def get_category_tree():
+    """Актуальное дерево категорий текущего процесса."""
+    global _tree
+    version = get_version(VERSION_NAME)
+    tree = _tree
+    if tree is not None and tree.version == version:
+        return tree
+    with _lock:
+        if _tree is None or _tree.version != version:
+            rows = Categories.objects.values_list(
+                'categories_id', 'categories_name', 'categories_parent_id'
+            )
+            _tree = CategoryTree(list(rows), version)
+        return _tree
+
+
+def invalidate_category_tree():
+    """Сбрасывает дерево во всех процессах (через штамп версии)."""
+    global _tree
+    bump_version(VERSION_NAME)
+    _tree = None
+
+
+@receiver(categories_changed)
+def _on_categories_changed(sender, **kwargs):
+    invalidate_category_tree()
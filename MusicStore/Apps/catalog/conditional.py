@@ -0,0 +1,105 @@
+"""
+Валидаторы условных GET-запросов (ETag / Last-Modified) для товаров.
+
+Состояние товара описывается тремя штампами, которые уже поддерживаются
+при любом изменении:
+    products.products_updated_at          — строка товара (админ-панель);
+    productcards.product_cards_updated_at — пересчет карточки: изображения,
+                                            характеристики, остаток, бренд,
+                                            категория (сигналы каталога);
+    productratings.product_ratings_updated_at — одобренные отзывы.
+Все три читаются одним запросом по первичному ключу, поэтому ответ 304
+обходится без рендеринга страницы и без остальных запросов представления.
+ETag страницы товара дополнительно учитывает версию ее тега в кеше страниц:
+блок рекомендаций меняется без изменения самого товара.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from .facets import VERSION_NAME as FACETS_VERSION
+from .models import Products
+from .page_cache import page_tag_version, product_tag
+from .versions import get_version
+
+_STAMPS = (
+    'products_updated_at',
+    'card__product_cards_updated_at',
+    'rating__product_ratings_updated_at',
+)
+
+
+def product_validators(request, product_id):
+    """
+    (etag, last_modified) товара или (None, None), если товара нет.
+    Результат запоминается на запросе: condition() запрашивает ETag и
+    Last-Modified по отдельности.
+    """
+    cache_attr = '_product_validators'
+    cached = getattr(request, cache_attr, None)
+    if cached is not None and cached[0] == product_id:
+        return cached[1]
+    stamps = Products.objects.filter(pk=product_id).values_list(*_STAMPS).first()
+    if stamps is None:
+        validators = (None, None)
+    else:
+        signature = repr((product_id, [s.isoformat() if s else None for s in stamps]))
+        etag = '"{}"'.format(hashlib.md5(signature.encode('utf-8')).hexdigest())
+        present = [s for s in stamps if s is not None]
+        validators = (etag, max(present) if present else None)
+    setattr(request, cache_attr, (product_id, validators))
+    return validators
+
+
+def _etag(*parts):
+    return '"{}"'.format(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def _product_page_etag(request, product_id):
+    # Страница авторизованного посетителя персональна (избранное, форма отзыва)
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return None
+    etag = product_validators(request, product_id)[0]
+    return _etag(etag, page_tag_version(product_tag(product_id))) if etag else None
+
+
+def _product_page_last_modified(request, product_id):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return None
+    return product_validators(request, product_id)[1]
+
+
+# Декоратор страницы товара (для анонимных посетителей)
+product_page_condition = condition(
+    etag_func=_product_page_etag,
+    last_modified_func=_product_page_last_modified,
+)
+
+
+def _api_product_etag(request, *args, **kwargs):
+    pk = str(kwargs.get('pk', ''))
+    if not pk.isdigit():
+        return None
+    etag = product_validators(request, int(pk))[0]
+    # Один URL отдает JSON и browsable API — представление зависит от Accept
+    return _etag(etag, request.META.get('HTTP_ACCEPT', '')) if etag else None
+
+
+def _api_product_last_modified(request, *args, **kwargs):
+    pk = str(kwargs.get('pk', ''))
+    return product_validators(request, int(pk))[1] if pk.isdigit() else None
+
+
+def _api_list_etag(request, *args, **kwargs):
+    # Список зависит от всего каталога: берем штамп версии, который
+    # увеличивается при любом изменении товаров, брендов и категорий
+    return _etag(get_version(FACETS_VERSION), request.get_full_path(),
+                 request.META.get('HTTP_ACCEPT', ''))
+
+
+# Декораторы методов ProductViewSet (через method_decorator)
+api_product_condition = condition(
+    etag_func=_api_product_etag,
+    last_modified_func=_api_product_last_modified,
+)
+api_list_condition = condition(etag_func=_api_list_etag)
@@ -0,0 +1,229 @@
+"""
+Счетчики фасетов каталога (бренд, категория, цена, наличие).
+
+Все счетчики считаются одним запросом с GROUPING SETS поверх выборки,
+отфильтрованной поиском и характеристиками. Для каждого фасета учитываются все выбранные
+фильтры, кроме его собственного, — так пользователь видит, сколько товаров
+получит при выборе другого значения. Сырые счетчики кешируются по
+нормализованной сигнатуре фильтров; кеш сбрасывается штампом версии при
+любом изменении товаров, брендов или категорий.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import connection
+from django.dispatch import receiver
+
+from .category_tree import get_category_tree
+from .signals import products_changed, brands_changed, categories_changed, stock_changed
+from .versions import get_version, bump_version
+
+VERSION_NAME = 'facets'
+FACETS_CACHE_TIMEOUT = 60 * 10
+
+# Границы ценовых диапазонов (руб.): корзина i — цены в [PRICE_BUCKETS[i-1], PRICE_BUCKETS[i])
+PRICE_BUCKETS = [1000, 5000, 20000, 50000, 100000]
+
+_FACETS_SQL = """
+WITH f AS (
+    SELECT base.products_brand_id AS brand,
+           base.products_category_id AS category,
+           width_bucket(base.products_price, %s::numeric[]) AS price,
+           base.products_stock > 0 AS in_stock
+      FROM ({base}) base
+), m AS (
+    SELECT f.*,
+           {brand_match} AS m_brand,
+           {category_match} AS m_category,
+           {price_match} AS m_price,
+           {stock_match} AS m_stock
+      FROM f
+)
+SELECT GROUPING(brand), GROUPING(category), GROUPING(price), GROUPING(in_stock),
+       brand, category, price, in_stock,
+       COUNT(*) FILTER (WHERE m_category AND m_price AND m_stock),
+       COUNT(*) FILTER (WHERE m_brand AND m_price AND m_stock),
+       COUNT(*) FILTER (WHERE m_brand AND m_category AND m_stock),
+       COUNT(*) FILTER (WHERE m_brand AND m_category AND m_price),
+       COUNT(*) FILTER (WHERE m_brand AND m_category AND m_price AND m_stock)
+  FROM m
+ GROUP BY GROUPING SETS ((brand), (category), (price), (in_stock), ())
+"""
+
+
+def price_bucket_range(index):
+    """Границы ценового диапазона (min включительно, max не включительно; None — без границы)."""
+    low = PRICE_BUCKETS[index - 1] if index > 0 else None
+    high = PRICE_BUCKETS[index] if index < len(PRICE_BUCKETS) else None
+    return low, high
+
+
+def price_bucket_label(index):
+    low, high = price_bucket_range(index)
+    if low is None:
+        return f'до {high:,} ₽'.replace(',', ' ')
+    if high is None:
+        return f'от {low:,} ₽'.replace(',', ' ')
+    return f'{low:,} – {high:,} ₽'.replace(',', ' ')
+
+
+class FacetSelection:
+    """Выбранные значения фасетов (None/False — фасет не выбран)."""
+
+    def __init__(self, brand_id=None, category_id=None, price_bucket=None, in_stock=False):
+        self.brand_id = brand_id
+        self.category_id = category_id
+        self.price_bucket = price_bucket
+        self.in_stock = in_stock
+        self.category_ids = (
+            get_category_tree().subtree_ids(category_id) if category_id is not None else None
+        )
+
+    def apply(self, queryset):
+        """Применяет выбранные фасеты к queryset товаров."""
+        if self.category_ids is not None:
+            queryset = queryset.filter(products_category_id__in=self.category_ids)
+        if self.brand_id is not None:
+            queryset = queryset.filter(products_brand_id=self.brand_id)
+        if self.price_bucket is not None:
+            low, high = price_bucket_range(self.price_bucket)
+            if low is not None:
+                queryset = queryset.filter(products_price__gte=low)
+            if high is not None:
+                queryset = queryset.filter(products_price__lt=high)
+        if self.in_stock:
+            queryset = queryset.filter(products_stock__gt=0)
+        return queryset
+
+    def signature(self):
+        return (
+            self.brand_id,
+            self.category_id,
+            self.price_bucket,
+            self.in_stock,
+        )
+
+    def _match_sql(self):
+        """SQL-условия «строка проходит фильтр фасета» и их параметры (в порядке подстановки)."""
+        params = []
+        brand_match = category_match = price_match = stock_match = 'TRUE'
+        if self.brand_id is not None:
+            brand_match = 'brand = %s'
+            params.append(self.brand_id)
+        if self.category_ids is not None:
+            category_match = 'category = ANY(%s)'
+            params.append(list(self.category_ids))
+        if self.price_bucket is not None:
+            price_match = 'price = %s'
+            params.append(self.price_bucket)
+        if self.in_stock:
+            stock_match = 'in_stock'
+        sql = {
+            'brand_match': brand_match,
+            'category_match': category_match,
+            'price_match': price_match,
+            'stock_match': stock_match,
+        }
+        return sql, params
+
+
+class Facets:
+    """Результат подсчета: сырые счетчики и их представление для шаблона."""
+
+    def __init__(self, raw, selection):
+        self.brands = raw['brands']
+        self.categories = raw['categories']
+        self.prices = raw['prices']
+        self.stock = raw['stock']
+        self.total = raw['total']
+        self.selection = selection
+
+    def category_options(self):
+        """Категории в порядке дерева со счетчиками по всему поддереву."""
+        tree = get_category_tree()
+        options = []
+        for node in tree.walk():
+            count = sum(self.categories.get(cid, 0) for cid in node.descendant_ids)
+            options.append({
+                'id': node.id,
+                'name': node.name,
+                'prefix': '— ' * node.depth,
+                'count': count,
+            })
+        return options
+
+    def brand_options(self, brands):
+        return [
+            {'id': brand.brands_id, 'name': brand.brands_name, 'count': self.brands.get(brand.brands_id, 0)}
+            for brand in brands
+        ]
+
+    def price_options(self):
+        return [
+            {'id': index, 'label': price_bucket_label(index), 'count': self.prices.get(index, 0)}
+            for index in range(len(PRICE_BUCKETS) + 1)
+        ]
+
+    @property
+    def in_stock_count(self):
+        return self.stock.get(True, 0)
+
+
+def _empty_counts():
+    return {'brands': {}, 'categories': {}, 'prices': {}, 'stock': {}, 'total': 0}
+
+
+def _count(base_queryset, selection):
+    base_sql, base_params = (base_queryset.order_by()
+                             .values('products_brand_id', 'products_category_id',
+                                     'products_price', 'products_stock')
+                             .query.sql_with_params())
+    match_sql, match_params = selection._match_sql()
+    sql = _FACETS_SQL.format(base=base_sql, **match_sql)
+    params = [PRICE_BUCKETS, *base_params, *match_params]
+
+    raw = _empty_counts()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for (g_brand, g_category, g_price, g_stock,
+             brand, category, price, in_stock,
+             brand_count, category_count, price_count, stock_count, total) in cursor.fetchall():
+            if not g_brand:
+                raw['brands'][brand] = brand_count
+            elif not g_category:
+                raw['categories'][category] = category_count
+            elif not g_price:
+                raw['prices'][price] = price_count
+            elif not g_stock:
+                raw['stock'][in_stock] = stock_count
+            else:
+                raw['total'] = total
+    return raw
+
+
+def get_facets(base_queryset, selection, base_key=''):
+    """
+    Счетчики фасетов для выборки base_queryset (отфильтрованной поиском и
+    характеристиками, но не фасетами). base_key — нормализованное описание
+    этих фильтров, входит в ключ кеша вместе с выбранными фасетами.
+    """
+    signature = repr((base_key, selection.signature()))
+    digest = hashlib.md5(signature.encode('utf-8')).hexdigest()
+    cache_key = f'catalog:facets:{get_version(VERSION_NAME)}:{digest}'
+    if base_queryset.query.is_empty():
+        # Поиск без слов (например, из одних знаков) дает .none() — SQL для него
+        # не строится, счетчики заведомо нулевые
+        return Facets(_empty_counts(), selection)
+    raw = cache.get(cache_key)
+    if raw is None:
+        raw = _count(base_queryset, selection)
+        cache.set(cache_key, raw, FACETS_CACHE_TIMEOUT)
+    return Facets(raw, selection)
+
+
+@receiver(products_changed)
+@receiver(brands_changed)
+@receiver(categories_changed)
+@receiver(stock_changed)  # счетчики «в наличии»
+def _on_catalog_changed(sender, **kwargs):
+    bump_version(VERSION_NAME)
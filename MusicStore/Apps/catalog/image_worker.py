@@ -0,0 +1,45 @@
+"""
+Обработка изображения в отдельном процессе (пул Apps.catalog.images).
+
+Модуль не зависит от Django: при запуске дочерних процессов методом spawn
+он импортируется без настройки проекта.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def render_derivatives(data, widths):
+    """
+    Уменьшенные копии изображения из байтов data для каждой ширины из
+    widths, не превышающей ширину оригинала (самая маленькая создается
+    всегда). Ориентация из EXIF применяется к пикселям, сами метаданные
+    (EXIF, GPS и т.п.) не сохраняются.
+    Возвращает список (формат, ширина, высота, байты).
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'L'):
+            # Прозрачность заливаем белым: JPEG ее не поддерживает
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        elif image.mode == 'L':
+            image = image.convert('RGB')
+
+        targets = sorted({w for w in widths if w < image.width} | {min(min(widths), image.width)})
+        results = []
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt, options in (
+                ('webp', {'quality': WEBP_QUALITY, 'method': 4}),
+                ('jpeg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+            ):
+                buffer = io.BytesIO()
+                resized.save(buffer, format=fmt.upper(), **options)
+                results.append((fmt, width, height, buffer.getvalue()))
+        return results
@@ -0,0 +1,74 @@
+"""
+Уменьшенные копии изображений товаров.
+
+Для каждой ширины из DERIVATIVE_WIDTHS создаются WebP и JPEG без EXIF
+(Apps.catalog.image_worker). Готовые копии сохраняются в хранилище по
+содержимому (Apps.catalog.storage) и записываются в productimagederivatives,
+а карточка товара получает srcset через сигнал products_changed.
+
+Очередь — загруженные изображения без копий. Ее разбирает отдельный процесс
+manage.py build_image_derivatives --watch: веб-воркеры только сохраняют
+оригинал, а записи в БД и рассылка сигналов идут в основном потоке команды,
+а не в служебном потоке пула процессов внутри веб-воркера.
+"""
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .models import Productimages
+from .storage import media_storage
+
+DERIVATIVE_WIDTHS = [320, 640, 1024]
+DERIVATIVE_WORKERS = getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2)
+
+
+def storage_name(url):
+    """Имя файла в хранилище по URL изображения или None для внешних ссылок."""
+    if url and url.startswith(settings.MEDIA_URL):
+        return url[len(settings.MEDIA_URL):]
+    return None
+
+
+def _derivative_name(width, fmt):
+    return f'{width}w.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def read_source(image_id):
+    """(ID товара, байты оригинала) или None, если обрабатывать нечего."""
+    image = Productimages.objects.filter(pk=image_id).first()
+    if image is None:
+        return None
+    name = storage_name(image.product_images_url)
+    if name is None or not default_storage.exists(name):
+        return None
+    with default_storage.open(name, 'rb') as source:
+        return image.product_images_product_id, source.read()
+
+
+def record_derivatives(image_id, derivatives):
+    """
+    Сохраняет копии в хранилище и заменяет записи о них для изображения.
+    Возвращает число сохраненных копий.
+    """
+    rows = []
+    for fmt, width, height, data in derivatives:
+        # Копии адресуются по содержимому, как и оригиналы (Apps.catalog.storage)
+        saved = media_storage.save(_derivative_name(width, fmt), ContentFile(data))
+        rows.append((image_id, fmt, width, height, media_storage.url(saved)))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM productimagederivatives WHERE product_image_derivatives_image_id = %s",
+                [image_id]
+            )
+            cursor.executemany(
+                """INSERT INTO productimagederivatives (
+                       product_image_derivatives_image_id, product_image_derivatives_format,
+                       product_image_derivatives_width, product_image_derivatives_height,
+                       product_image_derivatives_url)
+                   VALUES (%s, %s, %s, %s, %s)""",
+                rows
+            )
+    return len(rows)
+
@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Apps.catalog.image_worker import render_derivatives
+from Apps.catalog.images import (
+    DERIVATIVE_WIDTHS, DERIVATIVE_WORKERS, read_source, record_derivatives,
+)
+from Apps.catalog.models import Productimages
+from Apps.catalog.signals import products_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает уменьшенные копии (WebP/JPEG) для загруженных изображений товаров '
+        '(media/) в несколько процессов. С --watch работает постоянно и разбирает '
+        'новые загрузки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=DERIVATIVE_WORKERS,
+                            help='Число процессов обработки')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Сколько изображений держать в памяти одновременно')
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать копии и для изображений, у которых они уже есть')
+        parser.add_argument('--watch', action='store_true',
+                            help='Не завершаться: проверять новые загрузки каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза между проверками в режиме --watch, секунд')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = max(1, options['batch_size'])
+        # Изображения без файла или с ошибкой обработки в режиме --watch не
+        # перебираем на каждой проверке; они будут взяты снова после перезапуска
+        given_up = set()
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            image_ids = self._pending(force=options['force'])
+            self.stdout.write(f'Изображений к обработке: {len(image_ids)}')
+            done, skipped, failed = self._process(executor, image_ids, given_up)
+            self.stdout.write(self.style.SUCCESS(
+                f'Готово: {done}, файл не найден: {skipped}, с ошибками: {failed}'
+            ))
+            if options['watch']:
+                self._watch(executor, options['interval'], given_up)
+
+    def _pending(self, force=False, exclude=()):
+        # Загруженные файлы (внешние ссылки пропускаем)
+        images = Productimages.objects.filter(product_images_url__startswith=settings.MEDIA_URL)
+        if not force:
+            images = images.filter(derivatives__isnull=True)
+        if exclude:
+            images = images.exclude(pk__in=exclude)
+        return list(images.order_by('product_images_id').values_list('product_images_id', flat=True))
+
+    def _watch(self, executor, interval, given_up):
+        try:
+            while True:
+                time.sleep(interval)
+                # Соединение долгоживущего процесса могло устареть или оборваться
+                close_old_connections()
+                image_ids = self._pending(exclude=given_up)
+                if not image_ids:
+                    continue
+                done, skipped, failed = self._process(executor, image_ids, given_up)
+                self.stdout.write(
+                    f'Новых изображений: {done}, файл не найден: {skipped}, с ошибками: {failed}'
+                )
+        except KeyboardInterrupt:
+            pass
+
+    def _process(self, executor, image_ids, given_up):
+        done = failed = skipped = 0
+        for start in range(0, len(image_ids), self.batch_size):
+            batch = []
+            for image_id in image_ids[start:start + self.batch_size]:
+                source = read_source(image_id)
+                if source is None:
+                    if self.verbosity > 1:
+                        self.stderr.write(f'  #{image_id}: файл не найден, пропущено')
+                    given_up.add(image_id)
+                    skipped += 1
+                    continue
+                product_id, data = source
+                future = executor.submit(render_derivatives, data, DERIVATIVE_WIDTHS)
+                batch.append((image_id, product_id, future))
+
+            product_ids = set()
+            for image_id, product_id, future in batch:
+                try:
+                    record_derivatives(image_id, future.result())
+                except Exception as exc:
+                    self.stderr.write(f'  #{image_id}: {exc}')
+                    given_up.add(image_id)
+                    failed += 1
+                    continue
+                product_ids.add(product_id)
+                done += 1
+            if product_ids:
+                # Карточки получат srcset, кеши страниц и фрагментов сбросятся
+                products_changed.send(sender=Productimages, product_ids=sorted(product_ids))
+        return done, skipped, failed
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from Apps.catalog.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «С этим товаром покупают» по заказам '
+        '(по умолчанию — только заказы после последнего запуска)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать матрицу совместных покупок по всем заказам')
+
+    def handle(self, *args, **options):
+        orders_count, changed = build_recommendations(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Учтено заказов: {orders_count}, обновлены рекомендации товаров: {changed}'
+        ))
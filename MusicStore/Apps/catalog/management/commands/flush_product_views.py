@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Apps.catalog.product_views import flush_views
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет накопленные просмотры товаров в productviews '
+        '(для общего кеша — все закрытые окна, например по cron)'
+    )
+
+    def handle(self, *args, **options):
+        flush_views()
+        self.stdout.write(self.style.SUCCESS('Просмотры товаров сохранены'))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Apps.catalog.catalog_import import import_catalog, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует товары, бренды, категории, характеристики и изображения из '
+        'прайс-листа CSV или JSONL (ключ товара — артикул sku)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .jsonl')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Формат файла (по умолчанию — по расширению)')
+        parser.add_argument('--encoding', default='utf-8-sig', help='Кодировка файла')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, что изменится, ничего не записывая')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+        )
+        reader = read_jsonl if file_format == 'jsonl' else read_csv
+        started = time.monotonic()
+        try:
+            with open(path, encoding=options['encoding'], newline='') as stream:
+                result = import_catalog(reader(stream), dry_run=options['dry_run'])
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть файл: {exc}')
+        except UnicodeDecodeError as exc:
+            raise CommandError(f'Файл не в кодировке {options["encoding"]}: {exc}')
+
+        for line, message in result.errors[:20]:
+            self.stderr.write(f'  запись {line}: {message}')
+        if len(result.errors) > 20:
+            self.stderr.write(f'  ... и еще ошибок: {len(result.errors) - 20}')
+
+        self.stdout.write(
+            f'Записей принято: {result.rows} (артикулов: {result.unique_skus}), '
+            f'с ошибками: {len(result.errors)}'
+        )
+        self.stdout.write(
+            f'Новых брендов: {result.new_brands}, категорий: {result.new_categories}, '
+            f'товаров: {result.new_products}; изменится товаров: {result.changed_products}'
+        )
+        if result.incomplete:
+            self.stdout.write(
+                f'Пропущено новых товаров без названия, бренда, категории или цены: {result.incomplete}'
+            )
+        for sku, field, old_value, new_value in result.changes:
+            self.stdout.write(f'  {sku}: {field}: {old_value!r} -> {new_value!r}')
+        if result.changed_products > len(result.changes):
+            self.stdout.write('  ...')
+
+        elapsed = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Пробный прогон, ничего не записано ({elapsed:.1f} с)'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено товаров: {result.inserted_products}, обновлено: {result.updated_products}, '
+            f'характеристик: {result.characteristics}, изображений: {result.images} ({elapsed:.1f} с)'
+        ))
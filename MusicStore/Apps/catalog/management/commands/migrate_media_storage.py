@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from Apps.catalog.images import storage_name
+from Apps.catalog.models import Brands, Productimages
+from Apps.catalog.signals import brands_changed, products_changed
+from Apps.catalog.storage import is_content_addressed, media_storage
+
+# (таблица, колонка URL, запрос ID товаров/брендов по списку старых URL)
+_TARGETS = (
+    ('productimages', 'product_images_url',
+     "SELECT DISTINCT product_images_product_id FROM productimages WHERE product_images_url = ANY(%s)"),
+    ('productimagederivatives', 'product_image_derivatives_url',
+     """SELECT DISTINCT i.product_images_product_id
+          FROM productimagederivatives d
+          JOIN productimages i ON i.product_images_id = d.product_image_derivatives_image_id
+         WHERE d.product_image_derivatives_url = ANY(%s)"""),
+    ('brands', 'brands_logo_url',
+     "SELECT DISTINCT brands_id FROM brands WHERE brands_logo_url = ANY(%s)"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит загруженные изображения товаров и логотипы брендов в хранилище '
+        'по содержимому (media/cas) и массово обновляет ссылки на них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать, сколько файлов и ссылок будет перенесено')
+        parser.add_argument('--delete-old', action='store_true',
+                            help='Удалить старые файлы после обновления ссылок')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        urls = set()
+        with connection.cursor() as cursor:
+            for table, column, _ in _TARGETS:
+                cursor.execute(
+                    f"SELECT DISTINCT {column} FROM {table} WHERE {column} LIKE %s",
+                    [settings.MEDIA_URL + '%']
+                )
+                urls.update(
+                    url for (url,) in cursor.fetchall()
+                    if not is_content_addressed(url, settings.MEDIA_URL)
+                )
+
+        mapping = {}
+        missing = 0
+        for url in sorted(urls):
+            name = storage_name(url)
+            if not default_storage.exists(name):
+                if options['verbosity'] > 1:
+                    self.stderr.write(f'  {url}: файл не найден, пропущено')
+                missing += 1
+                continue
+            if dry_run:
+                mapping[url] = None
+                continue
+            with default_storage.open(name, 'rb') as source:
+                mapping[url] = media_storage.url(media_storage.save(name, source))
+
+        if dry_run:
+            self.stdout.write(
+                f'Будет перенесено файлов: {len(mapping)}, не найдено: {missing}'
+            )
+            return
+
+        old_urls = list(mapping)
+        new_urls = [mapping[url] for url in old_urls]
+        product_ids, brand_ids = set(), set()
+        updated = 0
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for table, column, ids_sql in _TARGETS:
+                    cursor.execute(ids_sql, [old_urls])
+                    ids = {row[0] for row in cursor.fetchall()}
+                    (brand_ids if table == 'brands' else product_ids).update(ids)
+                    cursor.execute(
+                        f"""UPDATE {table} AS t SET {column} = m.new_url
+                              FROM unnest(%s::text[], %s::text[]) AS m(old_url, new_url)
+                             WHERE t.{column} = m.old_url""",
+                        [old_urls, new_urls]
+                    )
+                    updated += cursor.rowcount
+
+        if product_ids:
+            products_changed.send(sender=Productimages, product_ids=sorted(product_ids))
+        if brand_ids:
+            brands_changed.send(sender=Brands, brand_ids=sorted(brand_ids))
+
+        deleted = 0
+        if options['delete_old']:
+            for url in old_urls:
+                default_storage.delete(storage_name(url))
+                deleted += 1
+
+        unique = len(set(new_urls))
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {len(old_urls)} (уникальных: {unique}, '
+            f'дубликатов: {len(old_urls) - unique}), обновлено ссылок: {updated}, '
+            f'удалено старых файлов: {deleted}, не найдено: {missing}'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# Индексы повторяют наборы полей сортировки каталога (CATALOG_SORT_OPTIONS),
+# включая направления и NULLS LAST, чтобы keyset-страница читалась
+# с нужной позиции индекса, а не сортировкой всей выборки.
+KEYSET_INDEXES = [
+    ('products_price_name_id_idx', 'products_price, products_name, products_id'),
+    ('products_price_desc_name_id_idx', 'products_price DESC, products_name, products_id'),
+    ('products_name_id_idx', 'products_name, products_id'),
+    ('products_name_desc_id_idx', 'products_name DESC, products_id'),
+    ('products_created_id_idx', 'products_created_at NULLS LAST, products_id'),
+    ('products_created_desc_id_idx', 'products_created_at DESC NULLS LAST, products_id'),
+    ('products_stock_name_id_idx', 'products_stock, products_name, products_id'),
+    ('products_stock_desc_name_id_idx', 'products_stock DESC, products_name, products_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f'CREATE INDEX IF NOT EXISTS {name} ON products ({columns});',
+            reverse_sql=f'DROP INDEX IF EXISTS {name};',
+        )
+        for name, columns in KEYSET_INDEXES
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# Документ собирается так же, как в Apps.catalog.search._DOCUMENT_SQL;
+# здесь он продублирован, чтобы миграция не зависела от кода приложения.
+BACKFILL_SQL = """
+UPDATE products SET products_search_vector =
+    setweight(to_tsvector('russian', coalesce(products_name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(
+        (SELECT brands_name FROM brands WHERE brands_id = products_brand_id), '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(
+        (SELECT categories_name FROM categories WHERE categories_id = products_category_id), '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(
+        (SELECT string_agg(product_characteristics_key || ' ' || product_characteristics_value, ' ')
+           FROM productcharacteristics
+          WHERE product_characteristics_product_id = products_id), '')), 'C')
+    || setweight(to_tsvector('russian', coalesce(products_description, '')), 'D');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_products_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='ALTER TABLE products ADD COLUMN IF NOT EXISTS products_search_vector tsvector;',
+            reverse_sql='ALTER TABLE products DROP COLUMN IF EXISTS products_search_vector;',
+        ),
+        migrations.RunSQL(sql=BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS products_search_vector_gin ON products USING GIN (products_search_vector);',
+            reverse_sql='DROP INDEX IF EXISTS products_search_vector_gin;',
+        ),
+    ]
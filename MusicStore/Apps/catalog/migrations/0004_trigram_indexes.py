@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+TRIGRAM_INDEXES = [
+    ('products_name_trgm', 'products', 'products_name'),
+    ('brands_name_trgm', 'brands', 'brands_name'),
+    ('categories_name_trgm', 'categories', 'categories_name'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_products_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+    ] + [
+        migrations.RunSQL(
+            sql=f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIN ({column} gin_trgm_ops);',
+            reverse_sql=f'DROP INDEX IF EXISTS {name};',
+        )
+        for name, table, column in TRIGRAM_INDEXES
+    ]
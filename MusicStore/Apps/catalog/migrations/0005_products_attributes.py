@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# Нормализация совпадает с Apps.catalog.attributes: нижний регистр, одиночные пробелы
+BACKFILL_SQL = r"""
+UPDATE products SET products_attributes = coalesce(
+    (SELECT jsonb_object_agg(lower(regexp_replace(btrim(product_characteristics_key), '\s+', ' ', 'g')),
+                             lower(regexp_replace(btrim(product_characteristics_value), '\s+', ' ', 'g')))
+       FROM productcharacteristics
+      WHERE product_characteristics_product_id = products_id),
+    '{}'::jsonb);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="ALTER TABLE products ADD COLUMN IF NOT EXISTS products_attributes jsonb NOT NULL DEFAULT '{}'::jsonb;",
+            reverse_sql='ALTER TABLE products DROP COLUMN IF EXISTS products_attributes;',
+        ),
+        migrations.RunSQL(sql=BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS products_attributes_gin ON products USING GIN (products_attributes jsonb_path_ops);',
+            reverse_sql='DROP INDEX IF EXISTS products_attributes_gin;',
+        ),
+    ]
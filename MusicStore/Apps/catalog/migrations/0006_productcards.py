@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS productcards (
+    product_cards_product_id integer PRIMARY KEY REFERENCES products (products_id) ON DELETE CASCADE,
+    product_cards_name varchar(255) NOT NULL,
+    product_cards_price numeric(10, 2) NOT NULL,
+    product_cards_stock integer NOT NULL,
+    product_cards_brand_name varchar(100) NOT NULL,
+    product_cards_category_name varchar(100) NOT NULL,
+    product_cards_image_url varchar(255),
+    product_cards_rating_avg numeric(3, 2),
+    product_cards_reviews_count integer NOT NULL DEFAULT 0,
+    product_cards_updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+"""
+
+# Заполнение выполняет Apps.catalog.cards.refresh_product_cards(); здесь —
+# тот же запрос для всех товаров, чтобы миграция не зависела от кода приложения.
+BACKFILL_SQL = """
+INSERT INTO productcards (
+    product_cards_product_id, product_cards_name, product_cards_price, product_cards_stock,
+    product_cards_brand_name, product_cards_category_name, product_cards_image_url,
+    product_cards_rating_avg, product_cards_reviews_count, product_cards_updated_at
+)
+SELECT p.products_id, p.products_name, p.products_price, p.products_stock,
+       b.brands_name, c.categories_name,
+       (SELECT i.product_images_url FROM productimages i
+         WHERE i.product_images_product_id = p.products_id
+         ORDER BY i.product_images_is_main DESC NULLS LAST, i.product_images_id
+         LIMIT 1),
+       r.rating_avg, r.reviews_count, now()
+  FROM products p
+  JOIN brands b ON b.brands_id = p.products_brand_id
+  JOIN categories c ON c.categories_id = p.products_category_id
+  CROSS JOIN LATERAL (
+      SELECT round(avg(reviews_rating), 2) AS rating_avg, count(*) AS reviews_count
+        FROM reviews
+       WHERE reviews_product_id = p.products_id AND reviews_approved
+  ) r
+ON CONFLICT (product_cards_product_id) DO NOTHING;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_products_attributes'),
+        ('extras', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Productcards',
+            fields=[
+                ('product_cards_product', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='card', serialize=False, to='catalog.products')),
+                ('product_cards_name', models.CharField(max_length=255)),
+                ('product_cards_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('product_cards_stock', models.IntegerField()),
+                ('product_cards_brand_name', models.CharField(max_length=100)),
+                ('product_cards_category_name', models.CharField(max_length=100)),
+                ('product_cards_image_url', models.CharField(blank=True, max_length=255, null=True)),
+                ('product_cards_rating_avg', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('product_cards_reviews_count', models.IntegerField()),
+                ('product_cards_updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'productcards',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql='DROP TABLE IF EXISTS productcards;'),
+        migrations.RunSQL(sql=BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
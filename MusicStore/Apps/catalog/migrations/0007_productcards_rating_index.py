@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс под сортировку каталога «по рейтингу» (rating_desc) и пересчет
+    рейтинга карточек из сводки productratings.
+    """
+
+    dependencies = [
+        ('catalog', '0006_productcards'),
+        ('extras', '0002_productratings'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS productcards_rating_idx ON productcards (
+                    product_cards_rating_avg DESC NULLS LAST,
+                    product_cards_reviews_count DESC NULLS LAST,
+                    product_cards_product_id
+                );
+            """,
+            reverse_sql='DROP INDEX IF EXISTS productcards_rating_idx;',
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE productcards SET
+                    product_cards_rating_avg = round(r.product_ratings_sum::numeric
+                                                     / nullif(r.product_ratings_count, 0), 2),
+                    product_cards_reviews_count = r.product_ratings_count
+                  FROM productratings r
+                 WHERE r.product_ratings_product_id = productcards.product_cards_product_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
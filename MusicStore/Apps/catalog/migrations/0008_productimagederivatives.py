@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS productimagederivatives (
+    product_image_derivatives_id serial PRIMARY KEY,
+    product_image_derivatives_image_id integer NOT NULL
+        REFERENCES productimages (product_images_id) ON DELETE CASCADE,
+    product_image_derivatives_format varchar(10) NOT NULL,
+    product_image_derivatives_width integer NOT NULL,
+    product_image_derivatives_height integer NOT NULL,
+    product_image_derivatives_url varchar(255) NOT NULL,
+    UNIQUE (product_image_derivatives_image_id, product_image_derivatives_format, product_image_derivatives_width)
+);
+ALTER TABLE productcards
+    ADD COLUMN IF NOT EXISTS product_cards_image_webp_srcset text,
+    ADD COLUMN IF NOT EXISTS product_cards_image_jpeg_srcset text;
+"""
+
+REVERSE_SQL = """
+ALTER TABLE productcards
+    DROP COLUMN IF EXISTS product_cards_image_webp_srcset,
+    DROP COLUMN IF EXISTS product_cards_image_jpeg_srcset;
+DROP TABLE IF EXISTS productimagederivatives;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_productcards_rating_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Productimagederivatives',
+            fields=[
+                ('product_image_derivatives_id', models.AutoField(primary_key=True, serialize=False)),
+                ('product_image_derivatives_image', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='derivatives', to='catalog.productimages')),
+                ('product_image_derivatives_format', models.CharField(max_length=10)),
+                ('product_image_derivatives_width', models.IntegerField()),
+                ('product_image_derivatives_height', models.IntegerField()),
+                ('product_image_derivatives_url', models.CharField(max_length=255)),
+            ],
+            options={
+                'db_table': 'productimagederivatives',
+                'managed': False,
+                'unique_together': {('product_image_derivatives_image', 'product_image_derivatives_format', 'product_image_derivatives_width')},
+            },
+        ),
+        migrations.AddField(
+            model_name='productcards',
+            name='product_cards_image_webp_srcset',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productcards',
+            name='product_cards_image_jpeg_srcset',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
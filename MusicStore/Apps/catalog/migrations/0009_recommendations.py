@@ -0,0 +1,97 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS productcooccurrence (
+    product_cooccurrence_id bigserial PRIMARY KEY,
+    product_cooccurrence_product_id integer NOT NULL
+        REFERENCES products (products_id) ON DELETE CASCADE,
+    product_cooccurrence_other_id integer NOT NULL
+        REFERENCES products (products_id) ON DELETE CASCADE,
+    product_cooccurrence_orders integer NOT NULL,
+    UNIQUE (product_cooccurrence_product_id, product_cooccurrence_other_id)
+);
+-- Поиск строк, в которых участвует товар (пересчет соседей)
+CREATE INDEX IF NOT EXISTS productcooccurrence_other_idx
+    ON productcooccurrence (product_cooccurrence_other_id);
+
+CREATE TABLE IF NOT EXISTS productrecommendations (
+    product_recommendations_id bigserial PRIMARY KEY,
+    product_recommendations_product_id integer NOT NULL
+        REFERENCES products (products_id) ON DELETE CASCADE,
+    product_recommendations_recommended_id integer NOT NULL
+        REFERENCES products (products_id) ON DELETE CASCADE,
+    product_recommendations_rank smallint NOT NULL,
+    product_recommendations_score double precision NOT NULL,
+    UNIQUE (product_recommendations_product_id, product_recommendations_rank)
+);
+
+CREATE TABLE IF NOT EXISTS recommendationsstate (
+    recommendations_state_id smallint PRIMARY KEY CHECK (recommendations_state_id = 1),
+    recommendations_state_last_order_id integer NOT NULL,
+    recommendations_state_updated_at timestamp with time zone
+);
+INSERT INTO recommendationsstate (recommendations_state_id, recommendations_state_last_order_id)
+VALUES (1, 0) ON CONFLICT DO NOTHING;
+"""
+
+REVERSE_SQL = """
+DROP TABLE IF EXISTS recommendationsstate;
+DROP TABLE IF EXISTS productrecommendations;
+DROP TABLE IF EXISTS productcooccurrence;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_productimagederivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Productcooccurrence',
+            fields=[
+                ('product_cooccurrence_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_cooccurrence_product', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalog.products')),
+                ('product_cooccurrence_other', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='catalog.products')),
+                ('product_cooccurrence_orders', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'productcooccurrence',
+                'managed': False,
+                'unique_together': {('product_cooccurrence_product', 'product_cooccurrence_other')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Productrecommendations',
+            fields=[
+                ('product_recommendations_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_recommendations_product', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='recommendations', to='catalog.products')),
+                ('product_recommendations_recommended', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='recommended_for', to='catalog.products')),
+                ('product_recommendations_rank', models.SmallIntegerField()),
+                ('product_recommendations_score', models.FloatField()),
+            ],
+            options={
+                'db_table': 'productrecommendations',
+                'managed': False,
+                'unique_together': {('product_recommendations_product', 'product_recommendations_rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Recommendationsstate',
+            fields=[
+                ('recommendations_state_id', models.SmallIntegerField(primary_key=True, serialize=False)),
+                ('recommendations_state_last_order_id', models.IntegerField()),
+                ('recommendations_state_updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'recommendationsstate',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
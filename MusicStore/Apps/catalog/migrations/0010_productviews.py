@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS productviews (
+    product_views_product_id integer PRIMARY KEY
+        REFERENCES products (products_id) ON DELETE CASCADE,
+    product_views_count bigint NOT NULL DEFAULT 0,
+    product_views_updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+-- Сортировка каталога «Популярные» (popular)
+CREATE INDEX IF NOT EXISTS productviews_count_idx
+    ON productviews (product_views_count DESC NULLS LAST, product_views_product_id);
+"""
+
+REVERSE_SQL = "DROP TABLE IF EXISTS productviews;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Productviews',
+            fields=[
+                ('product_views_product', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='views', serialize=False, to='catalog.products')),
+                ('product_views_count', models.BigIntegerField()),
+                ('product_views_updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'productviews',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
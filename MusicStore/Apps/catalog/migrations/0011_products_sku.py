@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Артикул товара: естественный ключ для импорта каталога из прайс-листов
+    (manage.py import_catalog, INSERT ... ON CONFLICT (products_sku)), и
+    индекс изображений по товару: проверка уже загруженных URL при импорте и
+    выбор главного изображения при пересчете карточек.
+    """
+
+    dependencies = [
+        ('catalog', '0010_productviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='products_sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                ALTER TABLE products ADD COLUMN IF NOT EXISTS products_sku varchar(64);
+                CREATE UNIQUE INDEX IF NOT EXISTS products_sku_key ON products (products_sku);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS products_sku_key;
+                ALTER TABLE products DROP COLUMN IF EXISTS products_sku;
+            """,
+        ),
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS productimages_product_url_idx
+                    ON productimages (product_images_product_id, product_images_url);
+            """,
+            reverse_sql='DROP INDEX IF EXISTS productimages_product_url_idx;',
+        ),
+    ]
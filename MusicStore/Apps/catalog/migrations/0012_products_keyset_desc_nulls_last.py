@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# KeysetPaginator сортирует по убыванию с NULLS LAST, а индексы из 0002 для
+# цены, названия и остатка были объявлены просто DESC (то есть NULLS FIRST) —
+# PostgreSQL не мог использовать их для price_desc / name_desc / stock_desc.
+# Пересоздаем их с тем же порядком NULL, что и в ORDER BY.
+DESC_INDEXES = [
+    ('products_price_desc_name_id_idx',
+     'products_price DESC NULLS LAST, products_name, products_id',
+     'products_price DESC, products_name, products_id'),
+    ('products_name_desc_id_idx',
+     'products_name DESC NULLS LAST, products_id',
+     'products_name DESC, products_id'),
+    ('products_stock_desc_name_id_idx',
+     'products_stock DESC NULLS LAST, products_name, products_id',
+     'products_stock DESC, products_name, products_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_products_sku'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f'DROP INDEX IF EXISTS {name}; CREATE INDEX {name} ON products ({columns});',
+            reverse_sql=f'DROP INDEX IF EXISTS {name}; CREATE INDEX {name} ON products ({old_columns});',
+        )
+        for name, columns, old_columns in DESC_INDEXES
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+# Водяной знак max(orders_id) пропускал заказы, зафиксированные позже заказа
+# с большим ID (последовательность выдает ID до фиксации). Теперь учтенные
+# заказы записываются поштучно; уже учтенные по старому знаку переносятся.
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS recommendationsorders (
+    recommendations_orders_order_id integer PRIMARY KEY
+);
+INSERT INTO recommendationsorders (recommendations_orders_order_id)
+SELECT o.orders_id
+FROM orders o
+JOIN recommendationsstate s ON s.recommendations_state_id = 1
+WHERE o.orders_id <= s.recommendations_state_last_order_id
+ON CONFLICT DO NOTHING;
+ALTER TABLE recommendationsstate DROP COLUMN IF EXISTS recommendations_state_last_order_id;
+"""
+
+REVERSE_SQL = """
+ALTER TABLE recommendationsstate
+    ADD COLUMN IF NOT EXISTS recommendations_state_last_order_id integer NOT NULL DEFAULT 0;
+ALTER TABLE recommendationsstate ALTER COLUMN recommendations_state_last_order_id DROP DEFAULT;
+UPDATE recommendationsstate
+SET recommendations_state_last_order_id = (
+    SELECT coalesce(max(recommendations_orders_order_id), 0) FROM recommendationsorders
+);
+DROP TABLE IF EXISTS recommendationsorders;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_products_keyset_desc_nulls_last'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendationsorders',
+            fields=[
+                ('recommendations_orders_order_id', models.IntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'db_table': 'recommendationsorders',
+                'managed': False,
+            },
+        ),
+        migrations.RemoveField(
+            model_name='recommendationsstate',
+            name='recommendations_state_last_order_id',
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# Нечеткий поиск выбирает товары похожих брендов и категорий по их ID
+# (products_brand_id / products_category_id IN (...)); без индексов это
+# последовательный просмотр products.
+CREATE_SQL = """
+CREATE INDEX IF NOT EXISTS products_brand_id_idx ON products (products_brand_id);
+CREATE INDEX IF NOT EXISTS products_category_id_idx ON products (products_category_id);
+"""
+
+REVERSE_SQL = """
+DROP INDEX IF EXISTS products_category_id_idx;
+DROP INDEX IF EXISTS products_brand_id_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_recommendationsorders'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
@@ -61,6 +61,8 @@ class Products(models.Model):
     products_brand = models.ForeignKey(Brands, models.DO_NOTHING)
     products_created_at = models.DateTimeField(blank=True, null=True)
     products_updated_at = models.DateTimeField(blank=True, null=True)
+    # Артикул поставщика — ключ при импорте прайс-листов (import_catalog)
+    products_sku = models.CharField(unique=True, max_length=64, blank=True, null=True)
 
     class Meta:
         managed = False
@@ -101,3 +103,105 @@ class Productcharacteristics(models.Model):
         managed = False
         db_table = 'productcharacteristics'
         unique_together = (('product_characteristics_product', 'product_characteristics_key'),)
+
+
+class Productcards(models.Model):
+    """
+    Карточка товара для списков (read model): все, что нужно для вывода
+    карточки, одной строкой. Поддерживается Apps.catalog.cards.
+    """
+    product_cards_product = models.OneToOneField(Products, models.DO_NOTHING, primary_key=True, related_name='card')
+    product_cards_name = models.CharField(max_length=255)
+    product_cards_price = models.DecimalField(max_digits=10, decimal_places=2)
+    product_cards_stock = models.IntegerField()
+    product_cards_brand_name = models.CharField(max_length=100)
+    product_cards_category_name = models.CharField(max_length=100)
+    product_cards_image_url = models.CharField(max_length=255, blank=True, null=True)
+    product_cards_image_webp_srcset = models.TextField(blank=True, null=True)
+    product_cards_image_jpeg_srcset = models.TextField(blank=True, null=True)
+    product_cards_rating_avg = models.DecimalField(max_digits=3, decimal_places=2, blank=True, null=True)
+    product_cards_reviews_count = models.IntegerField()
+    product_cards_updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'productcards'
+
+
+class Productimagederivatives(models.Model):
+    """
+    Уменьшенная копия изображения товара (WebP или JPEG заданной ширины).
+    Создается в фоне Apps.catalog.images после загрузки оригинала.
+    """
+    product_image_derivatives_id = models.AutoField(primary_key=True)
+    product_image_derivatives_image = models.ForeignKey(Productimages, models.DO_NOTHING, related_name='derivatives')
+    product_image_derivatives_format = models.CharField(max_length=10)
+    product_image_derivatives_width = models.IntegerField()
+    product_image_derivatives_height = models.IntegerField()
+    product_image_derivatives_url = models.CharField(max_length=255)
+
+    class Meta:
+        managed = False
+        db_table = 'productimagederivatives'
+        unique_together = (('product_image_derivatives_image', 'product_image_derivatives_format', 'product_image_derivatives_width'),)
+
+
+class Productcooccurrence(models.Model):
+    """
+    Число заказов, в которых товары купили вместе (разреженная матрица
+    совместных покупок, диагональ — число заказов с товаром).
+    Поддерживается Apps.catalog.recommendations.
+    """
+    product_cooccurrence_id = models.BigAutoField(primary_key=True)
+    product_cooccurrence_product = models.ForeignKey(Products, models.DO_NOTHING, related_name='+')
+    product_cooccurrence_other = models.ForeignKey(Products, models.DO_NOTHING, related_name='+')
+    product_cooccurrence_orders = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'productcooccurrence'
+        unique_together = (('product_cooccurrence_product', 'product_cooccurrence_other'),)
+
+
+class Productrecommendations(models.Model):
+    """Лучшие соседи товара по совместным покупкам («С этим товаром покупают»)."""
+    product_recommendations_id = models.BigAutoField(primary_key=True)
+    product_recommendations_product = models.ForeignKey(Products, models.DO_NOTHING, related_name='recommendations')
+    product_recommendations_recommended = models.ForeignKey(Products, models.DO_NOTHING, related_name='recommended_for')
+    product_recommendations_rank = models.SmallIntegerField()
+    product_recommendations_score = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'productrecommendations'
+        unique_together = (('product_recommendations_product', 'product_recommendations_rank'),)
+
+
+class Recommendationsstate(models.Model):
+    """Состояние расчета рекомендаций: время последнего запуска (одна строка)."""
+    recommendations_state_id = models.SmallIntegerField(primary_key=True)
+    recommendations_state_updated_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'recommendationsstate'
+
+
+class Recommendationsorders(models.Model):
+    """Заказы, уже учтенные в матрице совместных покупок."""
+    recommendations_orders_order_id = models.IntegerField(primary_key=True)
+
+    class Meta:
+        managed = False
+        db_table = 'recommendationsorders'
+
+
+class Productviews(models.Model):
+    """Счетчик просмотров страницы товара (сбрасывается пачками Apps.catalog.product_views)."""
+    product_views_product = models.OneToOneField(Products, models.DO_NOTHING, primary_key=True, related_name='views')
+    product_views_count = models.BigIntegerField()
+    product_views_updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'productviews'
@@ -0,0 +1,228 @@
+"""
+Кеш целых страниц для анонимных посетителей (главная, каталог, товар).
+
+Ключ — путь и нормализованная строка запроса. Страница кешируется только
+для анонимного GET-запроса без ожидающих сообщений (messages). Каждая
+запись помечена тегами (товар, категория, бренд, «списки») вместе с
+версиями тегов на момент построения; сброс тега — это увеличение его версии
+(см. versions.py), после чего все записи с этим тегом считаются устаревшими,
+а остальные продолжают отдаваться из кеша.
+
+Списки помечены товарами, которые на них показаны, а состав списка —
+категорией или брендом, которыми он ограничен (или CATALOG_TAG для списков
+по всему каталогу). Изменение товара сбрасывает его страницу, списки с ним,
+списки его категории (с предками) и бренда и списки по всему каталогу;
+списки других категорий и брендов остаются в кеше. Keyset-страницы не
+сдвигаются при удалении товара, поэтому новому товару достаточно сбросить
+списки, в которые он попадает.
+
+CSRF-токен в закешированной странице заменяется заглушкой и при выдаче
+подставляется заново для текущего посетителя.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from Apps.extras.signals import reviews_changed
+from .category_tree import get_category_tree
+from .models import Products
+from .signals import (
+    products_changed, brands_changed, categories_changed, recommendations_changed, stock_changed,
+)
+from .versions import get_version, get_versions, bump_version
+
+PAGE_CACHE_TIMEOUT = 60 * 15
+
+# Все списки товаров (главная, каталог): показывают названия категорий и
+# брендов в меню и фильтрах, поэтому сбрасываются при их изменении
+LISTING_TAG = 'listing'
+
+# Списки по всему каталогу (главная, каталог без категории и бренда): их
+# состав, порядок и счетчики фасетов зависят от любого товара
+CATALOG_TAG = 'catalog'
+
+# Параметры, не влияющие на содержимое страницы
+_IGNORED_PARAMS = {'fbclid', 'gclid', 'yclid'}
+
+_CSRF_PLACEHOLDER = '__page_cache_csrf_token__'
+_CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def product_tag(product_id):
+    return f'product:{product_id}'
+
+
+def category_tag(category_id):
+    return f'category:{category_id}'
+
+
+def brand_tag(brand_id):
+    return f'brand:{brand_id}'
+
+
+def category_listing_tag(category_id):
+    """Списки, ограниченные категорией (вместе с подкатегориями)."""
+    return f'category-listing:{category_id}'
+
+
+def brand_listing_tag(brand_id):
+    """Списки, ограниченные брендом."""
+    return f'brand-listing:{brand_id}'
+
+
+def _version_name(tag):
+    return f'page:{tag}'
+
+
+def add_page_tags(request, *tags):
+    """
+    Помечает строящуюся страницу тегами. Версии тегов запоминаются сразу,
+    поэтому вызывать нужно до чтения данных, от которых зависит страница.
+    """
+    page_tags = getattr(request, '_page_cache_tags', None)
+    if page_tags is None or not tags:
+        return
+    versions = get_versions(*(_version_name(tag) for tag in tags))
+    for tag in tags:
+        page_tags.setdefault(tag, versions[_version_name(tag)])
+
+
+def page_tag_version(tag):
+    """Текущая версия тега; меняется при каждом сбросе страниц с ним."""
+    return get_version(_version_name(tag))
+
+
+def purge_page_tags(*tags):
+    """Сбрасывает закешированные страницы с любым из тегов."""
+    for tag in tags:
+        bump_version(_version_name(tag))
+
+
+def _cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # len() не помечает сообщения прочитанными
+    return len(get_messages(request)) == 0
+
+
+def _page_key(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value and key not in _IGNORED_PARAMS and not key.startswith('utm_')
+    )
+    signature = repr((request.path, params))
+    return 'catalog:page:' + hashlib.md5(signature.encode('utf-8')).hexdigest()
+
+
+def _is_fresh(entry):
+    tags = entry['tags']
+    if not tags:
+        return True
+    current = get_versions(*(_version_name(tag) for tag in tags))
+    return all(current[_version_name(tag)] == version for tag, version in tags.items())
+
+
+def _store(request, key, response, timeout):
+    if request.method != 'GET' or response.status_code != 200:
+        return
+    if response.streaming or response.cookies:
+        return
+    content = response.content.decode(response.charset)
+    match = _CSRF_INPUT_RE.search(content)
+    if match:
+        content = content.replace(match.group(1), _CSRF_PLACEHOLDER)
+    entry = {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'tags': request._page_cache_tags,
+    }
+    cache.set(key, entry, timeout)
+
+
+def _cached_response(request, entry):
+    content = entry['content']
+    if _CSRF_PLACEHOLDER in content:
+        content = content.replace(_CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def anonymous_page_cache(timeout=PAGE_CACHE_TIMEOUT):
+    """
+    Декоратор представления: отдает анонимным посетителям страницу из кеша,
+    если ни один из ее тегов не сброшен. Теги задает само представление
+    через add_page_tags().
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable_request(request):
+                return view(request, *args, **kwargs)
+            key = _page_key(request)
+            entry = cache.get(key)
+            if entry is not None and _is_fresh(entry):
+                return _cached_response(request, entry)
+            request._page_cache_tags = {}
+            response = view(request, *args, **kwargs)
+            _store(request, key, response, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def _product_tags(product_ids):
+    """Теги страниц, на которые влияет товар: его страница и списки, куда он входит."""
+    tags = {CATALOG_TAG, *(product_tag(pid) for pid in product_ids)}
+    rows = Products.objects.filter(pk__in=product_ids).values_list(
+        'products_category_id', 'products_brand_id'
+    )
+    tree = get_category_tree()
+    for category_id, brand_id in rows:
+        tags.add(brand_listing_tag(brand_id))
+        # Список категории включает товары подкатегорий
+        tags.add(category_listing_tag(category_id))
+        tags.update(category_listing_tag(node.id) for node in tree.path(category_id))
+    return tags
+
+
+@receiver(products_changed)
+def _on_products_changed(sender, product_ids, **kwargs):
+    purge_page_tags(*_product_tags(product_ids))
+
+
+@receiver(stock_changed)
+def _on_stock_changed(sender, product_ids, **kwargs):
+    purge_page_tags(*(product_tag(pid) for pid in product_ids))
+
+
+@receiver(categories_changed)
+def _on_categories_changed(sender, category_ids, **kwargs):
+    purge_page_tags(LISTING_TAG, *(category_tag(cid) for cid in category_ids))
+
+
+@receiver(brands_changed)
+def _on_brands_changed(sender, brand_ids, **kwargs):
+    purge_page_tags(LISTING_TAG, *(brand_tag(bid) for bid in brand_ids))
+
+
+@receiver(recommendations_changed)
+def _on_recommendations_changed(sender, product_ids, **kwargs):
+    # Рекомендации показываются только на странице самого товара
+    purge_page_tags(*(product_tag(pid) for pid in product_ids))
+
+
+@receiver(reviews_changed)
+def _on_reviews_changed(sender, product_ids, **kwargs):
+    # Рейтинг меняет карточки и сортировку по рейтингу в списках товара
+    purge_page_tags(*_product_tags(product_ids))
@@ -0,0 +1,182 @@
+"""
+Keyset (seek) пагинация для списков каталога.
+
+В отличие от OFFSET, каждая страница выбирается условием «строго после
+последней строки предыдущей страницы», поэтому стоимость запроса не зависит
+от номера страницы и размера каталога. Курсор — подписанный список значений
+полей сортировки последней строки страницы.
+"""
+import operator
+from functools import reduce
+
+from django.core import signing
+from django.db.models import F, Q
+from django.db.models.fields.reverse_related import ForeignObjectRel
+
+
+class InvalidCursor(Exception):
+    """Курсор поврежден или не соответствует сортировке."""
+
+
+class KeysetPage:
+    """Одна страница выборки: объекты, курсор следующей страницы и флаг ее наличия."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по набору полей сортировки.
+
+    ordering — список полей в нотации order_by ('-products_price', 'products_name', ...).
+    Последним должно идти уникальное поле; если его нет, добавляется первичный ключ.
+    NULL-значения всегда располагаются в конце, независимо от направления.
+    """
+
+    def __init__(self, ordering, per_page, salt):
+        self.ordering = [ordering] if isinstance(ordering, str) else list(ordering)
+        self.per_page = per_page
+        self.salt = salt
+
+    def _columns(self, queryset):
+        model = queryset.model
+        ordering = list(self.ordering)
+        pk_name = model._meta.pk.name
+        if ordering[-1].lstrip('-') not in (pk_name, 'pk'):
+            ordering.append(pk_name)
+        columns = []
+        for item in ordering:
+            path = item.lstrip('-')
+            annotation = queryset.query.annotations.get(path)
+            if annotation is not None:
+                # Сортировка по аннотации (например, релевантности поиска)
+                field, nullable = annotation.output_field, True
+            else:
+                field, nullable = _resolve_field(model, path)
+            columns.append((path, item.startswith('-'), field, nullable))
+        return columns
+
+    def encode_cursor(self, values):
+        return signing.dumps([_to_json(v) for v in values], salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor, columns):
+        try:
+            raw = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature as exc:
+            raise InvalidCursor(str(exc)) from exc
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise InvalidCursor('Cursor does not match ordering')
+        values = []
+        for value, (_, _, field, _) in zip(raw, columns):
+            if value is None:
+                values.append(None)
+                continue
+            try:
+                values.append(field.to_python(value))
+            except Exception as exc:
+                raise InvalidCursor(str(exc)) from exc
+        return values
+
+    def paginate(self, queryset, cursor=None):
+        """Возвращает KeysetPage для страницы, следующей за cursor (или первой)."""
+        columns = self._columns(queryset)
+        aliases = {f'_keyset_{i}': F(path) for i, (path, _, _, _) in enumerate(columns)}
+        order = [
+            F(path).desc(nulls_last=True) if desc else F(path).asc(nulls_last=True)
+            for path, desc, _, _ in columns
+        ]
+        queryset = queryset.annotate(**aliases).order_by(*order)
+        if cursor:
+            values = self.decode_cursor(cursor, columns)
+            queryset = queryset.filter(_seek_condition(columns, values))
+
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(
+                [getattr(last, name) for name in aliases]
+            )
+        return KeysetPage(rows, next_cursor)
+
+
+def _resolve_field(model, path):
+    """Находит конечное поле по пути с '__' и определяет, может ли оно быть NULL."""
+    nullable = False
+    field = None
+    for part in path.split('__'):
+        field = model._meta.get_field(part)
+        if isinstance(field, ForeignObjectRel):
+            # Обратная связь — LEFT JOIN, значения могут отсутствовать
+            nullable = True
+            model = field.related_model
+            field = model._meta.pk
+            continue
+        nullable = nullable or field.null
+        if field.is_relation:
+            model = field.related_model
+    return field, nullable
+
+
+def _after(path, desc, nullable, value):
+    """Условие «значение поля идет после value» при NULLS LAST."""
+    if value is None:
+        # После NULL идут только NULL, строгого «после» не существует
+        return None
+    condition = Q(**{f'{path}__lt' if desc else f'{path}__gt': value})
+    if nullable:
+        condition |= Q(**{f'{path}__isnull': True})
+    return condition
+
+
+def _equal(path, value):
+    if value is None:
+        return Q(**{f'{path}__isnull': True})
+    return Q(**{path: value})
+
+
+def _seek_condition(columns, values):
+    """
+    Строит (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... с учетом направлений.
+    Первое поле дополнительно ограничивается нестрогим условием, чтобы
+    PostgreSQL мог начать сканирование индекса сразу с нужной позиции.
+    """
+    terms = []
+    prefix = Q()
+    for (path, desc, _, nullable), value in zip(columns, values):
+        after = _after(path, desc, nullable, value)
+        if after is not None:
+            terms.append(prefix & after)
+        prefix &= _equal(path, value)
+    if not terms:
+        return Q(pk__in=[])
+    expansion = reduce(operator.or_, terms)
+
+    path, desc, _, nullable = columns[0]
+    lead = values[0]
+    if lead is None:
+        return Q(**{f'{path}__isnull': True}) & expansion
+    if not nullable:
+        return Q(**{f'{path}__lte' if desc else f'{path}__gte': lead}) & expansion
+    return expansion
+
+
+def _to_json(value):
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,181 @@
+"""
+Счетчики просмотров страниц товаров.
+
+Просмотр не пишется в БД сразу: UPDATE на каждый запрос выстраивал бы
+очередь на блокировке строки популярного товара. Просмотры копятся в
+буфере и периодически (PRODUCT_VIEWS_FLUSH_INTERVAL секунд) сбрасываются в
+productviews одним многострочным upsert.
+
+Буфер выбирается настройкой PRODUCT_VIEWS_BUFFER:
+    'local' — счетчики в памяти процесса (по умолчанию), каждый процесс
+              сбрасывает свои;
+    'cache' — счетчики в общем кеше (Redis): процессы увеличивают общие
+              ключи окна времени, а закрытое окно сбрасывает тот процесс,
+              который первым его «забрал». Запросов к БД меньше, чем
+              процессов.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_VIEWS_BUFFER = getattr(settings, 'PRODUCT_VIEWS_BUFFER', 'local')
+PRODUCT_VIEWS_FLUSH_INTERVAL = getattr(settings, 'PRODUCT_VIEWS_FLUSH_INTERVAL', 30)
+# Сброс локального буфера раньше срока, если в нем столько разных товаров
+PRODUCT_VIEWS_FLUSH_SIZE = 1000
+# Сколько закрытых окон общего кеша хранится на случай простоя процессов
+CACHE_WINDOWS_KEPT = 10
+
+_UPSERT_SQL = """
+INSERT INTO productviews (product_views_product_id, product_views_count, product_views_updated_at)
+SELECT v.product_id, v.views, now()
+FROM unnest(%s::int[], %s::bigint[]) AS v(product_id, views)
+JOIN products p ON p.products_id = v.product_id
+ON CONFLICT (product_views_product_id) DO UPDATE SET
+    product_views_count = productviews.product_views_count + EXCLUDED.product_views_count,
+    product_views_updated_at = EXCLUDED.product_views_updated_at
+"""
+
+
+def write_views(counts):
+    """Прибавляет просмотры {product_id: число} одним запросом; удаленные товары пропускаются."""
+    if not counts:
+        return
+    # Одинаковый порядок строк во всех процессах — без взаимных блокировок
+    product_ids = sorted(counts)
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SQL, [product_ids, [counts[pid] for pid in product_ids]])
+
+
+class LocalViewBuffer:
+    """Буфер просмотров в памяти процесса."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, product_id):
+        with self._lock:
+            self._counts[product_id] += 1
+            due = (len(self._counts) >= PRODUCT_VIEWS_FLUSH_SIZE
+                   or time.monotonic() - self._last_flush >= PRODUCT_VIEWS_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        try:
+            write_views(counts)
+        except DatabaseError:
+            logger.exception('Не удалось сохранить просмотры товаров')
+            # Возвращаем просмотры в буфер — попробуем при следующем сбросе
+            with self._lock:
+                self._counts.update(counts)
+
+
+class CacheViewBuffer:
+    """
+    Буфер просмотров в общем кеше. Время делится на окна по
+    PRODUCT_VIEWS_FLUSH_INTERVAL секунд; в окне для товара хранится счетчик,
+    а список товаров окна — пронумерованными ключами.
+    """
+    _PREFIX = 'catalog:views:{}'
+    _FLUSHED_KEY = 'catalog:views:flushed'
+
+    def __init__(self):
+        self._checked_window = None
+        self._timeout = PRODUCT_VIEWS_FLUSH_INTERVAL * (CACHE_WINDOWS_KEPT + 2)
+
+    def _window(self):
+        return int(time.time() // PRODUCT_VIEWS_FLUSH_INTERVAL)
+
+    def add(self, product_id):
+        window = self._window()
+        prefix = self._PREFIX.format(window)
+        key = f'{prefix}:{product_id}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, self._timeout):
+                # Первый просмотр товара в окне — регистрируем товар
+                cache.add(f'{prefix}:n', 0, self._timeout)
+                index = cache.incr(f'{prefix}:n')
+                cache.set(f'{prefix}:id:{index}', product_id, self._timeout)
+            else:
+                cache.incr(key)
+        if self._checked_window != window:
+            self._checked_window = window
+            self.flush(before=window - 1)
+
+    def flush(self, before=None):
+        """Сбрасывает закрытые окна (номер < before; по умолчанию — все, кроме текущего)."""
+        if before is None:
+            before = self._window()
+        flushed = cache.get(self._FLUSHED_KEY) or 0
+        for window in range(max(flushed + 1, before - CACHE_WINDOWS_KEPT), before):
+            prefix = self._PREFIX.format(window)
+            # Окно сбрасывает только один процесс
+            if not cache.add(f'{prefix}:lock', 1, self._timeout):
+                continue
+            size = cache.get(f'{prefix}:n') or 0
+            id_keys = [f'{prefix}:id:{index}' for index in range(1, size + 1)]
+            product_ids = list(cache.get_many(id_keys).values())
+            count_keys = {f'{prefix}:{pid}': pid for pid in product_ids}
+            counts = {count_keys[key]: value for key, value in cache.get_many(count_keys).items()}
+            try:
+                write_views(counts)
+            except DatabaseError:
+                logger.exception('Не удалось сохранить просмотры товаров')
+                cache.delete(f'{prefix}:lock')
+                return
+            cache.delete_many(id_keys + list(count_keys) + [f'{prefix}:n'])
+            cache.set(self._FLUSHED_KEY, max(window, cache.get(self._FLUSHED_KEY) or 0), None)
+
+
+_buffer = CacheViewBuffer() if PRODUCT_VIEWS_BUFFER == 'cache' else LocalViewBuffer()
+
+
+def record_view(product_id):
+    """Учитывает просмотр товара (без обращения к БД, кроме периодического сброса)."""
+    try:
+        _buffer.add(product_id)
+    except Exception:
+        # Счетчик не должен ломать страницу товара
+        logger.exception('Не удалось учесть просмотр товара %s', product_id)
+
+
+def flush_views():
+    """Принудительно сбрасывает накопленные просмотры."""
+    _buffer.flush()
+
+
+def count_product_view(view):
+    """
+    Декоратор страницы товара: учитывает просмотр, в том числе ответы из
+    кеша страниц и 304, поэтому ставится над остальными декораторами.
+    """
+    @wraps(view)
+    def wrapper(request, product_id, *args, **kwargs):
+        response = view(request, product_id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record_view(product_id)
+        return response
+    return wrapper
+
+
+@atexit.register
+def _flush_on_exit():
+    # Локальный буфер дописываем при остановке процесса
+    if isinstance(_buffer, LocalViewBuffer):
+        _buffer.flush()
@@ -0,0 +1,214 @@
+"""
+«С этим товаром покупают»: рекомендации по совместным покупкам.
+
+Из неотмененных заказов (orderitems) строится разреженная матрица
+совместных покупок productcooccurrence: строка (p, q) — число заказов, где
+есть оба товара, диагональ (p, p) — число заказов с товаром p. Вся матрица
+считается в PostgreSQL одним самосоединением корзин с GROUP BY, без
+выгрузки заказов в Python.
+
+Близость товаров — косинусная мера n(p, q) / sqrt(n(p) * n(q)). В отличие
+от lift она не зависит от общего числа заказов, поэтому при дозагрузке
+новых заказов достаточно пересчитать только строки товаров из этих заказов
+и их соседей. Для каждого товара в productrecommendations хранится
+RECOMMENDATIONS_TOP_K лучших соседей, и страница читает их одним запросом
+по индексу (product_id, rank).
+
+Расчет запускается командой manage.py build_recommendations: по умолчанию
+учитываются только еще не учтенные заказы, --full пересчитывает матрицу
+заново (заодно исключает заказы, отмененные после учета). Учтенные заказы
+записываются в recommendationsorders поштучно, а не водяным знаком по ID:
+ID заказа выдается до фиксации транзакции, и заказ с меньшим ID может
+появиться уже после запуска, который учел заказы с большими ID.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .cards import with_cards
+from .models import Products, Productrecommendations
+from .signals import recommendations_changed
+
+RECOMMENDATIONS_TOP_K = getattr(settings, 'RECOMMENDATIONS_TOP_K', 8)
+# Минимум совместных заказов, чтобы пара попала в рекомендации
+RECOMMENDATIONS_MIN_ORDERS = getattr(settings, 'RECOMMENDATIONS_MIN_ORDERS', 2)
+# Сколько строк матрицы пересчитывать за один запрос
+RESCORE_BATCH_SIZE = 1000
+
+_CANCELLED_CONDITION = "translate(lower(s.order_statuses_name), 'ё', 'е') LIKE '%%отмен%%'"
+
+# Неучтенные заказы помечаются учтенными (отмененные тоже — как и раньше, они
+# не попадают в матрицу), их корзины (товар учитывается в заказе один раз)
+# -> приращения матрицы
+_ACCUMULATE_SQL = f"""
+WITH new_orders AS (
+    INSERT INTO recommendationsorders (recommendations_orders_order_id)
+    SELECT o.orders_id
+    FROM orders o
+    WHERE NOT EXISTS (
+        SELECT 1 FROM recommendationsorders r WHERE r.recommendations_orders_order_id = o.orders_id
+    )
+    RETURNING recommendations_orders_order_id AS order_id
+), baskets AS (
+    SELECT DISTINCT oi.order_items_order_id AS order_id, oi.order_items_product_id AS product_id
+    FROM new_orders n
+    JOIN orders o ON o.orders_id = n.order_id
+    JOIN orderstatuses s ON s.order_statuses_id = o.orders_status_id
+    JOIN orderitems oi ON oi.order_items_order_id = o.orders_id
+    WHERE NOT ({_CANCELLED_CONDITION})
+), pairs AS (
+    INSERT INTO productcooccurrence (
+        product_cooccurrence_product_id, product_cooccurrence_other_id, product_cooccurrence_orders
+    )
+    SELECT a.product_id, b.product_id, count(*)
+    FROM baskets a
+    JOIN baskets b ON b.order_id = a.order_id
+    GROUP BY a.product_id, b.product_id
+    ON CONFLICT (product_cooccurrence_product_id, product_cooccurrence_other_id) DO UPDATE
+        SET product_cooccurrence_orders =
+            productcooccurrence.product_cooccurrence_orders + EXCLUDED.product_cooccurrence_orders
+    RETURNING 1
+)
+SELECT (SELECT count(DISTINCT order_id) FROM baskets),
+       (SELECT coalesce(array_agg(DISTINCT product_id), '{{}}') FROM baskets),
+       (SELECT count(*) FROM pairs)
+"""
+
+_RESCORE_SQL = """
+WITH scored AS (
+    SELECT c.product_cooccurrence_product_id AS product_id,
+           c.product_cooccurrence_other_id AS recommended_id,
+           c.product_cooccurrence_orders / sqrt(dp.product_cooccurrence_orders::float8
+                                                * dq.product_cooccurrence_orders) AS score
+    FROM productcooccurrence c
+    JOIN productcooccurrence dp
+      ON dp.product_cooccurrence_product_id = c.product_cooccurrence_product_id
+     AND dp.product_cooccurrence_other_id = c.product_cooccurrence_product_id
+    JOIN productcooccurrence dq
+      ON dq.product_cooccurrence_product_id = c.product_cooccurrence_other_id
+     AND dq.product_cooccurrence_other_id = c.product_cooccurrence_other_id
+    WHERE c.product_cooccurrence_product_id = ANY(%s)
+      AND c.product_cooccurrence_other_id <> c.product_cooccurrence_product_id
+      AND c.product_cooccurrence_orders >= %s
+), ranked AS (
+    SELECT product_id, recommended_id, score,
+           row_number() OVER (PARTITION BY product_id ORDER BY score DESC, recommended_id) AS rank
+    FROM scored
+)
+INSERT INTO productrecommendations (
+    product_recommendations_product_id, product_recommendations_recommended_id,
+    product_recommendations_rank, product_recommendations_score
+)
+SELECT product_id, recommended_id, rank, score
+FROM ranked
+WHERE rank <= %s
+"""
+
+_CURRENT_SQL = """
+SELECT product_recommendations_product_id,
+       array_agg(product_recommendations_recommended_id ORDER BY product_recommendations_rank)
+FROM productrecommendations
+WHERE product_recommendations_product_id = ANY(%s)
+GROUP BY product_recommendations_product_id
+"""
+
+
+def _current(cursor, product_ids):
+    cursor.execute(_CURRENT_SQL, [product_ids])
+    return dict(cursor.fetchall())
+
+
+def _rescore(cursor, product_ids):
+    """Пересчитывает рекомендации товаров; возвращает ID, у которых они изменились."""
+    changed = []
+    for start in range(0, len(product_ids), RESCORE_BATCH_SIZE):
+        batch = product_ids[start:start + RESCORE_BATCH_SIZE]
+        before = _current(cursor, batch)
+        cursor.execute(
+            "DELETE FROM productrecommendations WHERE product_recommendations_product_id = ANY(%s)",
+            [batch]
+        )
+        cursor.execute(_RESCORE_SQL, [batch, RECOMMENDATIONS_MIN_ORDERS, RECOMMENDATIONS_TOP_K])
+        after = _current(cursor, batch)
+        changed.extend(pid for pid in batch if before.get(pid) != after.get(pid))
+    return changed
+
+
+def build_recommendations(full=False):
+    """
+    Учитывает еще не учтенные заказы (или все при full=True) и
+    пересчитывает рекомендации затронутых товаров.
+    Возвращает (число учтенных заказов, число товаров с новыми рекомендациями).
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Блокировка строки состояния не дает двум запускам учесть заказы дважды
+            cursor.execute(
+                """INSERT INTO recommendationsstate (recommendations_state_id) VALUES (1)
+                   ON CONFLICT DO NOTHING"""
+            )
+            cursor.execute(
+                "SELECT 1 FROM recommendationsstate WHERE recommendations_state_id = 1 FOR UPDATE"
+            )
+            if full:
+                cursor.execute("TRUNCATE productcooccurrence, recommendationsorders")
+
+            cursor.execute(_ACCUMULATE_SQL, [])
+            orders_count, touched, _ = cursor.fetchone()
+
+            if full:
+                cursor.execute(
+                    """SELECT DISTINCT product_recommendations_product_id FROM productrecommendations
+                       UNION
+                       SELECT product_cooccurrence_product_id FROM productcooccurrence"""
+                )
+                rescore_ids = [r[0] for r in cursor.fetchall()]
+            elif touched:
+                # Новые заказы меняют n(q) у затронутых товаров, а значит и
+                # оценки во всех строках, где они встречаются
+                cursor.execute(
+                    """SELECT DISTINCT product_cooccurrence_product_id FROM productcooccurrence
+                       WHERE product_cooccurrence_other_id = ANY(%s)""",
+                    [touched]
+                )
+                rescore_ids = [r[0] for r in cursor.fetchall()]
+            else:
+                rescore_ids = []
+            changed = _rescore(cursor, sorted(rescore_ids))
+
+            cursor.execute(
+                """UPDATE recommendationsstate SET recommendations_state_updated_at = now()
+                   WHERE recommendations_state_id = 1"""
+            )
+        if changed:
+            # Сбрасываются только страницы этих товаров (кеш, ETag)
+            recommendations_changed.send(sender=Productrecommendations, product_ids=changed)
+    return orders_count, len(changed)
+
+
+def get_recommendations(product_id, limit=RECOMMENDATIONS_TOP_K):
+    """Товары в наличии, которые покупают вместе с product_id (с карточками)."""
+    return list(
+        with_cards(Products.objects.filter(
+            recommended_for__product_recommendations_product_id=product_id,
+            products_stock__gt=0,
+        )).order_by('recommended_for__product_recommendations_rank')[:limit]
+    )
+
+
+def get_cart_recommendations(product_ids, limit=RECOMMENDATIONS_TOP_K):
+    """
+    Рекомендации для набора товаров (корзина): оценки соседей всех товаров
+    суммируются, сами товары набора исключаются.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+    return list(
+        with_cards(Products.objects.filter(
+            recommended_for__product_recommendations_product_id__in=product_ids,
+            products_stock__gt=0,
+        ).exclude(products_id__in=product_ids))
+        .annotate(recommendation_score=Sum('recommended_for__product_recommendations_score'))
+        .order_by('-recommendation_score', 'products_id')[:limit]
+    )
@@ -0,0 +1,108 @@
+"""
+Полнотекстовый поиск по товарам (PostgreSQL, конфигурация russian).
+
+Поисковый документ хранится в колонке products.products_search_vector
+(GIN-индекс) и собирается из названия, бренда, категории, характеристик и
+описания с разными весами. Документ пересчитывается точечно — только для
+товаров, затронутых изменением, — по сигналам каталога.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from django.dispatch import receiver
+
+from .signals import products_changed, categories_changed, brands_changed
+
+SEARCH_CONFIG = 'russian'
+
+# Веса: A — название и бренд, B — категория, C — характеристики, D — описание
+_DOCUMENT_SQL = """
+UPDATE products SET products_search_vector =
+    setweight(to_tsvector('russian', coalesce(products_name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(
+        (SELECT brands_name FROM brands WHERE brands_id = products_brand_id), '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(
+        (SELECT categories_name FROM categories WHERE categories_id = products_category_id), '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(
+        (SELECT string_agg(product_characteristics_key || ' ' || product_characteristics_value, ' ')
+           FROM productcharacteristics
+          WHERE product_characteristics_product_id = products_id), '')), 'C')
+    || setweight(to_tsvector('russian', coalesce(products_description, '')), 'D')
+WHERE {where}
+"""
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def refresh_search_documents(product_ids=None, category_ids=None, brand_ids=None):
+    """
+    Пересчитывает поисковый документ для товаров из переданных наборов ID.
+    Без аргументов пересчитывает весь каталог.
+    """
+    conditions = []
+    params = []
+    for column, ids in (
+        ('products_id', product_ids),
+        ('products_category_id', category_ids),
+        ('products_brand_id', brand_ids),
+    ):
+        if ids:
+            conditions.append(f'{column} = ANY(%s)')
+            params.append(list(ids))
+    if not conditions:
+        if product_ids is not None or category_ids is not None or brand_ids is not None:
+            return 0
+        conditions.append('TRUE')
+    with connection.cursor() as cursor:
+        cursor.execute(_DOCUMENT_SQL.format(where=' OR '.join(conditions)), params)
+        return cursor.rowcount
+
+
+def build_search_query(text):
+    """
+    Превращает пользовательский ввод в tsquery: все слова обязательны,
+    каждое ищется по префиксу (чтобы «гита» находило «гитара»).
+    Возвращает None, если в строке нет ни одного слова.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    raw = ' & '.join(f"'{word}':*" for word in words)
+    return SearchQuery(raw, config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_products(queryset, text):
+    """
+    Фильтрует queryset товаров по поисковому запросу и добавляет
+    аннотацию search_rank (ts_rank) для сортировки по релевантности.
+    """
+    query = build_search_query(text)
+    if query is None:
+        # Аннотация нужна и пустой выборке: по ней строится сортировка
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+    vector = RawSQL('products.products_search_vector', [], output_field=SearchVectorField())
+    return (queryset
+            .alias(search_vector=vector)
+            .filter(search_vector=query)
+            # ts_rank возвращает real; приводим к double precision, чтобы значение
+            # в keyset-курсоре без потерь сравнивалось с пересчитанным рангом
+            .annotate(search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())))
+
+
+@receiver(products_changed)
+def _on_products_changed(sender, product_ids, **kwargs):
+    refresh_search_documents(product_ids=product_ids)
+
+
+@receiver(categories_changed)
+def _on_categories_changed(sender, category_ids, **kwargs):
+    refresh_search_documents(category_ids=category_ids)
+
+
+@receiver(brands_changed)
+def _on_brands_changed(sender, brand_ids, **kwargs):
+    refresh_search_documents(brand_ids=brand_ids)
@@ -0,0 +1,60 @@
+"""
+Сигналы об изменении данных каталога.
+
+Админ-панель пишет в таблицы через raw SQL, поэтому стандартные post_save
+не срабатывают — представления отправляют эти сигналы явно. Изменения через
+Django admin и API (ORM) транслируются в те же сигналы обработчиками ниже.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Categories, Brands, Products, Productimages, Productcharacteristics
+
+# Аргументы: category_ids — список ID измененных категорий
+categories_changed = Signal()
+
+# Аргументы: brand_ids — список ID измененных брендов
+brands_changed = Signal()
+
+# Аргументы: product_ids — список ID товаров, у которых изменились
+# поля, изображения или характеристики (в том числе удаленных)
+products_changed = Signal()
+
+# Аргументы: product_ids — список ID товаров, у которых изменился блок
+# «С этим товаром покупают» (Apps.catalog.recommendations). Сами товары
+# не менялись, поэтому карточки, поиск и фасеты на него не подписаны
+recommendations_changed = Signal()
+
+# Аргументы: product_ids — список ID товаров, у которых изменился только
+# остаток (оформление и отмена заказа). Поиск, характеристики и списки
+# от остатка не зависят, поэтому подписаны лишь карточки, фасет «в наличии»
+# и страницы этих товаров
+stock_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=Categories)
+def _category_saved(sender, instance, **kwargs):
+    categories_changed.send(sender=Categories, category_ids=[instance.categories_id])
+
+
+@receiver([post_save, post_delete], sender=Brands)
+def _brand_saved(sender, instance, **kwargs):
+    brands_changed.send(sender=Brands, brand_ids=[instance.brands_id])
+
+
+@receiver([post_save, post_delete], sender=Products)
+def _product_saved(sender, instance, **kwargs):
+    products_changed.send(sender=Products, product_ids=[instance.products_id])
+
+
+@receiver([post_save, post_delete], sender=Productimages)
+def _product_image_saved(sender, instance, **kwargs):
+    products_changed.send(sender=Productimages, product_ids=[instance.product_images_product_id])
+
+
+@receiver([post_save, post_delete], sender=Productcharacteristics)
+def _product_characteristic_saved(sender, instance, **kwargs):
+    products_changed.send(
+        sender=Productcharacteristics,
+        product_ids=[instance.product_characteristics_product_id],
+    )
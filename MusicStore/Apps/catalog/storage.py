@@ -0,0 +1,66 @@
+"""
+Хранилище медиафайлов с адресацией по содержимому.
+
+Файл сохраняется под именем cas/<2 символа>/<sha256><расширение>: одинаковые
+загрузки (одно фото у нескольких товаров, повторная загрузка логотипа
+бренда) хранятся один раз, имена не конфликтуют и не получают суффиксов, а
+содержимое по URL никогда не меняется — его можно кешировать навсегда
+(см. serve_immutable_media и CACHE_CONTROL).
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CAS_DIR = 'cas'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage (MEDIA_ROOT / MEDIA_URL), где имя файла — хеш содержимого."""
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        ext = os.path.splitext(name)[1].lower()
+        hexdigest = digest.hexdigest()
+        return f'{CAS_DIR}/{hexdigest[:2]}/{hexdigest}{ext}'
+
+    def save(self, name, content, max_length=None):
+        """Сохраняет файл (если такого содержимого еще нет) и возвращает его имя."""
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        target = self.content_name(name, content)
+        if self.exists(target):
+            return target
+        try:
+            return self._save(target, content)
+        except _AlreadyStored:
+            return target
+
+    def get_available_name(self, name, max_length=None):
+        # _save обращается сюда, только если файл с этим именем успела создать
+        # параллельная загрузка того же содержимого — новое имя не нужно
+        raise _AlreadyStored(name)
+
+
+class _AlreadyStored(Exception):
+    pass
+
+
+media_storage = ContentAddressedStorage()
+
+
+def save_upload(uploaded):
+    """Сохраняет загруженный файл и возвращает его URL."""
+    return media_storage.url(media_storage.save(uploaded.name, uploaded))
+
+
+def is_content_addressed(url, media_url):
+    return bool(url) and url.startswith(f'{media_url}{CAS_DIR}/')
@@ -0,0 +1,130 @@
+"""
+Подсказки поиска с устойчивостью к опечаткам (PostgreSQL pg_trgm).
+
+Сравнение идет по триграммам (word_similarity) с GIN-индексами
+gin_trgm_ops на названиях товаров, брендов и категорий. Кириллический ввод
+дополнительно транслитерируется, чтобы «Фендер» находил «Fender».
+Ответы для частых префиксов кешируются на короткое время.
+"""
+import hashlib
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import Cast, Greatest
+
+from .models import Products, Brands, Categories
+
+SUGGEST_LIMIT = 5
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LENGTH = 64
+SUGGEST_CACHE_TIMEOUT = 60  # секунд
+
+_TRANSLIT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '',
+    'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+}
+
+
+def normalize_query(text):
+    """Нижний регистр, одиночные пробелы, ограничение длины."""
+    return ' '.join((text or '').lower().split())[:SUGGEST_MAX_LENGTH]
+
+
+def query_variants(text):
+    """Исходная строка и, если в ней есть кириллица, ее транслитерация."""
+    variants = [text]
+    translit = ''.join(_TRANSLIT.get(ch, ch) for ch in text)
+    if translit != text:
+        variants.append(translit)
+    return variants
+
+
+def _similar(queryset, fields, variants):
+    """
+    Фильтр «хотя бы одно поле похоже хотя бы на один вариант» (оператор %>,
+    использует GIN-индекс) и аннотация score — лучшая похожесть.
+    """
+    condition = Q()
+    scores = []
+    for variant in variants:
+        for field in fields:
+            condition |= Q(**{f'{field}__trigram_word_similar': variant})
+            scores.append(TrigramWordSimilarity(variant, field))
+    score = Greatest(*scores) if len(scores) > 1 else scores[0]
+    return queryset.filter(condition).alias(score=score)
+
+
+def _fuzzy_candidates(variants):
+    """
+    ID товаров, похожих по названию, бренду или категории. Каждая таблица
+    ищется отдельно по своему GIN-индексу, результаты объединяются UNION:
+    условие OR по колонкам соединенных таблиц индексы использовать не может.
+    """
+    by_name = _similar(Products.objects.all(), ['products_name'], variants).values('products_id')
+    brand_ids = _similar(Brands.objects.all(), ['brands_name'], variants).values('brands_id')
+    category_ids = _similar(Categories.objects.all(), ['categories_name'], variants).values('categories_id')
+    return by_name.union(
+        Products.objects.filter(products_brand_id__in=brand_ids).values('products_id'),
+        Products.objects.filter(products_category_id__in=category_ids).values('products_id'),
+    )
+
+
+def fuzzy_search_products(queryset, text):
+    """
+    Запасной поиск по товарам для каталога: похожесть названия товара,
+    бренда или категории. Ранг кладется в search_rank, как у полнотекстового
+    поиска, чтобы работала сортировка по релевантности.
+    """
+    query = normalize_query(text)
+    if not any(ch.isalnum() for ch in query):
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+    variants = query_variants(query)
+    fields = ['products_name', 'products_brand__brands_name', 'products_category__categories_name']
+    score = Greatest(*(TrigramWordSimilarity(variant, field) for variant in variants for field in fields))
+    # word_similarity возвращает real; приводим к double precision (см. search.search_products)
+    return (queryset
+            .filter(products_id__in=_fuzzy_candidates(variants))
+            .annotate(search_rank=Cast(score, FloatField())))
+
+
+def suggest(text, limit=SUGGEST_LIMIT):
+    """
+    Подсказки для строки поиска: словарь со списками products, brands, categories.
+    Для слишком коротких строк и строк без букв и цифр возвращает пустые
+    списки без обращения к БД.
+    """
+    query = normalize_query(text)
+    result = {'query': query, 'products': [], 'brands': [], 'categories': []}
+    if len(query) < SUGGEST_MIN_LENGTH or not any(ch.isalnum() for ch in query):
+        return result
+
+    digest = hashlib.md5(f'{limit}:{query}'.encode('utf-8')).hexdigest()
+    cache_key = f'catalog:suggest:{digest}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    variants = query_variants(query)
+    products = (_similar(Products.objects.all(), ['products_name'], variants)
+                .order_by('-score', 'products_name')
+                .values('products_id', 'products_name', 'products_price')[:limit])
+    brands = (_similar(Brands.objects.all(), ['brands_name'], variants)
+              .order_by('-score', 'brands_name')
+              .values('brands_id', 'brands_name')[:limit])
+    categories = (_similar(Categories.objects.all(), ['categories_name'], variants)
+                  .order_by('-score', 'categories_name')
+                  .values('categories_id', 'categories_name')[:limit])
+
+    result['products'] = [
+        {'id': p['products_id'], 'name': p['products_name'], 'price': str(p['products_price'])}
+        for p in products
+    ]
+    result['brands'] = [{'id': b['brands_id'], 'name': b['brands_name']} for b in brands]
+    result['categories'] = [{'id': c['categories_id'], 'name': c['categories_name']} for c in categories]
+    cache.set(cache_key, result, SUGGEST_CACHE_TIMEOUT)
+    return result
@@ -1,7 +1,13 @@
 from django import template
+from django.utils.html import format_html, format_html_join
+
+from Apps.catalog.card_cache import render_product_cards, render_favorite_cards
 
 register = template.Library()
 
+# Ширина карточки в сетке каталога: 1 / 2 / 4 колонки
+CARD_IMAGE_SIZES = '(max-width: 576px) 100vw, (max-width: 768px) 50vw, 25vw'
+
 
 @register.filter(name='get_item')
 def get_item(dictionary, key):
@@ -12,3 +18,35 @@ def get_item(dictionary, key):
         return None
 
 
+@register.simple_tag(takes_context=True)
+def product_cards(context, products, favorite_ids=None, cart_quantities=None):
+    """Карточки каталога из кеша фрагментов (см. Apps.catalog.card_cache)."""
+    user = context.get('user')
+    is_authenticated = bool(user and user.is_authenticated)
+    return render_product_cards(products, is_authenticated, favorite_ids or (), cart_quantities)
+
+
+@register.simple_tag
+def favorite_cards(favorites, cart_quantities=None):
+    """Карточки раздела «Избранное» из кеша фрагментов."""
+    return render_favorite_cards(favorites, cart_quantities)
+
+
+@register.simple_tag
+def responsive_image(src, webp_srcset='', jpeg_srcset='', sizes=CARD_IMAGE_SIZES, **attrs):
+    """
+    Изображение с уменьшенными копиями (Apps.catalog.images): <picture> с
+    WebP- и JPEG-srcset и ленивой загрузкой. Пока копий нет — обычный <img>.
+    Остальные именованные аргументы (alt, class, style, ...) становятся
+    атрибутами <img>.
+    """
+    img_attrs = {'src': src, 'loading': 'lazy', 'decoding': 'async', **attrs}
+    if jpeg_srcset:
+        img_attrs.update(srcset=jpeg_srcset, sizes=sizes)
+    img = format_html('<img{}>', format_html_join('', ' {}="{}"', img_attrs.items()))
+    if not webp_srcset:
+        return img
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+        webp_srcset, sizes, img,
+    )
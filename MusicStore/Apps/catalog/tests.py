@@ -1,3 +1,139 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.core import signing
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Brands, Categories, Productcards, Products
+from .pagination import InvalidCursor, KeysetPaginator
+from .views import CATALOG_SORT_OPTIONS
+
+
+class KeysetPaginatorTests(TestCase):
+    """Keyset-пагинация (Apps.catalog.pagination): NULL в конце, курсоры."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categories.objects.create(categories_name='Клавишные')
+        brand = Brands.objects.create(brands_name='Roland')
+        t1 = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        t2 = datetime(2024, 6, 1, tzinfo=dt_timezone.utc)
+        t3 = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        # (дата добавления, средняя оценка, число отзывов); None у оценки — карточки нет
+        rows = [
+            (t1, Decimal('4.50'), 10),
+            (t3, Decimal('4.50'), 3),
+            (t2, 'no-rating', 0),
+            (None, None, None),
+            (t2, Decimal('5.00'), 1),
+            (None, Decimal('4.50'), 10),
+        ]
+        cls.products = []
+        for i, (created_at, rating, reviews) in enumerate(rows):
+            product = Products.objects.create(
+                products_name=f'Синтезатор {i}', products_price=Decimal('1000.00'), products_stock=1,
+                products_category=category, products_brand=brand, products_created_at=created_at,
+            )
+            cls.products.append(product)
+            Productcards.objects.filter(product_cards_product=product).delete()
+            if rating is None:
+                continue
+            Productcards.objects.create(
+                product_cards_product=product,
+                product_cards_name=product.products_name,
+                product_cards_price=product.products_price,
+                product_cards_stock=product.products_stock,
+                product_cards_brand_name=brand.brands_name,
+                product_cards_category_name=category.categories_name,
+                product_cards_rating_avg=None if rating == 'no-rating' else rating,
+                product_cards_reviews_count=reviews,
+                product_cards_updated_at=timezone.now(),
+            )
+
+    def _ids(self, *indexes):
+        return [self.products[i].products_id for i in indexes]
+
+    def _walk(self, paginator, queryset):
+        """Все страницы подряд; курсор каждый раз проходит через строку."""
+        ids, cursor, pages = [], None, 0
+        while True:
+            page = paginator.paginate(queryset, cursor)
+            ids.extend(p.products_id for p in page)
+            pages += 1
+            if not page.has_next:
+                return ids, pages
+            cursor = str(page.next_cursor)
+            self.assertLess(pages, 20)
+
+    def _assert_round_trip(self, sort_by, expected):
+        queryset = Products.objects.all()
+        for per_page in range(1, len(expected) + 1):
+            with self.subTest(sort_by=sort_by, per_page=per_page):
+                paginator = KeysetPaginator(CATALOG_SORT_OPTIONS[sort_by], per_page, salt='test.' + sort_by)
+                ids, pages = self._walk(paginator, queryset)
+                self.assertEqual(ids, expected)
+                self.assertEqual(pages, -(-len(expected) // per_page))
+
+    def test_newest_puts_nulls_last(self):
+        # Даты по убыванию, равные — по ID, без даты — в конце
+        self._assert_round_trip('newest', self._ids(1, 2, 4, 0, 3, 5))
+
+    def test_oldest_puts_nulls_last(self):
+        self._assert_round_trip('oldest', self._ids(0, 2, 4, 1, 3, 5))
+
+    def test_rating_across_missing_cards(self):
+        # Без оценки (и без карточки вовсе) — в конце; без карточки нет и числа отзывов
+        self._assert_round_trip('rating_desc', self._ids(4, 0, 5, 1, 2, 3))
+
+    def test_matches_unpaginated_order(self):
+        paginator = KeysetPaginator(CATALOG_SORT_OPTIONS['newest'], 100, salt='test.newest')
+        page = paginator.paginate(Products.objects.all())
+        self.assertFalse(page.has_next)
+        self.assertEqual([p.products_id for p in page], self._ids(1, 2, 4, 0, 3, 5))
+
+    def _cursor_after_first(self, paginator):
+        page = paginator.paginate(Products.objects.all())
+        self.assertTrue(page.has_next)
+        return page.next_cursor
+
+    def test_tampered_cursor(self):
+        paginator = KeysetPaginator(CATALOG_SORT_OPTIONS['newest'], 2, salt='test.newest')
+        cursor = self._cursor_after_first(paginator)
+        value, signature = cursor.rsplit(':', 1)
+        tampered = [
+            value + ':' + ('A' if signature[0] != 'A' else 'B') + signature[1:],
+            value[:-1] + ('A' if value[-1] != 'A' else 'B') + ':' + signature,
+            'garbage',
+            '',
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.decode_cursor(cursor, paginator._columns(Products.objects.all()))
+            if cursor:
+                with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                    paginator.paginate(Products.objects.all(), cursor)
+
+    def test_cursor_of_other_sort_is_rejected(self):
+        newest = KeysetPaginator(CATALOG_SORT_OPTIONS['newest'], 2, salt='test.newest')
+        by_name = KeysetPaginator(CATALOG_SORT_OPTIONS['name_asc'], 2, salt='test.name_asc')
+        with self.assertRaises(InvalidCursor):
+            by_name.paginate(Products.objects.all(), self._cursor_after_first(newest))
+
+    def test_signed_cursor_with_wrong_shape(self):
+        paginator = KeysetPaginator(CATALOG_SORT_OPTIONS['newest'], 2, salt='test.newest')
+        for values in (['2024-01-01T00:00:00+00:00'], ['not-a-date', 1], {'a': 1}):
+            cursor = signing.dumps(values, salt='test.newest', compress=True)
+            with self.subTest(values=values), self.assertRaises(InvalidCursor):
+                paginator.paginate(Products.objects.all(), cursor)
+
+    def test_catalog_view_falls_back_to_first_page(self):
+        first = self.client.get('/catalog/', {'sort': 'newest'})
+        tampered = self.client.get('/catalog/', {'sort': 'newest', 'cursor': 'garbage'})
 
-# Create your tests here.
+        self.assertEqual(tampered.status_code, 200)
+        self.assertEqual(len(first.context['products']), len(self.products))
+        self.assertEqual(
+            [p.products_id for p in tampered.context['products']],
+            [p.products_id for p in first.context['products']],
+        )
@@ -0,0 +1,70 @@
+"""
+Штампы версий наборов данных каталога.
+
+Штамп хранится в общем кеше и увеличивается при каждом изменении набора
+(категорий, товаров и т.д.). Процессы сравнивают сохраненную у себя версию
+с текущей и перестраивают локальные структуры только при расхождении.
+
+Поэтому кеш должен быть общим для всех процессов: с LocMemCache увеличение
+штампа видит только процесс, который его сделал, а дерево категорий,
+снимок главной, фасеты и кеш страниц остальных воркеров не сбрасываются
+никогда. Без DEBUG это ошибка проверки catalog.E001.
+"""
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+_KEY = 'catalog:version:{}'
+
+
+def _initial_version():
+    # Начинаем с метки времени, чтобы после очистки кеша версия не повторилась
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Текущая версия набора name; создается при первом обращении."""
+    key = _KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*names):
+    """Версии нескольких наборов за одно обращение к кешу."""
+    keys = {_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = get_version(name)
+    return versions
+
+
+def bump_version(name):
+    """Помечает набор name измененным и возвращает новую версию."""
+    key = _KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.DEBUG or not isinstance(caches['default'], LocMemCache):
+        return []
+    return [checks.Error(
+        'Кеш по умолчанию — LocMemCache: штампы версий каталога не видны другим '
+        'процессам, и их данные в памяти не сбрасываются.',
+        hint='Задайте общий кеш (REDIS_URL). Если сайт работает в одном процессе, '
+             'добавьте "catalog.E001" в SILENCED_SYSTEM_CHECKS.',
+        id='catalog.E001',
+    )]
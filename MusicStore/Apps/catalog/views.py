@@ -1,16 +1,37 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.utils import ProgrammingError
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db import connection
+from django.db import connection, transaction
+from django.template.loader import render_to_string
 from django.utils import timezone
+from django.views.static import serve as static_serve
 
-from .models import Products, Categories, Brands, Productimages, Productcharacteristics
+from .models import Products, Brands, Productimages, Productcharacteristics
 from .forms import ReviewForm
+from .pagination import KeysetPaginator, InvalidCursor
+from .category_tree import get_category_tree
+from .search import search_products
+from .suggest import fuzzy_search_products
+from .facets import FacetSelection, get_facets, PRICE_BUCKETS
+from .attributes import parse_attribute_filters, filter_by_attributes, attribute_options
+from .cards import with_cards
+from .recommendations import get_recommendations
+from .product_views import count_product_view
+from .storage import CAS_DIR, CACHE_CONTROL
+from .conditional import product_page_condition
+from .page_cache import (
+    anonymous_page_cache, add_page_tags, LISTING_TAG, CATALOG_TAG, product_tag, category_tag, brand_tag,
+    category_listing_tag, brand_listing_tag,
+)
 from Apps.users.models import Users, Favorites
-from Apps.extras.models import Reviews
+from Apps.cart.operations import get_cart_quantities
+from Apps.users.store_user import require_store_user_id
+from Apps.extras.models import Reviews, Productratings
+from Apps.extras.reviews import get_reviews_page, REVIEW_SORT_OPTIONS, DEFAULT_REVIEW_SORT
 from Apps.users.utils import (
-    ensure_favorites_table,
     get_user_favorite_ids,
     register_favorite,
     remove_favorite,
@@ -28,8 +49,9 @@ def _redirect_after_favorite_action(request, default='catalog'):
 
 def get_category_and_children_ids(category_id):
     """
-    Получает ID выбранной категории и всех её дочерних категорий (рекурсивно).
+    Получает ID выбранной категории и всех её дочерних категорий.
     Это позволяет показывать товары из родительской категории и всех подкатегорий.
+    Поддерево берется из дерева категорий в памяти, без запросов к БД.
     
     Args:
         category_id: ID категории
@@ -37,142 +59,231 @@ def get_category_and_children_ids(category_id):
     Returns:
         list: Список ID категории и всех её дочерних категорий
     """
-    category_ids = [category_id]
-    
-    # Проверяем, существует ли категория
+    return list(get_category_tree().subtree_ids(category_id))
+
+
+CATALOG_PAGE_SIZE = 48
+
+# Опции сортировки: последним полем всегда идет уникальный products_id,
+# чтобы keyset-курсор однозначно определял позицию в выдаче
+CATALOG_SORT_OPTIONS = {
+    'price_asc': ['products_price', 'products_name', 'products_id'],  # По цене: от дешевых к дорогим, затем по названию
+    'price_desc': ['-products_price', 'products_name', 'products_id'],  # По цене: от дорогих к дешевым, затем по названию
+    'name_asc': ['products_name', 'products_id'],  # По названию: А-Я
+    'name_desc': ['-products_name', 'products_id'],  # По названию: Я-А
+    'newest': ['-products_created_at', 'products_id'],  # По дате: новые сначала (NULL в конце)
+    'oldest': ['products_created_at', 'products_id'],  # По дате: старые сначала (NULL в конце)
+    'stock_desc': ['-products_stock', 'products_name', 'products_id'],  # По наличию: больше на складе
+    'stock_asc': ['products_stock', 'products_name', 'products_id'],  # По наличию: меньше на складе
+    'rating_desc': ['-card__product_cards_rating_avg', '-card__product_cards_reviews_count', 'products_id'],  # По рейтингу: лучшие сначала (без отзывов в конце)
+    'popular': ['-views__product_views_count', 'products_id'],  # Популярные: больше просмотров (см. product_views)
+    'default': ['products_id'],  # По умолчанию: по ID
+    'relevance': ['-search_rank', 'products_id'],  # По релевантности (только при поиске)
+}
+
+
+def _int_param(request, name):
+    """Целочисленный GET-параметр или None, если он не задан или некорректен."""
+    value = request.GET.get(name, '').strip()
     try:
-        category = Categories.objects.get(categories_id=category_id)
-    except Categories.DoesNotExist:
-        return [category_id]  # Возвращаем только выбранный ID, если категория не существует
-    
-    # Получаем все дочерние категории первого уровня
-    children = Categories.objects.filter(categories_parent_id=category_id)
-    
-    # Рекурсивно получаем дочерние категории всех уровней
-    for child in children:
-        category_ids.extend(get_category_and_children_ids(child.categories_id))
-    
-    return list(set(category_ids))  # Убираем дубликаты
+        return int(value) if value else None
+    except (ValueError, TypeError):
+        return None
 
 
-def catalog_view(request):
-    """Страница каталога товаров"""
-    # Получаем все категории и бренды
-    categories = Categories.objects.all()
-    brands = Brands.objects.all()
-    
-    # Начинаем с базового queryset
-    products = Products.objects.all()
-    
-    # Фильтрация по категории, если указана (с учетом иерархии)
-    category_id = request.GET.get('category', '').strip()
-    if category_id:
-        try:
-            category_id_int = int(category_id)
-            # Получаем ID выбранной категории и всех её дочерних категорий
-            category_ids = get_category_and_children_ids(category_id_int)
-            # Фильтруем товары по всем найденным категориям
-            products = products.filter(products_category_id__in=category_ids)
-        except (ValueError, TypeError):
-            category_id = ''
-    
-    # Фильтрация по бренду, если указан
-    brand_id = request.GET.get('brand', '').strip()
-    if brand_id:
-        try:
-            brand_id_int = int(brand_id)
-            products = products.filter(products_brand_id=brand_id_int)
-        except (ValueError, TypeError):
-            brand_id = ''
+def _catalog_filters(request, fuzzy=False):
+    """
+    Разбирает параметры фильтрации каталога и возвращает (base, selection, filters):
+    base — товары, отфильтрованные только поиском (по ней считаются фасеты),
+    selection — выбранные фасеты; итоговая выборка — selection.apply(base).
+    Выборка еще не отсортирована — сортировку и срез выполняет пагинатор.
+    fuzzy (или ?fuzzy=1 в ссылках на следующие страницы) — нечеткий поиск
+    вместо полнотекстового.
+    """
+    # Бренд, категория, изображение и рейтинг берутся из карточки (один JOIN)
+    products = with_cards(Products.objects.all())
     
-    # Поиск по названию, если указан
+    # Полнотекстовый поиск (название, бренд, категория, характеристики, описание)
+    # или нечеткий (опечатки, транслитерация)
     search_query = request.GET.get('search', '').strip()
+    search_fallback = False
     if search_query:
-        products = products.filter(products_name__icontains=search_query)
+        if fuzzy or request.GET.get('fuzzy') == '1':
+            products = fuzzy_search_products(products, search_query)
+            search_fallback = True
+        else:
+            products = search_products(products, search_query)
     
-    # Сортировка товаров
-    sort_by = request.GET.get('sort', 'default').strip()
-    # Валидация параметра сортировки
-    valid_sorts = ['default', 'price_asc', 'price_desc', 'name_asc', 'name_desc', 
-                   'newest', 'oldest', 'stock_desc', 'stock_asc']
-    if sort_by not in valid_sorts:
+    # Характеристики (?attr=ключ:значение, можно несколько) — по индексу атрибутов
+    attribute_filters = parse_attribute_filters(request.GET.getlist('attr'))
+    products = filter_by_attributes(products, attribute_filters)
+    
+    # Фасеты: категория (с учетом иерархии), бренд, ценовой диапазон, наличие
+    category_id = _int_param(request, 'category')
+    brand_id = _int_param(request, 'brand')
+    price_bucket = _int_param(request, 'price')
+    if price_bucket is not None and not 0 <= price_bucket <= len(PRICE_BUCKETS):
+        price_bucket = None
+    in_stock = request.GET.get('in_stock') == '1'
+    selection = FacetSelection(
+        brand_id=brand_id,
+        category_id=category_id,
+        price_bucket=price_bucket,
+        in_stock=in_stock,
+    )
+    
+    # Сортировка товаров (с валидацией параметра); при поиске по умолчанию — по релевантности
+    sort_by = request.GET.get('sort', '').strip() or ('relevance' if search_query else 'default')
+    if sort_by not in CATALOG_SORT_OPTIONS or (sort_by == 'relevance' and not search_query):
         sort_by = 'default'
     
-    # Опции сортировки
-    sort_options = {
-        'price_asc': ['products_price', 'products_name'],  # По цене: от дешевых к дорогим, затем по названию
-        'price_desc': ['-products_price', 'products_name'],  # По цене: от дорогих к дешевым, затем по названию
-        'name_asc': 'products_name',  # По названию: А-Я
-        'name_desc': '-products_name',  # По названию: Я-А
-        'newest': ['-products_created_at', 'products_id'],  # По дате: новые сначала (NULL в конце)
-        'oldest': ['products_created_at', 'products_id'],  # По дате: старые сначала (NULL в конце)
-        'stock_desc': ['-products_stock', 'products_name'],  # По наличию: больше на складе
-        'stock_asc': ['products_stock', 'products_name'],  # По наличию: меньше на складе
-        'default': 'products_id',  # По умолчанию: по ID
+    filters = {
+        'selected_category': str(category_id) if category_id is not None else '',
+        'selected_brand': str(brand_id) if brand_id is not None else '',
+        'selected_price': str(price_bucket) if price_bucket is not None else '',
+        'in_stock': in_stock,
+        'search_query': search_query if search_query else '',
+        'search_fallback': search_fallback,
+        'attribute_filters': attribute_filters,
+        'sort_by': sort_by,
     }
+    return products, selection, filters
+
+
+def _catalog_page(request, products, sort_by):
+    """Выбирает одну keyset-страницу товаров; некорректный курсор трактуется как первая страница."""
+    paginator = KeysetPaginator(
+        CATALOG_SORT_OPTIONS[sort_by], CATALOG_PAGE_SIZE, salt='catalog.cursor.' + sort_by
+    )
+    try:
+        return paginator.paginate(products, request.GET.get('cursor') or None)
+    except InvalidCursor:
+        return paginator.paginate(products)
+
+
+def _favorite_ids_for(request, product_ids):
+    """Множество избранных товаров пользователя среди product_ids."""
+    if not request.user.is_authenticated or not product_ids:
+        return set()
+    try:
+        user_id = require_store_user_id(request)
+        return get_user_favorite_ids(user_id, product_ids)
+    except Users.DoesNotExist:
+        return set()
+    except ProgrammingError:
+        return set()
+
+
+def _cart_quantities_for(request, product_ids):
+    """Количество в корзине пользователя для товаров из product_ids."""
+    if not request.user.is_authenticated or not product_ids:
+        return {}
+    try:
+        return get_cart_quantities(require_store_user_id(request), product_ids)
+    except Users.DoesNotExist:
+        return {}
+
+
+def _next_page_url(request, page, fuzzy=False):
+    """URL следующей страницы с сохранением текущих фильтров (и режима поиска)."""
+    if not page.has_next:
+        return ''
+    params = request.GET.copy()
+    params['cursor'] = page.next_cursor
+    if fuzzy:
+        params['fuzzy'] = '1'
+    return '?' + params.urlencode()
+
+
+def _cards_context(request, page):
+    product_ids = [p.products_id for p in page]
+    return {
+        'products': page.items,
+        'favorite_ids': _favorite_ids_for(request, product_ids),
+        'cart_quantities': _cart_quantities_for(request, product_ids),
+    }
+
+
+def _attribute_options_context(attribute_filters):
+    """Характеристики для фильтра с отметкой выбранных значений."""
+    options = []
+    for option in attribute_options():
+        selected = attribute_filters.get(option['key'], [])
+        options.append({
+            'key': option['key'],
+            'values': [
+                {**value, 'param': f"{option['key']}:{value['value']}", 'selected': value['value'] in selected}
+                for value in option['values']
+            ],
+        })
+    return options
+
+
+@anonymous_page_cache()
+def catalog_view(request):
+    """Страница каталога товаров (первая страница keyset-выдачи) со счетчиками фасетов"""
+    base, selection, filters = _catalog_filters(request)
+    # Состав списка: категория и/или бренд, иначе весь каталог
+    listing_tags = [category_listing_tag(selection.category_id)] if selection.category_id is not None else []
+    if selection.brand_id is not None:
+        listing_tags.append(brand_listing_tag(selection.brand_id))
+    add_page_tags(request, LISTING_TAG, *(listing_tags or [CATALOG_TAG]))
     
-    # Применяем сортировку
-    order_by = sort_options.get(sort_by, 'products_id')
-    if isinstance(order_by, list):
-        products = products.order_by(*order_by)
-    else:
-        products = products.order_by(order_by)
-    
-    # Подсчитываем количество товаров после применения всех фильтров и сортировки
-    products_count = products.count()
+    page = _catalog_page(request, selection.apply(base), filters['sort_by'])
+    if (not page.items and filters['search_query'] and not filters['search_fallback']
+            and not request.GET.get('cursor')):
+        # Полнотекстовый поиск ничего не нашел — пробуем нечеткий. Решение
+        # принимается по уже выбранной первой странице, без отдельного запроса
+        base, selection, filters = _catalog_filters(request, fuzzy=True)
+        page = _catalog_page(request, selection.apply(base), filters['sort_by'])
     
-    # Подтягиваем главные изображения для товаров
-    product_ids = list(products.values_list('products_id', flat=True))
-    images_by_product = {}
-    if product_ids:
-        main_images = Productimages.objects.filter(
-            product_images_product_id__in=product_ids,
-            product_images_is_main=True
-        )
-        for img in main_images:
-            images_by_product[img.product_images_product_id] = img.product_images_url
-        # Если для некоторых товаров нет главного — берем первое попавшееся
-        missing_ids = [pid for pid in product_ids if pid not in images_by_product]
-        if missing_ids:
-            any_images = (Productimages.objects
-                          .filter(product_images_product_id__in=missing_ids)
-                          .order_by('product_images_id'))
-            for img in any_images:
-                if img.product_images_product_id not in images_by_product:
-                    images_by_product[img.product_images_product_id] = img.product_images_url
-    favorite_ids = set()
-    if request.user.is_authenticated:
-        try:
-            user_model = Users.objects.get(users_email=request.user.email)
-            ensure_favorites_table()
-            favorite_ids = get_user_favorite_ids(user_model, product_ids)
-        except Users.DoesNotExist:
-            favorite_ids = set()
-        except ProgrammingError:
-            favorite_ids = set()
+    # Счетчики фасетов и общее количество — одним запросом (с кешем)
+    base_key = repr((' '.join(filters['search_query'].lower().split()), filters['attribute_filters'],
+                     filters['search_fallback']))
+    facets = get_facets(base, selection, base_key)
+    # Теги показанных товаров известны только после выборки; изменения товаров
+    # до этого момента уже сбросили бы теги состава списка выше
+    add_page_tags(request, *(product_tag(p.products_id) for p in page))
     
     context = {
-        'products': products,
-        'categories': categories,
-        'brands': brands,
-        'images_by_product': images_by_product,
-        'selected_category': category_id if category_id else '',
-        'selected_brand': brand_id if brand_id else '',
-        'search_query': search_query if search_query else '',
-        'sort_by': sort_by,
-        'products_count': products_count,
-        'favorite_ids': favorite_ids,
+        'category_options': facets.category_options(),
+        'brand_options': facets.brand_options(Brands.objects.all()),
+        'price_options': facets.price_options(),
+        'in_stock_count': facets.in_stock_count,
+        'attribute_options': _attribute_options_context(filters['attribute_filters']),
+        'products_count': facets.total,
+        'next_page_url': _next_page_url(request, page, filters['search_fallback']),
+        'next_cursor': page.next_cursor or '',
+        **_cards_context(request, page),
+        **filters,
     }
     return render(request, 'catalog/catalog.html', context)
 
 
+def catalog_more_view(request):
+    """
+    Следующая страница каталога для бесконечной прокрутки.
+    Возвращает HTML-фрагмент карточек и курсор следующей страницы;
+    количество товаров и фасеты не пересчитываются.
+    """
+    base, selection, filters = _catalog_filters(request)
+    page = _catalog_page(request, selection.apply(base), filters['sort_by'])
+    html = render_to_string('catalog/_product_cards.html', _cards_context(request, page), request=request)
+    return JsonResponse({
+        'html': html,
+        'next_cursor': page.next_cursor or '',
+        'next_page_url': _next_page_url(request, page, filters['search_fallback']),
+        'has_next': page.has_next,
+    })
+
+
 @login_required
 def add_to_favorites(request, product_id):
     """Добавляет товар в избранное по ГОСТу (с проверками и уведомлениями)."""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
+        user_id = require_store_user_id(request)
         product = get_object_or_404(Products, products_id=product_id)
-        created = register_favorite(user_model.users_id, product.products_id)
+        created = register_favorite(user_id, product.products_id)
         if created:
             messages.success(request, f'Товар «{product.products_name}» добавлен в избранное.')
         else:
@@ -188,9 +299,9 @@ def add_to_favorites(request, product_id):
 def remove_from_favorites(request, product_id):
     """Удаляет товар из избранного."""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
+        user_id = require_store_user_id(request)
         product = get_object_or_404(Products, products_id=product_id)
-        remove_favorite(user_model.users_id, product.products_id)
+        remove_favorite(user_id, product.products_id)
         messages.info(request, f'Товар «{product.products_name}» удалён из избранного.')
     except Users.DoesNotExist:
         messages.error(request, 'Профиль пользователя не найден.')
@@ -203,17 +314,15 @@ def remove_from_favorites(request, product_id):
 def favorites_view(request):
     """Раздел избранных товаров по ГОСТ: карточки, счетчики, визуальные индикаторы."""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        ensure_favorites_table()
+        user_id = require_store_user_id(request)
         favorites_qs = (
             Favorites.objects
-            .filter(favorites_user=user_model)
-            .select_related('favorites_product__products_brand', 'favorites_product__products_category')
+            .filter(favorites_user_id=user_id)
+            .select_related('favorites_product__card')
             .order_by('-favorites_added_at', '-favorites_id')
         )
         
         favorite_items = []
-        product_ids = []
         for fav in favorites_qs:
             try:
                 product = fav.favorites_product
@@ -221,30 +330,13 @@ def favorites_view(request):
                 continue
             if product:
                 favorite_items.append(fav)
-                product_ids.append(product.products_id)
-        
-        images_by_product = {}
-        if product_ids:
-            main_images = Productimages.objects.filter(
-                product_images_product_id__in=product_ids,
-                product_images_is_main=True
-            )
-            for img in main_images:
-                images_by_product[img.product_images_product_id] = img.product_images_url
-            missing = [pid for pid in product_ids if pid not in images_by_product]
-            if missing:
-                extra_images = (Productimages.objects
-                                .filter(product_images_product_id__in=missing)
-                                .order_by('product_images_id'))
-                for img in extra_images:
-                    images_by_product.setdefault(img.product_images_product_id, img.product_images_url)
         
         favorite_ids = {fav.favorites_product_id for fav in favorite_items}
         
         context = {
             'favorites': favorite_items,
-            'images_by_product': images_by_product,
             'favorite_ids': favorite_ids,
+            'cart_quantities': get_cart_quantities(user_id, favorite_ids),
             'favorites_count': len(favorite_items),
         }
         return render(request, 'catalog/favorites.html', context)
@@ -256,8 +348,41 @@ def favorites_view(request):
         return redirect('catalog')
 
 
+def _review_sort(request):
+    sort_by = request.GET.get('review_sort', DEFAULT_REVIEW_SORT)
+    return sort_by if sort_by in REVIEW_SORT_OPTIONS else DEFAULT_REVIEW_SORT
+
+
+def _reviews_next_url(request, page):
+    """URL следующей страницы отзывов (без JavaScript — та же страница товара)."""
+    if not page.has_next:
+        return ''
+    params = request.GET.copy()
+    params['reviews_cursor'] = page.next_cursor
+    return '?' + params.urlencode() + '#reviews'
+
+
+def product_reviews_view(request, product_id):
+    """
+    Следующая страница отзывов товара для кнопки «Показать ещё».
+    Возвращает HTML-фрагмент и курсор следующей страницы.
+    """
+    page = get_reviews_page(product_id, _review_sort(request), request.GET.get('reviews_cursor') or None)
+    html = render_to_string('catalog/_reviews.html', {'reviews': page}, request=request)
+    return JsonResponse({
+        'html': html,
+        'next_cursor': page.next_cursor or '',
+        'next_page_url': _reviews_next_url(request, page),
+        'has_next': page.has_next,
+    })
+
+
+@count_product_view
+@product_page_condition
+@anonymous_page_cache()
 def product_detail_view(request, product_id):
     """Детальная страница товара с описанием, характеристиками и отзывами"""
+    add_page_tags(request, product_tag(product_id))
     product = get_object_or_404(Products, products_id=product_id)
     
     # Получаем все изображения товара
@@ -270,26 +395,28 @@ def product_detail_view(request, product_id):
         product_characteristics_product=product
     ).order_by('product_characteristics_key')
     
-    # Получаем отзывы (только одобренные)
-    reviews = Reviews.objects.filter(
-        reviews_product=product,
-        reviews_approved=True
-    ).select_related('reviews_user').order_by('-reviews_date')
+    # Первая страница одобренных отзывов (кешируется по товару), остальные — через product_reviews
+    review_sort = _review_sort(request)
+    reviews = get_reviews_page(product_id, review_sort, request.GET.get('reviews_cursor') or None)
     
-    # Вычисляем средний рейтинг
-    avg_rating = 0
-    if reviews.exists():
-        total_rating = sum(review.reviews_rating for review in reviews)
-        avg_rating = round(total_rating / reviews.count(), 1)
+    # Сводка рейтинга хранится готовой (Apps.extras.ratings)
+    rating = Productratings.objects.filter(product_ratings_product=product).first()
     
-    # Проверяем, в избранном ли товар
+    # «С этим товаром покупают» — готовый топ соседей (Apps.catalog.recommendations)
+    recommendations = get_recommendations(product_id)
+    
+    # Проверяем, в избранном ли товар (и рекомендованные товары)
     is_favorite = False
+    favorite_ids = set()
+    cart_quantities = {}
     if request.user.is_authenticated:
         try:
-            user_model = Users.objects.get(users_email=request.user.email)
-            ensure_favorites_table()
-            favorite_ids = get_user_favorite_ids(user_model, [product_id])
+            user_id = require_store_user_id(request)
+            favorite_ids = get_user_favorite_ids(
+                user_id, [product_id] + [p.products_id for p in recommendations]
+            )
             is_favorite = product_id in favorite_ids
+            cart_quantities = get_cart_quantities(user_id, [p.products_id for p in recommendations])
         except (Users.DoesNotExist, ProgrammingError):
             pass
     
@@ -298,11 +425,11 @@ def product_detail_view(request, product_id):
     user_review = None
     if request.user.is_authenticated:
         try:
-            user_model = Users.objects.get(users_email=request.user.email)
+            user_id = require_store_user_id(request)
             # Проверяем, есть ли уже отзыв от этого пользователя
             user_review = Reviews.objects.filter(
                 reviews_product=product,
-                reviews_user=user_model
+                reviews_user_id=user_id
             ).first()
             
             if request.method == 'POST' and 'review_form' in request.POST:
@@ -316,10 +443,12 @@ def product_detail_view(request, product_id):
                 if review_form.is_valid():
                     review = review_form.save(commit=False)
                     review.reviews_product = product
-                    review.reviews_user = user_model
+                    review.reviews_user_id = user_id
                     review.reviews_date = timezone.now()
                     review.reviews_approved = False  # Требует модерации
-                    review.save()
+                    # Сводка рейтинга пересчитывается обработчиком post_save в той же транзакции
+                    with transaction.atomic():
+                        review.save()
                     
                     messages.success(request, 'Ваш отзыв отправлен на модерацию. Спасибо!')
                     return redirect('product_detail', product_id=product_id)
@@ -331,16 +460,39 @@ def product_detail_view(request, product_id):
         except Users.DoesNotExist:
             pass
     
+    # Хлебные крошки: цепочка категорий от корня до категории товара
+    category_path = get_category_tree().path(product.products_category_id)
+    add_page_tags(request, brand_tag(product.products_brand_id),
+                  *(category_tag(node.id) for node in category_path))
+    
     context = {
         'product': product,
+        'category_path': category_path,
         'product_images': product_images,
         'characteristics': characteristics,
         'reviews': reviews,
-        'avg_rating': avg_rating,
-        'reviews_count': reviews.count(),
+        'review_sort': review_sort,
+        'reviews_next_url': _reviews_next_url(request, reviews),
+        'avg_rating': rating.average if rating else 0,
+        'reviews_count': rating.product_ratings_count if rating else 0,
+        'rating_histogram': rating.histogram if rating else [],
         'is_favorite': is_favorite,
+        'recommendations': recommendations,
+        'favorite_ids': favorite_ids,
+        'cart_quantities': cart_quantities,
         'review_form': review_form,
         'user_review': user_review,
     }
     
     return render(request, 'catalog/product_detail.html', context)
+
+
+def serve_immutable_media(request, path):
+    """
+    Отдача файлов из хранилища по содержимому (media/cas/) при DEBUG.
+    Содержимое по такому URL не меняется, поэтому кешируется браузером навсегда.
+    В продакшене те же заголовки выставляет веб-сервер (см. MEDIA_URL в settings).
+    """
+    response = static_serve(request, f'{CAS_DIR}/{path}', document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
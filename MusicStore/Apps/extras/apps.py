@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ExtrasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Apps.extras'
+
+    def ready(self):
+        # Подключаем обработчики сигналов об изменении отзывов
+        from . import signals, ratings, reviews  # noqa: F401
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Apps.catalog.cards import refresh_product_cards
+from Apps.extras.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки рейтинга товаров по таблице reviews и обновляет рейтинг в карточках'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'product_ids', nargs='*', type=int,
+            help='ID товаров (по умолчанию — все товары)',
+        )
+
+    def handle(self, *args, **options):
+        product_ids = options['product_ids'] or None
+        with transaction.atomic():
+            count = rebuild_ratings(product_ids)
+            refresh_product_cards(product_ids)
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано сводок рейтинга: {count}'))
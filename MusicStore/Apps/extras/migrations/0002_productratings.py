@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS productratings (
+    product_ratings_product_id integer PRIMARY KEY REFERENCES products (products_id) ON DELETE CASCADE,
+    product_ratings_count integer NOT NULL DEFAULT 0,
+    product_ratings_sum integer NOT NULL DEFAULT 0,
+    product_ratings_1 integer NOT NULL DEFAULT 0,
+    product_ratings_2 integer NOT NULL DEFAULT 0,
+    product_ratings_3 integer NOT NULL DEFAULT 0,
+    product_ratings_4 integer NOT NULL DEFAULT 0,
+    product_ratings_5 integer NOT NULL DEFAULT 0,
+    product_ratings_updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+"""
+
+# Тот же запрос выполняет команда rebuild_ratings
+BACKFILL_SQL = """
+INSERT INTO productratings (
+    product_ratings_product_id, product_ratings_count, product_ratings_sum,
+    product_ratings_1, product_ratings_2, product_ratings_3, product_ratings_4, product_ratings_5
+)
+SELECT reviews_product_id, count(*), sum(reviews_rating),
+       count(*) FILTER (WHERE reviews_rating = 1),
+       count(*) FILTER (WHERE reviews_rating = 2),
+       count(*) FILTER (WHERE reviews_rating = 3),
+       count(*) FILTER (WHERE reviews_rating = 4),
+       count(*) FILTER (WHERE reviews_rating = 5)
+  FROM reviews
+ WHERE reviews_approved
+ GROUP BY reviews_product_id
+ON CONFLICT (product_ratings_product_id) DO NOTHING;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+        ('extras', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Productratings',
+            fields=[
+                ('product_ratings_product', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='rating', serialize=False, to='catalog.products')),
+                ('product_ratings_count', models.IntegerField()),
+                ('product_ratings_sum', models.IntegerField()),
+                ('product_ratings_1', models.IntegerField()),
+                ('product_ratings_2', models.IntegerField()),
+                ('product_ratings_3', models.IntegerField()),
+                ('product_ratings_4', models.IntegerField()),
+                ('product_ratings_5', models.IntegerField()),
+                ('product_ratings_updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'productratings',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql='DROP TABLE IF EXISTS productratings;'),
+        migrations.RunSQL(sql=BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# Частичные индексы по одобренным отзывам повторяют порядки ленты отзывов
+# (REVIEW_SORT_OPTIONS), чтобы keyset-страница читалась прямо из индекса.
+REVIEW_INDEXES = [
+    ('reviews_product_date_idx',
+     'reviews_product_id, reviews_date DESC NULLS LAST, reviews_id'),
+    ('reviews_product_rating_desc_idx',
+     'reviews_product_id, reviews_rating DESC, reviews_date DESC NULLS LAST, reviews_id'),
+    ('reviews_product_rating_asc_idx',
+     'reviews_product_id, reviews_rating, reviews_date DESC NULLS LAST, reviews_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extras', '0002_productratings'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f'CREATE INDEX IF NOT EXISTS {name} ON reviews ({columns}) WHERE reviews_approved;',
+            reverse_sql=f'DROP INDEX IF EXISTS {name};',
+        )
+        for name, columns in REVIEW_INDEXES
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+# Лента отзывов сортирует рейтинг по убыванию с NULLS LAST (KeysetPaginator),
+# а индекс из 0003 был объявлен просто DESC (NULLS FIRST) и не использовался.
+NAME = 'reviews_product_rating_desc_idx'
+COLUMNS = 'reviews_product_id, reviews_rating DESC NULLS LAST, reviews_date DESC NULLS LAST, reviews_id'
+OLD_COLUMNS = 'reviews_product_id, reviews_rating DESC, reviews_date DESC NULLS LAST, reviews_id'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extras', '0003_reviews_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f'DROP INDEX IF EXISTS {NAME}; CREATE INDEX {NAME} ON reviews ({COLUMNS}) WHERE reviews_approved;',
+            reverse_sql=f'DROP INDEX IF EXISTS {NAME}; CREATE INDEX {NAME} ON reviews ({OLD_COLUMNS}) WHERE reviews_approved;',
+        ),
+    ]
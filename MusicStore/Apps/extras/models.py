@@ -72,3 +72,39 @@ class Analytics(models.Model):
         managed = False
         db_table = 'analytics'
         unique_together = (('analytics_report_type', 'analytics_period_start', 'analytics_period_end'),)
+
+
+class Productratings(models.Model):
+    """
+    Сводка рейтинга товара по одобренным отзывам: количество, сумма оценок
+    и гистограмма 1–5 звезд. Поддерживается Apps.extras.ratings.
+    """
+    product_ratings_product = models.OneToOneField(Products, models.DO_NOTHING, primary_key=True, related_name='rating')
+    product_ratings_count = models.IntegerField()
+    product_ratings_sum = models.IntegerField()
+    product_ratings_1 = models.IntegerField()
+    product_ratings_2 = models.IntegerField()
+    product_ratings_3 = models.IntegerField()
+    product_ratings_4 = models.IntegerField()
+    product_ratings_5 = models.IntegerField()
+    product_ratings_updated_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'productratings'
+
+    @property
+    def average(self):
+        if not self.product_ratings_count:
+            return 0
+        return round(self.product_ratings_sum / self.product_ratings_count, 1)
+
+    @property
+    def histogram(self):
+        """[(звезды, количество, процент)] от 5 к 1 — для вывода полос рейтинга."""
+        total = self.product_ratings_count or 0
+        rows = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'product_ratings_{stars}')
+            rows.append((stars, count, round(count * 100 / total) if total else 0))
+        return rows
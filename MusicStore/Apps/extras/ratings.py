@@ -0,0 +1,137 @@
+"""
+Сводки рейтинга товаров (таблица productratings).
+
+Модерация в админ-панели меняет сводку инкрементально: в одной транзакции
+строка отзыва блокируется, обновляется, и к сводке прибавляется разница
+«учитывался ли отзыв до / после». Сохранения через ORM (форма отзыва на
+странице товара, Django admin, API) пересчитывают сводку товара целиком
+по его отзывам — это один агрегат по индексу.
+"""
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Reviews
+from .signals import reviews_changed
+
+_DELTA_SQL = """
+INSERT INTO productratings (
+    product_ratings_product_id, product_ratings_count, product_ratings_sum,
+    product_ratings_1, product_ratings_2, product_ratings_3, product_ratings_4, product_ratings_5,
+    product_ratings_updated_at
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now())
+ON CONFLICT (product_ratings_product_id) DO UPDATE SET
+    product_ratings_count = productratings.product_ratings_count + EXCLUDED.product_ratings_count,
+    product_ratings_sum = productratings.product_ratings_sum + EXCLUDED.product_ratings_sum,
+    product_ratings_1 = productratings.product_ratings_1 + EXCLUDED.product_ratings_1,
+    product_ratings_2 = productratings.product_ratings_2 + EXCLUDED.product_ratings_2,
+    product_ratings_3 = productratings.product_ratings_3 + EXCLUDED.product_ratings_3,
+    product_ratings_4 = productratings.product_ratings_4 + EXCLUDED.product_ratings_4,
+    product_ratings_5 = productratings.product_ratings_5 + EXCLUDED.product_ratings_5,
+    product_ratings_updated_at = EXCLUDED.product_ratings_updated_at
+"""
+
+_REBUILD_SQL = """
+INSERT INTO productratings (
+    product_ratings_product_id, product_ratings_count, product_ratings_sum,
+    product_ratings_1, product_ratings_2, product_ratings_3, product_ratings_4, product_ratings_5,
+    product_ratings_updated_at
+)
+SELECT p.products_id,
+       count(r.reviews_id), coalesce(sum(r.reviews_rating), 0),
+       count(*) FILTER (WHERE r.reviews_rating = 1),
+       count(*) FILTER (WHERE r.reviews_rating = 2),
+       count(*) FILTER (WHERE r.reviews_rating = 3),
+       count(*) FILTER (WHERE r.reviews_rating = 4),
+       count(*) FILTER (WHERE r.reviews_rating = 5),
+       now()
+  FROM products p
+  LEFT JOIN reviews r ON r.reviews_product_id = p.products_id AND r.reviews_approved
+ WHERE {where}
+ GROUP BY p.products_id
+ON CONFLICT (product_ratings_product_id) DO UPDATE SET
+    product_ratings_count = EXCLUDED.product_ratings_count,
+    product_ratings_sum = EXCLUDED.product_ratings_sum,
+    product_ratings_1 = EXCLUDED.product_ratings_1,
+    product_ratings_2 = EXCLUDED.product_ratings_2,
+    product_ratings_3 = EXCLUDED.product_ratings_3,
+    product_ratings_4 = EXCLUDED.product_ratings_4,
+    product_ratings_5 = EXCLUDED.product_ratings_5,
+    product_ratings_updated_at = EXCLUDED.product_ratings_updated_at
+"""
+
+
+def _apply_delta(cursor, product_id, rating, sign):
+    histogram = [0] * 5
+    if 1 <= rating <= 5:
+        histogram[rating - 1] = sign
+    cursor.execute(_DELTA_SQL, [product_id, sign, sign * rating, *histogram])
+
+
+def _lock_review(cursor, review_id):
+    cursor.execute(
+        """SELECT reviews_product_id, reviews_rating, reviews_approved
+           FROM reviews WHERE reviews_id = %s FOR UPDATE""",
+        [review_id]
+    )
+    return cursor.fetchone()
+
+
+def set_review_approved(review_id, approved):
+    """
+    Одобряет или отклоняет отзыв и в той же транзакции корректирует сводку.
+    Возвращает ID товара или None, если отзыва нет.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            row = _lock_review(cursor, review_id)
+            if row is None:
+                return None
+            product_id, rating, was_approved = row
+            cursor.execute(
+                "UPDATE reviews SET reviews_approved = %s WHERE reviews_id = %s",
+                [approved, review_id]
+            )
+            if bool(was_approved) != approved:
+                _apply_delta(cursor, product_id, rating, 1 if approved else -1)
+    reviews_changed.send(sender=Reviews, product_ids=[product_id])
+    return product_id
+
+
+def delete_review(review_id):
+    """Удаляет отзыв и в той же транзакции корректирует сводку. Возвращает ID товара или None."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            row = _lock_review(cursor, review_id)
+            if row is None:
+                return None
+            product_id, rating, was_approved = row
+            cursor.execute("DELETE FROM reviews WHERE reviews_id = %s", [review_id])
+            if was_approved:
+                _apply_delta(cursor, product_id, rating, -1)
+    reviews_changed.send(sender=Reviews, product_ids=[product_id])
+    return product_id
+
+
+def rebuild_ratings(product_ids=None):
+    """
+    Пересчитывает сводки по таблице reviews (без аргумента — для всех товаров).
+    Возвращает число обновленных сводок.
+    """
+    if product_ids is None:
+        where, params = 'TRUE', []
+    else:
+        if not product_ids:
+            return 0
+        where, params = 'p.products_id = ANY(%s)', [list(product_ids)]
+    with connection.cursor() as cursor:
+        cursor.execute(_REBUILD_SQL.format(where=where), params)
+        return cursor.rowcount
+
+
+@receiver([post_save, post_delete], sender=Reviews)
+def _review_saved(sender, instance, **kwargs):
+    # Сохранение через ORM: пересчитываем сводку товара и сообщаем об изменении
+    rebuild_ratings([instance.reviews_product_id])
+    reviews_changed.send(sender=Reviews, product_ids=[instance.reviews_product_id])
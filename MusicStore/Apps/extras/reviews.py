@@ -0,0 +1,94 @@
+"""
+Лента одобренных отзывов товара.
+
+Отзывы выдаются keyset-страницами (см. Apps.catalog.pagination) в двух
+порядках: новые сначала и по оценке. Первая страница каждого порядка —
+то, что видит почти каждый посетитель товара, — кешируется по товару и
+сбрасывается по сигналу reviews_changed (модерация, правка отзыва).
+
+Страница отдается словарями только с теми полями, что показывает шаблон:
+в общий кеш не должны попадать экземпляры Users с хэшем пароля и
+секретным словом.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import receiver
+
+from Apps.catalog.pagination import KeysetPage, KeysetPaginator, InvalidCursor
+from .models import Reviews
+from .signals import reviews_changed
+
+REVIEWS_PAGE_SIZE = 10
+REVIEWS_CACHE_TIMEOUT = 60 * 30
+
+REVIEW_SORT_OPTIONS = {
+    'newest': ['-reviews_date', 'reviews_id'],  # Новые сначала
+    'rating_desc': ['-reviews_rating', '-reviews_date', 'reviews_id'],  # Сначала положительные
+    'rating_asc': ['reviews_rating', '-reviews_date', 'reviews_id'],  # Сначала отрицательные
+}
+DEFAULT_REVIEW_SORT = 'newest'
+
+
+def _cache_key(product_id, sort_by):
+    return f'extras:reviews:{product_id}:{sort_by}'
+
+
+def _paginator(sort_by):
+    return KeysetPaginator(
+        REVIEW_SORT_OPTIONS[sort_by], REVIEWS_PAGE_SIZE, salt='extras.reviews.' + sort_by
+    )
+
+
+def approved_reviews(product_id):
+    return (Reviews.objects
+            .filter(reviews_product_id=product_id, reviews_approved=True)
+            .select_related('reviews_user'))
+
+
+def _review_items(page):
+    return [
+        {
+            'author': review.reviews_user.users_email,
+            'rating': review.reviews_rating,
+            'comment': review.reviews_comment,
+            'date': review.reviews_date,
+        }
+        for review in page
+    ]
+
+
+def get_reviews_page(product_id, sort_by=DEFAULT_REVIEW_SORT, cursor=None):
+    """
+    Одна страница одобренных отзывов товара. Неизвестная сортировка заменяется
+    сортировкой по умолчанию, некорректный курсор — первой страницей.
+    """
+    if sort_by not in REVIEW_SORT_OPTIONS:
+        sort_by = DEFAULT_REVIEW_SORT
+    paginator = _paginator(sort_by)
+    queryset = approved_reviews(product_id)
+    if cursor:
+        try:
+            page = paginator.paginate(queryset, cursor)
+            return KeysetPage(_review_items(page), page.next_cursor)
+        except InvalidCursor:
+            pass
+
+    cache_key = _cache_key(product_id, sort_by)
+    cached = cache.get(cache_key)
+    if cached is None:
+        page = paginator.paginate(queryset)
+        cached = (_review_items(page), page.next_cursor)
+        cache.set(cache_key, cached, REVIEWS_CACHE_TIMEOUT)
+    return KeysetPage(*cached)
+
+
+def invalidate_reviews_cache(product_ids):
+    keys = [_cache_key(pid, sort_by) for pid in product_ids for sort_by in REVIEW_SORT_OPTIONS]
+    if keys:
+        cache.delete_many(keys)
+
+
+@receiver(reviews_changed)
+def _on_reviews_changed(sender, product_ids, **kwargs):
+    # После фиксации транзакции: иначе параллельный запрос успеет закешировать старые данные
+    transaction.on_commit(lambda: invalidate_reviews_cache(product_ids))
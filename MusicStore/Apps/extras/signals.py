@@ -0,0 +1,11 @@
+"""
+Сигналы об изменении отзывов.
+
+reviews_changed отправляется после того, как сводка рейтинга уже обновлена:
+при модерации — функциями Apps.extras.ratings, при сохранениях через ORM —
+обработчиком post_save/post_delete там же.
+"""
+from django.dispatch import Signal
+
+# Аргументы: product_ids — список ID товаров, у которых изменились отзывы
+reviews_changed = Signal()
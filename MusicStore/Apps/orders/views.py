@@ -7,8 +7,10 @@ from django.utils.html import format_html
 from django.urls import reverse
 from .models import Orders, Orderitems, Orderstatuses, Orderhistory
 from Apps.users.models import Users, Addresses
-from Apps.users.utils import get_user_card, ensure_usercards_table
+from Apps.users.store_user import require_store_user, require_store_user_id
+from Apps.users.utils import get_user_card
 from Apps.cart.models import Carts, Cartitems
+from Apps.catalog.signals import stock_changed
 from Apps.payments.models import Paymentmethods, Deliverymethods, Payments
 from .forms import OrderForm
 
@@ -17,7 +19,7 @@ from .forms import OrderForm
 def checkout_view(request):
     """Страница оформления заказа"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
+        user_model = require_store_user(request)
         
         # Получаем корзину пользователя
         cart = Carts.objects.filter(carts_user=user_model).first()
@@ -58,8 +60,6 @@ def checkout_view(request):
         
         existing_addresses = Addresses.objects.filter(addresses_user=user_model)
         
-        ensure_usercards_table()
-        
         # Получаем сохраненную карту пользователя
         saved_card = get_user_card(user_model)
         
@@ -237,6 +237,13 @@ def checkout_view(request):
                                 [cart.carts_id]
                             )
                         
+                        # Остатки изменились — сообщаем каталогу после фиксации заказа:
+                        # иначе карточки и кеш пересоберутся по неподтвержденным данным
+                        ordered_ids = [item.cart_items_product.products_id for item in cart_items]
+                        transaction.on_commit(
+                            lambda: stock_changed.send(sender=Orders, product_ids=ordered_ids)
+                        )
+                        
                         messages.success(
                             request,
                             f'Заказ №{order.orders_id} успешно оформлен! '
@@ -280,8 +287,8 @@ def checkout_view(request):
 def order_success_view(request, order_id):
     """Страница успешного оформления заказа"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        order = get_object_or_404(Orders, orders_id=order_id, orders_user=user_model)
+        user_id = require_store_user_id(request)
+        order = get_object_or_404(Orders, orders_id=order_id, orders_user_id=user_id)
         
         order_items = Orderitems.objects.filter(order_items_order=order)
         total = sum(
@@ -304,8 +311,8 @@ def order_success_view(request, order_id):
 def orders_view(request):
     """Страница списка заказов пользователя"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        orders = Orders.objects.filter(orders_user=user_model).order_by('-orders_date')
+        user_id = require_store_user_id(request)
+        orders = Orders.objects.filter(orders_user_id=user_id).order_by('-orders_date')
         
         # Добавляем информацию о товарах в каждом заказе
         orders_with_items = []
@@ -347,11 +354,11 @@ def orders_view(request):
 def cancel_order_view(request, order_id):
     """Отмена заказа клиентом с возвратом товаров на склад"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        order = get_object_or_404(Orders, pk=order_id, orders_user=user_model)
+        user_id = require_store_user_id(request)
+        order = get_object_or_404(Orders, pk=order_id, orders_user_id=user_id)
         
         # Проверяем, что заказ принадлежит текущему пользователю
-        if order.orders_user != user_model:
+        if order.orders_user_id != user_id:
             messages.error(request, 'У вас нет доступа к этому заказу.')
             return redirect('orders')
         
@@ -446,6 +453,12 @@ def cancel_order_view(request, order_id):
                             failed_count += 1
                             failed_products.append(f"{product_name} (ошибка: {str(e)})")
                 
+                # Каталогу — после фиксации отмены, когда остатки уже видны
+                returned_ids = [row[0] for row in order_items_data]
+                transaction.on_commit(
+                    lambda: stock_changed.send(sender=Orders, product_ids=returned_ids)
+                )
+                
                 if returned_count > 0:
                     msg = f'Заказ #{order_id} отменен. {returned_count} товар(ов) возвращено на склад!'
                     if returned_products:
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Apps.users'
+
+    def ready(self):
+        # Обработчики сброса кеша профиля магазина (request.store_user),
+        # синхронизации хэша пароля с Users и проверка таблиц favorites/usercards
+        from . import store_user, credentials, schema  # noqa: F401
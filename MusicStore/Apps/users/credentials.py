@@ -0,0 +1,76 @@
+"""
+Единое хранилище паролей для пары auth_user / Users.
+
+Пароль хранится в двух таблицах: auth_user.password (по нему входит Django)
+и users.users_password_hash. Раньше каждая операция считала PBKDF2 дважды —
+create_user/set_password и отдельно make_password для Users. Здесь хэш
+вычисляется один раз, одна и та же строка записывается в обе таблицы, а
+запись выполняется в одной транзакции, чтобы таблицы не расходились.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Users
+
+
+def _apply_hash(auth_user, raw_password, password_hash):
+    auth_user.password = password_hash
+    # Как в set_password: после save() Django уведомит валидаторы паролей
+    auth_user._password = raw_password
+
+
+def create_account(email, raw_password, *, first_name, last_name,
+                   middle_name=None, phone=None, secret_word=None):
+    """Создает учетную запись Django и профиль Users с одним хэшем пароля."""
+    password_hash = make_password(raw_password)
+    auth_user = get_user_model()(
+        username=email,  # используем email как username
+        email=email,
+        first_name=first_name,
+        last_name=last_name,
+    )
+    _apply_hash(auth_user, raw_password, password_hash)
+    with transaction.atomic():
+        auth_user.save()
+        Users.objects.create(
+            users_email=email,
+            users_password_hash=password_hash,
+            users_first_name=first_name,
+            users_last_name=last_name,
+            users_middle_name=middle_name or None,
+            users_phone=phone or None,
+            users_secret_word=secret_word,
+        )
+    return auth_user
+
+
+def set_account_password(auth_user, raw_password):
+    """Меняет пароль в auth_user и Users (один хэш, одна транзакция)."""
+    password_hash = make_password(raw_password)
+    _apply_hash(auth_user, raw_password, password_hash)
+    with transaction.atomic():
+        auth_user.save(update_fields=['password'])
+        _sync_profile_hash(auth_user)
+    return auth_user
+
+
+def _sync_profile_hash(auth_user):
+    (Users.objects
+     .filter(users_email=auth_user.email)
+     .exclude(users_password_hash=auth_user.password)
+     .update(users_password_hash=auth_user.password))
+
+
+@receiver(post_save, sender=get_user_model())
+def _on_password_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # Пароль меняется и в обход set_account_password: Django сам обновляет хэш
+    # при входе, если сменились параметры хэшера (save(update_fields=['password'])),
+    # а сброс по ссылке из письма и админка сохраняют пользователя целиком.
+    # Переносим хэш в Users без повторного хэширования; если он уже совпадает
+    # (set_account_password), UPDATE не затрагивает строк.
+    if created or (update_fields is not None and 'password' not in update_fields):
+        return
+    _sync_profile_hash(instance)
@@ -4,8 +4,8 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import PasswordResetForm
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth.hashers import make_password
 from .models import Users
+from .credentials import create_account, set_account_password
 
 
 class RegistrationForm(forms.Form):
@@ -90,28 +90,17 @@ class RegistrationForm(forms.Form):
         phone = self.cleaned_data.get('phone')
         secret_word = self.cleaned_data.get('secret_word')
 
-        # Создаём Django auth пользователя для входа
-        auth_user = User.objects.create_user(
-            username=email,  # используем email как username
-            email=email,
-            password=password,
+        # Учетная запись Django и запись в нашей таблице Users — с одним хэшем пароля
+        return create_account(
+            email,
+            password,
             first_name=first_name,
             last_name=last_name,
+            middle_name=middle_name,
+            phone=phone,
+            secret_word=secret_word,
         )
 
-        # Создаём запись в нашей таблице Users
-        Users.objects.create(
-            users_email=email,
-            users_password_hash=make_password(password),
-            users_first_name=first_name,
-            users_last_name=last_name,
-            users_middle_name=middle_name or None,
-            users_phone=phone or None,
-            users_secret_word=secret_word,
-        )
-
-        return auth_user
-
 
 class SecretWordPasswordResetForm(PasswordResetForm):
     secret_word = forms.CharField(label='Секретное слово', max_length=255)
@@ -175,18 +164,12 @@ class ResetBySecretForm(forms.Form):
         email = self.cleaned_data['email'].strip().lower()
         new_password = self.cleaned_data['new_password1']
 
-        # Обновляем пароль в Django auth_user
+        # Пароль в auth_user и хэш в нашей таблице Users обновляются вместе
         try:
             auth_user = User.objects.get(email=email)
         except User.DoesNotExist:
             auth_user = User.objects.get(username=email)
-        auth_user.set_password(new_password)
-        auth_user.save()
-
-        # Обновляем хэш в нашей таблице Users
-        Users.objects.filter(users_email=email).update(users_password_hash=make_password(new_password))
-
-        return auth_user
+        return set_account_password(auth_user, new_password)
 
 
 class CardForm(forms.Form):
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Таблицы раньше создавались на лету (CREATE TABLE IF NOT EXISTS в каждом
+# запросе); IF NOT EXISTS оставлен для баз, где они уже есть.
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS favorites (
+    favorites_id SERIAL PRIMARY KEY,
+    favorites_user_id INTEGER NOT NULL REFERENCES users (users_id) ON DELETE CASCADE,
+    favorites_product_id INTEGER NOT NULL REFERENCES products (products_id) ON DELETE CASCADE,
+    favorites_added_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT favorites_unique UNIQUE (favorites_user_id, favorites_product_id)
+);
+CREATE INDEX IF NOT EXISTS favorites_user_idx ON favorites (favorites_user_id);
+CREATE INDEX IF NOT EXISTS favorites_product_idx ON favorites (favorites_product_id);
+
+CREATE TABLE IF NOT EXISTS usercards (
+    usercards_id SERIAL PRIMARY KEY,
+    usercards_user_id INTEGER NOT NULL REFERENCES users (users_id) ON DELETE CASCADE,
+    usercards_card_number_hash VARCHAR(255) NOT NULL,
+    usercards_card_last_four VARCHAR(4) NOT NULL,
+    usercards_card_expiry_encrypted VARCHAR(255) NOT NULL,
+    usercards_card_cvv_hash VARCHAR(255) NOT NULL,
+    usercards_card_holder_name VARCHAR(100) NOT NULL,
+    usercards_created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
+    usercards_updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
+    usercards_is_default BOOLEAN DEFAULT FALSE
+);
+CREATE INDEX IF NOT EXISTS usercards_user_idx ON usercards (usercards_user_id);
+"""
+
+REVERSE_SQL = """
+DROP TABLE IF EXISTS usercards;
+DROP TABLE IF EXISTS favorites;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Favorites',
+            fields=[
+                ('favorites_id', models.AutoField(primary_key=True, serialize=False)),
+                ('favorites_user', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='users.users')),
+                ('favorites_product', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='catalog.products')),
+                ('favorites_added_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'favorites',
+                'managed': False,
+                'unique_together': {('favorites_user', 'favorites_product')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Usercards',
+            fields=[
+                ('usercards_id', models.AutoField(primary_key=True, serialize=False)),
+                ('usercards_user', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='users.users')),
+                ('usercards_card_number_hash', models.CharField(max_length=255)),
+                ('usercards_card_last_four', models.CharField(max_length=4)),
+                ('usercards_card_expiry_encrypted', models.CharField(max_length=255)),
+                ('usercards_card_cvv_hash', models.CharField(max_length=255)),
+                ('usercards_card_holder_name', models.CharField(max_length=100)),
+                ('usercards_created_at', models.DateTimeField(blank=True, null=True)),
+                ('usercards_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('usercards_is_default', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'usercards',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
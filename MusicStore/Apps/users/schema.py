@@ -0,0 +1,74 @@
+"""
+Проверка готовности схемы для таблиц favorites и usercards.
+
+Раньше таблицы создавались прямо в обработке запросов (CREATE TABLE / INDEX
+IF NOT EXISTS при каждом показе каталога, главной, карточки товара и т. д.).
+Теперь их создает миграция users.0002_favorites_usercards, а здесь наличие
+таблиц проверяется один раз на процесс: результат запоминается, и при
+отсутствии таблиц выдается понятная ошибка вместо DDL в каждом запросе.
+Та же проверка подключена к manage.py check --database и migrate (как
+предупреждение — иначе она мешала бы самой миграции).
+"""
+import threading
+
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+
+REQUIRED_TABLES = ('favorites', 'usercards')
+
+_MIGRATE_HINT = 'Выполните: python manage.py migrate users'
+
+_ready = False
+_lock = threading.Lock()
+
+
+class UserTablesMissing(ImproperlyConfigured):
+    pass
+
+
+def missing_tables(using_connection=connection):
+    """Таблицы из REQUIRED_TABLES, которых нет в БД (один запрос)."""
+    with using_connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NULL",
+            [list(REQUIRED_TABLES)]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_user_tables():
+    """
+    Проверяет наличие таблиц один раз на процесс; повторные вызовы не
+    обращаются к БД. Без таблиц выбрасывает UserTablesMissing.
+    """
+    global _ready
+    if _ready:
+        return
+    with _lock:
+        if _ready:
+            return
+        missing = missing_tables()
+        if missing:
+            raise UserTablesMissing(
+                f'В БД нет таблиц {", ".join(missing)}. {_MIGRATE_HINT}'
+            )
+        _ready = True
+
+
+@checks.register(checks.Tags.database)
+def check_user_tables(app_configs=None, databases=None, **kwargs):
+    warnings = []
+    for alias in databases or ():
+        try:
+            missing = missing_tables(connections[alias])
+        except Exception:
+            # Недоступная БД — отдельная проблема, о ней сообщат другие проверки
+            continue
+        if missing:
+            warnings.append(checks.Warning(
+                f'В БД "{alias}" нет таблиц {", ".join(missing)}.',
+                hint=_MIGRATE_HINT,
+                id='users.W001',
+            ))
+    return warnings
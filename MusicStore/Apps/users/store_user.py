@@ -0,0 +1,140 @@
+"""
+Профиль магазина (Apps.users.Users) текущего пользователя.
+
+Учетная запись Django (auth_user) и профиль магазина связаны только email,
+поэтому раньше почти каждое представление искало профиль запросом
+Users.objects.get(users_email=request.user.email), а некоторые — дважды.
+
+StoreUserMiddleware добавляет в запрос ленивый request.store_user: профиль
+находится не более одного раза за запрос и только если он нужен. Соответствие
+auth_user.id -> users_id хранится в кеше вместе с email, так что в следующих
+запросах ID профиля известен без обращения к БД, а строка профиля читается по
+первичному ключу только там, где нужны ее поля. Запись сбрасывается при
+изменении email учетной записи или профиля (обработчики сигналов ниже).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from .models import Users
+
+STORE_USER_CACHE_TIMEOUT = getattr(settings, 'STORE_USER_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# auth_user.id -> (email, users_id)
+_CACHE_KEY = 'users:store_user:{}'
+# users_id -> auth_user.id (чтобы сбросить запись при изменении профиля)
+_REVERSE_KEY = 'users:store_user:auth:{}'
+
+_MISSING = object()
+
+
+def _remember(auth_user, users_id):
+    cache.set_many({
+        _CACHE_KEY.format(auth_user.pk): (auth_user.email, users_id),
+        _REVERSE_KEY.format(users_id): auth_user.pk,
+    }, STORE_USER_CACHE_TIMEOUT)
+
+
+def forget_store_user(auth_user_id=None, users_id=None):
+    """Сбрасывает закешированное соответствие учетной записи и профиля."""
+    keys = []
+    if users_id is not None:
+        keys.append(_REVERSE_KEY.format(users_id))
+        if auth_user_id is None:
+            auth_user_id = cache.get(_REVERSE_KEY.format(users_id))
+    if auth_user_id is not None:
+        keys.append(_CACHE_KEY.format(auth_user_id))
+    if keys:
+        cache.delete_many(keys)
+
+
+def _load_profile(request):
+    """Находит профиль по email (промах кеша) и запоминает его на время запроса."""
+    profile = Users.objects.filter(users_email=request.user.email).first()
+    request._cached_store_user = profile
+    if profile is not None:
+        _remember(request.user, profile.users_id)
+    return profile
+
+
+def get_store_user_id(request):
+    """ID профиля магазина текущего пользователя или None (обычно без запросов к БД)."""
+    if not hasattr(request, '_store_user_id'):
+        users_id = None
+        if request.user.is_authenticated and request.user.email:
+            cached = cache.get(_CACHE_KEY.format(request.user.pk))
+            if cached is not None and cached[0] == request.user.email:
+                users_id = cached[1]
+            else:
+                profile = _load_profile(request)
+                users_id = profile.users_id if profile is not None else None
+        request._store_user_id = users_id
+    return request._store_user_id
+
+
+def get_store_user(request):
+    """Профиль магазина текущего пользователя или None; читается не более раза за запрос."""
+    profile = getattr(request, '_cached_store_user', _MISSING)
+    if profile is _MISSING:
+        users_id = get_store_user_id(request)
+        profile = getattr(request, '_cached_store_user', _MISSING)
+        if profile is _MISSING:
+            profile = Users.objects.filter(pk=users_id).first() if users_id is not None else None
+            if profile is None and users_id is not None:
+                # Профиль удален — соответствие в кеше устарело
+                forget_store_user(request.user.pk, users_id)
+            request._cached_store_user = profile
+    return profile
+
+
+def require_store_user(request):
+    """Как get_store_user, но без профиля выбрасывает Users.DoesNotExist."""
+    profile = get_store_user(request)
+    if profile is None:
+        raise Users.DoesNotExist('Профиль пользователя не найден.')
+    return profile
+
+
+def require_store_user_id(request):
+    """Как get_store_user_id, но без профиля выбрасывает Users.DoesNotExist."""
+    users_id = get_store_user_id(request)
+    if users_id is None:
+        raise Users.DoesNotExist('Профиль пользователя не найден.')
+    return users_id
+
+
+class StoreUserMiddleware:
+    """
+    Добавляет request.store_user — ленивый профиль магазина (Users или None).
+    Ставится после AuthenticationMiddleware. В коде представлений удобнее
+    get_store_user / require_store_user: они возвращают сам объект, а не обертку.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.store_user = SimpleLazyObject(lambda: get_store_user(request))
+        return self.get_response(request)
+
+
+@receiver(post_save, sender=get_user_model())
+def _on_auth_user_saved(sender, instance, update_fields=None, **kwargs):
+    # Вход обновляет только last_login — соответствие от этого не меняется
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    forget_store_user(auth_user_id=instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def _on_auth_user_deleted(sender, instance, **kwargs):
+    forget_store_user(auth_user_id=instance.pk)
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def _on_profile_changed(sender, instance, **kwargs):
+    forget_store_user(users_id=instance.users_id)
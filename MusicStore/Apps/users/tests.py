@@ -1,3 +1,215 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.contrib.auth.forms import SetPasswordForm
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import credentials, throttling
+from .credentials import create_account, set_account_password
+from .models import Users
+from .throttling import CacheBucketStore, LocalBucketStore, check_credential_attempt
+
+
+class LegacyPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Прежние параметры хэшера: хэши с ними Django обновляет при входе."""
+    iterations = 1
+
+
+class CurrentPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Малое число итераций — только чтобы тесты шли быстро
+    iterations = 2
+
+
+LEGACY_HASHERS = ['Apps.users.tests.LegacyPBKDF2PasswordHasher']
+CURRENT_HASHERS = ['Apps.users.tests.CurrentPBKDF2PasswordHasher']
+
+PASSWORD = 'Gitara-2024!'
+
+
+@override_settings(PASSWORD_HASHERS=CURRENT_HASHERS)
+class CredentialsSyncTests(TestCase):
+    """Один хэш пароля в auth_user и Users (Apps.users.credentials)."""
+
+    email = 'player@example.com'
+
+    def _create(self, password=PASSWORD):
+        return create_account(self.email, password, first_name='Анна', last_name='Петрова')
+
+    def _profile_hash(self):
+        return Users.objects.get(users_email=self.email).users_password_hash
+
+    def test_create_account_hashes_once(self):
+        with mock.patch.object(credentials, 'make_password', wraps=credentials.make_password) as make:
+            auth_user = self._create()
+
+        make.assert_called_once_with(PASSWORD)
+        auth_user.refresh_from_db()
+        self.assertEqual(self._profile_hash(), auth_user.password)
+        self.assertTrue(check_password(PASSWORD, self._profile_hash()))
+        self.assertEqual(auth_user.username, self.email)
+
+    def test_set_account_password_updates_both(self):
+        auth_user = self._create()
+        with mock.patch.object(credentials, 'make_password', wraps=credentials.make_password) as make:
+            set_account_password(auth_user, 'Baraban-2025!')
+
+        make.assert_called_once_with('Baraban-2025!')
+        auth_user.refresh_from_db()
+        self.assertTrue(auth_user.check_password('Baraban-2025!'))
+        self.assertEqual(self._profile_hash(), auth_user.password)
+
+    def test_password_set_outside_credentials_is_synced(self):
+        # Сброс по ссылке из письма: SetPasswordForm сохраняет пользователя целиком
+        auth_user = self._create()
+        form = SetPasswordForm(auth_user, {'new_password1': 'Skripka-2025!', 'new_password2': 'Skripka-2025!'})
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        auth_user.refresh_from_db()
+        self.assertEqual(self._profile_hash(), auth_user.password)
+        self.assertTrue(check_password('Skripka-2025!', self._profile_hash()))
+
+    def test_other_updates_keep_profile_hash(self):
+        auth_user = self._create()
+        before = self._profile_hash()
+        auth_user.first_name = 'Мария'
+        auth_user.save(update_fields=['first_name'])
+
+        self.assertEqual(self._profile_hash(), before)
+
+    def test_rehash_on_login_is_copied_to_profile(self):
+        with self.settings(PASSWORD_HASHERS=LEGACY_HASHERS):
+            auth_user = self._create()
+        legacy_hash = self._profile_hash()
+        self.assertIn('$1$', legacy_hash)
+
+        with mock.patch.object(credentials, 'make_password') as make:
+            user = authenticate(username=self.email, password=PASSWORD)
+
+        self.assertEqual(user.pk, auth_user.pk)
+        make.assert_not_called()
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, legacy_hash)
+        self.assertIn('$2$', user.password)
+        self.assertEqual(self._profile_hash(), user.password)
+
+    def test_failed_login_keeps_hashes(self):
+        with self.settings(PASSWORD_HASHERS=LEGACY_HASHERS):
+            self._create()
+        legacy_hash = self._profile_hash()
+
+        self.assertIsNone(authenticate(username=self.email, password='wrong'))
+        self.assertEqual(self._profile_hash(), legacy_hash)
+        self.assertEqual(get_user_model().objects.get(email=self.email).password, legacy_hash)
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class CredentialThrottleTests(SimpleTestCase):
+    """Корзины токенов для попыток входа (Apps.users.throttling)."""
+
+    rates = {'ip': (4, 60), 'email': (2, 60)}
+
+    def setUp(self):
+        self.clock = FakeClock()
+        for target, value in (
+            ('time', self.clock),
+            ('CREDENTIAL_THROTTLE_RATES', self.rates),
+            ('_local', LocalBucketStore()),
+            ('_shared', None),
+        ):
+            patcher = mock.patch.object(throttling, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def _attempt(self, email=None, ip='10.0.0.1'):
+        return check_credential_attempt(self.factory.post('/', REMOTE_ADDR=ip), email)
+
+    def test_email_bucket_allows_burst_then_refills(self):
+        self.assertEqual([self._attempt('a@example.com') for _ in range(3)], [0, 0, 30])
+
+        # Токен пополняется за period / capacity секунд
+        self.clock.now += 29
+        self.assertEqual(self._attempt('a@example.com'), 1)
+        self.clock.now += 1
+        self.assertEqual(self._attempt('a@example.com'), 0)
+
+    def test_email_is_normalized(self):
+        self._attempt('a@example.com')
+        self._attempt(' A@Example.COM ')
+        self.assertTrue(self._attempt('a@EXAMPLE.com'))
+
+    def test_buckets_are_independent(self):
+        self._attempt('a@example.com', ip='10.0.0.1')
+        self._attempt('a@example.com', ip='10.0.0.2')
+
+        # Тот же логин с другого IP — отказ, другой логин — можно
+        self.assertTrue(self._attempt('a@example.com', ip='10.0.0.3'))
+        self.assertEqual(self._attempt('b@example.com', ip='10.0.0.1'), 0)
+
+    def test_ip_bucket_limits_many_logins(self):
+        results = [self._attempt(f'user{i}@example.com') for i in range(5)]
+
+        self.assertEqual(results[:4], [0, 0, 0, 0])
+        self.assertEqual(results[4], 15)
+        self.assertEqual(self._attempt(ip='10.0.0.2'), 0)
+
+    def test_rejected_attempts_do_not_drain_further(self):
+        for _ in range(2):
+            self._attempt('a@example.com')
+        for _ in range(10):
+            self._attempt('a@example.com')
+
+        self.clock.now += 30
+        self.assertEqual(self._attempt('a@example.com'), 0)
+
+    def test_local_store_evicts_oldest(self):
+        store = LocalBucketStore(limit=2)
+        now = self.clock.now
+        self.assertEqual(store.take('first', 1, 60, now), 0)
+        self.assertTrue(store.take('first', 1, 60, now))
+        store.take('second', 1, 60, now)
+        store.take('third', 1, 60, now)
+
+        # 'first' вытеснен и снова полон
+        self.assertEqual(store.take('first', 1, 60, now), 0)
+
+    def test_shared_bucket_limits_across_processes(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch.object(throttling, '_shared', CacheBucketStore('default')):
+            self._attempt('a@example.com')
+            self._attempt('a@example.com')
+            # Другой процесс: своя корзина в памяти пуста, общая — исчерпана
+            with mock.patch.object(throttling, '_local', LocalBucketStore()):
+                self.assertTrue(self._attempt('a@example.com'))
+
+    def test_login_view_returns_429(self):
+        data = {'username': 'a@example.com', 'password': 'wrong'}
+        with mock.patch('django.contrib.auth.forms.authenticate', return_value=None) as auth:
+            statuses = [self.client.post(reverse('login'), data).status_code for _ in range(3)]
+            self.assertEqual(auth.call_count, 2)
+        response = self.client.post(reverse('login'), data)
+
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_token_view_is_throttled(self):
+        url = reverse('token_obtain_pair')
+        data = {'username': 'a@example.com', 'password': 'wrong'}
+        with mock.patch('rest_framework_simplejwt.serializers.authenticate', return_value=None) as auth:
+            statuses = [self.client.post(url, data).status_code for _ in range(3)]
+            self.assertEqual(auth.call_count, 2)
+
+        self.assertEqual(statuses, [401, 401, 429])
@@ -0,0 +1,153 @@
+"""
+Ограничение попыток входа и сброса пароля (token bucket).
+
+Каждая попытка входа (форма входа, сброс по секретному слову, JWT
+TokenObtainPairView) стоит полного вычисления PBKDF2, поэтому перебор
+учетных данных быстро занимает все воркеры. Попытки ограничиваются двумя
+корзинами токенов — по IP клиента и по email (логину), — и отказ выдается
+до проверки пароля и до любых запросов к БД.
+
+Корзина с емкостью N и периодом T допускает всплеск из N попыток, после
+чего пополняется со скоростью N / T попыток в секунду
+(CREDENTIAL_THROTTLE_RATES). Состояние корзин хранится в памяти процесса;
+если задан CREDENTIAL_THROTTLE_CACHE (псевдоним кеша, например общий Redis),
+попытка дополнительно проверяется по общей корзине, и лимит действует на
+все процессы сразу. Общая корзина обновляется без блокировок, поэтому при
+одновременных попытках лимит может быть немного превышен.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.shortcuts import render
+from rest_framework.throttling import BaseThrottle
+
+# (емкость корзины, секунд до полного пополнения)
+CREDENTIAL_THROTTLE_RATES = getattr(settings, 'CREDENTIAL_THROTTLE_RATES', {
+    'ip': (20, 60),
+    'email': (5, 300),
+})
+CREDENTIAL_THROTTLE_CACHE = getattr(settings, 'CREDENTIAL_THROTTLE_CACHE', None)
+# Брать IP из X-Forwarded-For (только за доверенным обратным прокси)
+CREDENTIAL_THROTTLE_TRUST_FORWARDED = getattr(settings, 'CREDENTIAL_THROTTLE_TRUST_FORWARDED', False)
+# Сколько корзин держать в памяти процесса
+LOCAL_BUCKETS_LIMIT = 10000
+
+_KEY = 'users:throttle:{}:{}'
+
+
+class LocalBucketStore:
+    """Корзины в памяти процесса; самые старые вытесняются при переполнении."""
+
+    def __init__(self, limit=LOCAL_BUCKETS_LIMIT):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._limit = limit
+
+    def take(self, key, capacity, period, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens, retry_after = _take(tokens, updated, capacity, period, now)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self._limit:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class CacheBucketStore:
+    """Корзины в общем кеше Django (без блокировок, допускает небольшое превышение)."""
+
+    def __init__(self, alias):
+        self._alias = alias
+
+    def take(self, key, capacity, period, now):
+        cache = caches[self._alias]
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens, retry_after = _take(tokens, updated, capacity, period, now)
+        # Через period секунд корзина снова полная — хранить ее дольше незачем
+        cache.set(key, (tokens, now), math.ceil(period))
+        return retry_after
+
+
+def _take(tokens, updated, capacity, period, now):
+    """Пополняет корзину и забирает токен; возвращает (токены, 0 или секунды до повтора)."""
+    rate = capacity / period
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+_local = LocalBucketStore()
+_shared = CacheBucketStore(CREDENTIAL_THROTTLE_CACHE) if CREDENTIAL_THROTTLE_CACHE else None
+
+
+def client_ip(request):
+    if CREDENTIAL_THROTTLE_TRUST_FORWARDED:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _buckets(request, email):
+    yield 'ip', client_ip(request)
+    email = (email or '').strip().lower()
+    if email:
+        # В ключ кеша не кладем сам email
+        yield 'email', hashlib.sha256(email.encode()).hexdigest()[:32]
+
+
+def check_credential_attempt(request, email=None):
+    """
+    Учитывает попытку входа/сброса пароля. Возвращает 0, если попытку можно
+    обрабатывать, иначе — через сколько секунд повторить.
+    """
+    now = time.time()
+    for scope, ident in _buckets(request, email):
+        if scope not in CREDENTIAL_THROTTLE_RATES:
+            continue
+        capacity, period = CREDENTIAL_THROTTLE_RATES[scope]
+        key = _KEY.format(scope, ident)
+        # Сначала своя корзина процесса: всплеск отсекается без обращения к кешу
+        retry_after = _local.take(key, capacity, period, now)
+        if not retry_after and _shared is not None:
+            retry_after = _shared.take(key, capacity, period, now)
+        if retry_after:
+            return math.ceil(retry_after)
+    return 0
+
+
+def throttled_response(request, template_name, context, retry_after):
+    """Страница формы с сообщением об ограничении (HTTP 429, Retry-After)."""
+    messages.error(request, f'Слишком много попыток. Повторите через {retry_after} с.')
+    response = render(request, template_name, context, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class CredentialRateThrottle(BaseThrottle):
+    """
+    Throttle DRF для выдачи токенов: те же корзины по IP и логину
+    (username_field из тела запроса), проверка до валидации пароля.
+    """
+    username_field = 'username'
+
+    def allow_request(self, request, view):
+        self._retry_after = 0
+        if request.method != 'POST':
+            return True
+        try:
+            email = request.data.get(self.username_field)
+        except AttributeError:
+            email = None
+        self._retry_after = check_credential_attempt(request, email if isinstance(email, str) else None)
+        return not self._retry_after
+
+    def wait(self):
+        return self._retry_after or None
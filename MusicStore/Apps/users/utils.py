@@ -1,45 +1,23 @@
+import time
 from typing import Iterable, Set
 
-from django.db import connection
-from django.db.utils import ProgrammingError, OperationalError
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.utils import timezone
 
 from .models import Favorites, Usercards
+from .schema import ensure_user_tables
 from django.contrib.auth.hashers import make_password, check_password
 import base64
 import hashlib
 from django.conf import settings
 
-
-def ensure_favorites_table() -> None:
-    """
-    Создает таблицу favorites, если она отсутствует.
-    Нужна для проектов с существующей БД (managed = False).
-    """
-    with connection.cursor() as cursor:
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS favorites (
-                favorites_id SERIAL PRIMARY KEY,
-                favorites_user_id INTEGER NOT NULL REFERENCES users (users_id) ON DELETE CASCADE,
-                favorites_product_id INTEGER NOT NULL REFERENCES products (products_id) ON DELETE CASCADE,
-                favorites_added_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
-                CONSTRAINT favorites_unique UNIQUE (favorites_user_id, favorites_product_id)
-            );
-            """
-        )
-        cursor.execute(
-            """
-            CREATE INDEX IF NOT EXISTS favorites_user_idx
-            ON favorites (favorites_user_id);
-            """
-        )
-        cursor.execute(
-            """
-            CREATE INDEX IF NOT EXISTS favorites_product_idx
-            ON favorites (favorites_product_id);
-            """
-        )
+# Избранное пользователя в кеше: (users_id, версия) -> frozenset ID товаров.
+# Версия увеличивается после каждого изменения, поэтому читатель, загрузивший
+# набор до изменения, запишет его под старой версией и не затрет новый.
+FAVORITES_CACHE_TIMEOUT = getattr(settings, 'FAVORITES_CACHE_TIMEOUT', 60 * 60 * 24)
+_FAVORITES_CACHE_KEY = 'users:favorites:{}:{}'
+_FAVORITES_VERSION_KEY = 'users:favorites:{}:version'
 
 
 def register_favorite(user_id: int, product_id: int) -> bool:
@@ -47,7 +25,7 @@ def register_favorite(user_id: int, product_id: int) -> bool:
     Добавляет товар в избранное пользователя.
     Возвращает True, если запись создана, False если уже существовала.
     """
-    ensure_favorites_table()
+    ensure_user_tables()
     with connection.cursor() as cursor:
         cursor.execute(
             """
@@ -59,15 +37,15 @@ def register_favorite(user_id: int, product_id: int) -> bool:
             """,
             [user_id, product_id, timezone.now()],
         )
-        if cursor.rowcount:
-            cursor.fetchone()
-            return True
-        return False
+        created = bool(cursor.rowcount)
+    if created:
+        _refresh_favorite_set(user_id)
+    return created
 
 
 def remove_favorite(user_id: int, product_id: int) -> None:
     """Удаляет товар из избранного пользователя."""
-    ensure_favorites_table()
+    ensure_user_tables()
     with connection.cursor() as cursor:
         cursor.execute(
             """
@@ -76,52 +54,74 @@ def remove_favorite(user_id: int, product_id: int) -> None:
             """,
             [user_id, product_id],
         )
+        removed = bool(cursor.rowcount)
+    if removed:
+        _refresh_favorite_set(user_id)
 
 
-def get_user_favorite_ids(user_model, product_ids: Iterable[int] | None = None) -> Set[int]:
+def _load_favorite_set(user_id: int) -> frozenset:
+    ensure_user_tables()
+    return frozenset(
+        Favorites.objects.filter(favorites_user_id=user_id).values_list('favorites_product_id', flat=True)
+    )
+
+
+def _favorites_version(user_id: int) -> int:
+    key = _FAVORITES_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Метка времени: после вытеснения ключа версия не повторится
+        cache.add(key, int(time.time() * 1000), FAVORITES_CACHE_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def _refresh_favorite_set(user_id: int) -> None:
     """
-    Возвращает множество ID товаров, добавленных в избранное.
-    Если передан список product_ids, фильтрует по нему.
+    После фиксации транзакции увеличивает версию избранного и записывает
+    под ней актуальный набор из БД: в кеше не окажется неподтвержденных
+    изменений, а устаревший набор параллельного читателя останется под
+    прежней версией.
     """
-    try:
-        qs = Favorites.objects.filter(favorites_user=user_model)
-        if product_ids is not None:
-            qs = qs.filter(favorites_product_id__in=list(product_ids))
-        return set(qs.values_list('favorites_product_id', flat=True))
-    except (ProgrammingError, OperationalError):
-        # Таблица отсутствует — создаем и возвращаем пустой набор
-        ensure_favorites_table()
-        return set()
+    def refresh():
+        try:
+            version = cache.incr(_FAVORITES_VERSION_KEY.format(user_id))
+        except ValueError:
+            # Версии нет — следующее чтение начнет новую и загрузит набор из БД
+            return
+        cache.set(_FAVORITES_CACHE_KEY.format(user_id, version), _load_favorite_set(user_id),
+                  FAVORITES_CACHE_TIMEOUT)
+
+    transaction.on_commit(refresh)
 
 
-def ensure_usercards_table() -> None:
+def get_favorite_set(user_id: int) -> frozenset:
     """
-    Создает таблицу usercards, если она отсутствует.
-    Нужна для проектов с существующей БД (managed = False).
+    Все ID товаров в избранном пользователя. Набор хранится в кеше и
+    загружается одним запросом при промахе; register_favorite и
+    remove_favorite обновляют его сразу после записи.
     """
-    with connection.cursor() as cursor:
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS usercards (
-                usercards_id SERIAL PRIMARY KEY,
-                usercards_user_id INTEGER NOT NULL REFERENCES users (users_id) ON DELETE CASCADE,
-                usercards_card_number_hash VARCHAR(255) NOT NULL,
-                usercards_card_last_four VARCHAR(4) NOT NULL,
-                usercards_card_expiry_encrypted VARCHAR(255) NOT NULL,
-                usercards_card_cvv_hash VARCHAR(255) NOT NULL,
-                usercards_card_holder_name VARCHAR(100) NOT NULL,
-                usercards_created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
-                usercards_updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
-                usercards_is_default BOOLEAN DEFAULT FALSE
-            );
-            """
-        )
-        cursor.execute(
-            """
-            CREATE INDEX IF NOT EXISTS usercards_user_idx
-            ON usercards (usercards_user_id);
-            """
-        )
+    key = _FAVORITES_CACHE_KEY.format(user_id, _favorites_version(user_id))
+    favorites = cache.get(key)
+    if favorites is None:
+        favorites = _load_favorite_set(user_id)
+        cache.set(key, favorites, FAVORITES_CACHE_TIMEOUT)
+    return favorites
+
+
+def get_user_favorite_ids(user_model, product_ids: Iterable[int] | None = None) -> Set[int]:
+    """
+    Возвращает множество ID товаров, добавленных в избранное.
+    Если передан список product_ids, фильтрует по нему (в памяти, без IN (...)).
+    user_model — профиль Users или его ID.
+    """
+    user_id = getattr(user_model, 'users_id', user_model)
+    if user_id is None:
+        return set()
+    favorites = get_favorite_set(user_id)
+    if product_ids is None:
+        return set(favorites)
+    return set(favorites.intersection(product_ids))
 
 
 def get_encryption_key():
@@ -160,7 +160,7 @@ def save_user_card(user_id: int, card_number: str, card_expiry: str, card_cvv: s
     Сохраняет данные карты пользователя (зашифрованные).
     Возвращает ID сохраненной карты.
     """
-    ensure_usercards_table()
+    ensure_user_tables()
     
     # Очищаем номер карты от пробелов
     card_number = card_number.replace(' ', '')
@@ -227,12 +227,8 @@ def save_user_card(user_id: int, card_number: str, card_expiry: str, card_cvv: s
 
 def get_user_card(user_model):
     """Получает сохраненную карту пользователя"""
-    ensure_usercards_table()
-    try:
-        return Usercards.objects.filter(usercards_user=user_model).first()
-    except (ProgrammingError, OperationalError):
-        ensure_usercards_table()
-        return None
+    ensure_user_tables()
+    return Usercards.objects.filter(usercards_user=user_model).first()
 
 
 def get_user_card_data_for_form(user_model):
@@ -260,7 +256,7 @@ def get_user_card_data_for_form(user_model):
 
 def delete_user_card(user_id: int) -> None:
     """Удаляет карту пользователя"""
-    ensure_usercards_table()
+    ensure_user_tables()
     with connection.cursor() as cursor:
         cursor.execute(
             "DELETE FROM usercards WHERE usercards_user_id = %s",
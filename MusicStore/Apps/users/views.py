@@ -4,9 +4,13 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from .forms import RegistrationForm, ResetBySecretForm, CardForm
-from .utils import save_user_card, get_user_card, ensure_usercards_table, delete_user_card, get_user_card_data_for_form
+from .utils import save_user_card, get_user_card, delete_user_card, get_user_card_data_for_form
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from .models import Users
+from .store_user import require_store_user
+from .credentials import set_account_password
+from .throttling import check_credential_attempt, throttled_response
 
 
 def entry_view(request):
@@ -33,6 +37,10 @@ def register_view(request):
 
 def login_view(request):
     if request.method == 'POST':
+        # Ограничение попыток — до проверки пароля (Apps.users.throttling)
+        retry_after = check_credential_attempt(request, request.POST.get('username'))
+        if retry_after:
+            return throttled_response(request, 'users/login.html', {'form': AuthenticationForm(request)}, retry_after)
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
             user = form.get_user()
@@ -58,18 +66,10 @@ def password_change_view(request):
     if request.method == 'POST':
         form = PasswordChangeForm(request.user, request.POST)
         if form.is_valid():
-            user = form.save()
+            # Один хэш для auth_user и Apps.users.Users (вместо form.save() + make_password)
+            user = set_account_password(request.user, form.cleaned_data['new_password1'])
             update_session_auth_hash(request, user)
             
-            # Обновляем пароль и в таблице Apps.users.Users
-            try:
-                from django.contrib.auth.hashers import make_password
-                app_user = Users.objects.get(users_email=request.user.email)
-                app_user.users_password_hash = make_password(form.cleaned_data['new_password1'])
-                app_user.save()
-            except Users.DoesNotExist:
-                pass
-            
             messages.success(request, 'Ваш пароль был успешно изменен.')
             return redirect('profile')
         else:
@@ -82,31 +82,18 @@ def password_change_view(request):
 def password_reset_by_secret_view(request):
     """Восстановление пароля по секретному слову (не требует авторизации)"""
     if request.method == 'POST':
+        retry_after = check_credential_attempt(request, request.POST.get('email'))
+        if retry_after:
+            return throttled_response(request, 'users/password_reset_secret.html', {'form': ResetBySecretForm()}, retry_after)
         form = ResetBySecretForm(request.POST)
         if form.is_valid():
-            email = form.cleaned_data['email']
-            new_password = form.cleaned_data['new_password1']
-            
-            from django.contrib.auth.hashers import make_password
-            from django.contrib.auth.models import User
-            
             try:
-                # Обновляем пароль в Django User
-                user = User.objects.get(email=email)
-                user.set_password(new_password)
-                user.save()
-                
-                # Обновляем пароль в Apps.users.Users
-                app_user = Users.objects.get(users_email=email)
-                app_user.users_password_hash = make_password(new_password)
-                app_user.save()
-                
+                # Пароль в Django User и Apps.users.Users обновляется одной транзакцией
+                form.save()
                 messages.success(request, 'Ваш пароль успешно обновлен. Теперь вы можете войти с новым паролем.')
                 return redirect('login')
             except User.DoesNotExist:
                 messages.error(request, 'Пользователь с таким email не найден.')
-            except Users.DoesNotExist:
-                messages.error(request, 'Пользователь с таким email не найден.')
             except Exception as e:
                 messages.error(request, f'Ошибка при обновлении пароля: {str(e)}')
     else:
@@ -118,8 +105,7 @@ def password_reset_by_secret_view(request):
 def profile_view(request):
     """Страница профиля пользователя"""
     try:
-        user_model = Users.objects.get(users_email=request.user.email)
-        ensure_usercards_table()
+        user_model = require_store_user(request)
         
         # Получаем сохраненную карту пользователя
         saved_card = get_user_card(user_model)
@@ -57,6 +57,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Apps.users.store_user.StoreUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,6 +99,44 @@ DATABASES = {
     }
 }
 
+# Тестовая база создается по моделям, включая неуправляемые (см. MusicStore.test_runner)
+TEST_RUNNER = 'MusicStore.test_runner.StoreTestRunner'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# По умолчанию кеш локальный для процесса. Для нескольких воркеров задайте
+# REDIS_URL (например, redis://127.0.0.1:6379/1) — тогда штампы версий
+# и кешированные данные станут общими для всех процессов. Без DEBUG
+# локальный кеш — ошибка проверки catalog.E001 (см. Apps.catalog.versions).
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'musicstore',
+            # Стандартных 300 записей не хватает: кеш страниц держит штамп на
+            # каждый тег товара, и вытеснение штампов сбрасывает все страницы
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Ограничение попыток входа и сброса пароля (Apps.users.throttling):
+# (емкость корзины, секунд до полного пополнения) по IP и по email.
+# С общим Redis корзины проверяются и в нем — лимит на все процессы.
+CREDENTIAL_THROTTLE_RATES = {
+    'ip': (20, 60),
+    'email': (5, 300),
+}
+CREDENTIAL_THROTTLE_CACHE = 'default' if REDIS_URL else None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -124,6 +163,9 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 # Media (uploaded files)
+# Загрузки хранятся по хешу содержимого в MEDIA_ROOT/cas/ (Apps.catalog.storage).
+# Веб-сервер должен отдавать MEDIA_URL + 'cas/' с заголовком
+# Cache-Control: public, max-age=31536000, immutable
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
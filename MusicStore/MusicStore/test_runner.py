@@ -0,0 +1,61 @@
+"""
+Запуск тестов на базе с таблицами магазина.
+
+Основные таблицы магазина (products, users, carts, ...) описаны
+неуправляемыми моделями (managed = False) и существуют в базе до миграций;
+миграции только дополняют их (столбцы, индексы, производные таблицы).
+В тестовой базе таких таблиц нет, поэтому перед миграциями они создаются
+по состоянию начальных миграций, в котором их описывает inspectdb.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.models.signals import pre_migrate
+from django.test.runner import DiscoverRunner
+
+
+def create_store_tables(using='default', **kwargs):
+    """
+    Создает недостающие основные таблицы магазина — таблицы неуправляемых
+    моделей из начальных миграций (0001_initial) приложений Apps — по
+    текущим моделям. Таблицы, которые создают последующие миграции,
+    остаются им.
+    """
+    connection = connections[using]
+    loader = MigrationLoader(connection, ignore_no_migrations=True)
+    app_labels = {config.label for config in apps.get_app_configs() if config.name.startswith('Apps.')}
+    nodes = [(label, '0001_initial') for label in app_labels if (label, '0001_initial') in loader.graph.nodes]
+    initial = loader.project_state(nodes, at_end=True)
+    base_tables = {
+        model_state.options['db_table']
+        for (app_label, _), model_state in initial.models.items()
+        if app_label in app_labels and not model_state.options.get('managed', True)
+    }
+    existing = set(connection.introspection.table_names())
+    models = [
+        model for model in apps.get_models()
+        if model._meta.db_table in base_tables - existing
+    ]
+    if not models:
+        return
+    # Внешние ключи schema_editor добавляет в конце, поэтому порядок моделей не важен
+    with connection.schema_editor() as editor:
+        for model in models:
+            editor.create_model(model)
+
+
+class StoreTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Тесты идут в одном процессе: локальный кеш для них достаточно общий,
+        # хотя DEBUG на время тестов выключен (см. Apps.catalog.versions)
+        settings.SILENCED_SYSTEM_CHECKS = [*settings.SILENCED_SYSTEM_CHECKS, 'catalog.E001']
+
+    def setup_databases(self, **kwargs):
+        pre_migrate.connect(create_store_tables, dispatch_uid='store_test_tables')
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            pre_migrate.disconnect(dispatch_uid='store_test_tables')
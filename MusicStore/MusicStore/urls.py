@@ -15,10 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 # Импортируем настройки админ-панели для применения заголовков
 import main.admin
 from main import views as main_views
+from Apps.catalog import views as catalog_views
 from rest_framework.routers import DefaultRouter
 from Apps.catalog.api import ProductViewSet, CategoryViewSet, BrandViewSet
 from Apps.users.api_viewsets import UsersViewSet, RolesViewSet, UserRolesViewSet, AddressesViewSet
@@ -28,6 +29,8 @@ from Apps.payments.api_viewsets import PaymentMethodsViewSet, DeliveryMethodsVie
 from Apps.extras.api_viewsets import ReviewsViewSet, FeedbackViewSet, AnalyticsViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from Apps.users.api import RegisterAPIView
+from Apps.cart.api import CartAddItemsAPIView
+from Apps.users.throttling import CredentialRateThrottle
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -44,8 +47,9 @@ urlpatterns = [
     path('admin-panel/', include('Apps.admin_panel.urls')),
     # API
     path('api/auth/register/', RegisterAPIView.as_view(), name='api-register'),
-    path('api/auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/auth/token/', TokenObtainPairView.as_view(throttle_classes=[CredentialRateThrottle]), name='token_obtain_pair'),
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/cart/add/', CartAddItemsAPIView.as_view(), name='api-cart-add'),
 ]
 
 # Router for read-only catalog
@@ -75,4 +79,7 @@ urlpatterns += [
 ]
 
 if settings.DEBUG:
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}cas/(?P<path>.*)$', catalog_views.serve_immutable_media),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
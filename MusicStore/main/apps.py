@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        # Подключаем обработчики сигналов каталога (снимок главной страницы)
+        from . import home  # noqa: F401
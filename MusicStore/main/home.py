@@ -0,0 +1,128 @@
+"""
+Снимок главной страницы.
+
+Общая для всех посетителей часть главной (последние товары с изображениями,
+разделы каталога с представительным изображением, бренды) собирается одним
+проходом и хранится в кеше вместе с памятью процесса. Снимок перестраивается
+только после изменения товаров, изображений, категорий или брендов (штамп
+версии VERSION_NAME), а избранное посетителя берется из его набора в кеше
+(Apps.users.utils.get_user_favorite_ids).
+"""
+import threading
+
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from Apps.catalog.models import Products, Categories, Brands, Productcards
+from Apps.catalog.signals import categories_changed, brands_changed, products_changed
+from Apps.catalog.versions import get_version, bump_version
+
+VERSION_NAME = 'home'
+LATEST_PRODUCTS_LIMIT = 8
+CATEGORIES_LIMIT = 6
+BRANDS_LIMIT = 6
+# Раздел "Струны" на главной не показываем
+EXCLUDED_CATEGORY_NAMES = ('Струны',)
+# Прежние версии снимка в кеше не нужны — пусть истекают сами
+HOME_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+_CACHE_KEY = 'main:home:{}'
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class HomeSnapshot:
+    """Неизменяемый снимок данных главной страницы (словари для шаблона)."""
+    __slots__ = ('version', 'latest_products', 'categories', 'brands')
+
+    def __init__(self, version, latest_products, categories, brands):
+        self.version = version
+        self.latest_products = latest_products
+        self.categories = categories
+        self.brands = brands
+
+    @property
+    def product_ids(self):
+        return [p['id'] for p in self.latest_products]
+
+
+def _build_snapshot(version):
+    latest_products = [
+        {
+            'id': pid, 'name': name, 'price': price, 'brand_name': brand_name or '',
+            'image_url': image_url or '', 'webp_srcset': webp or '', 'jpeg_srcset': jpeg or '',
+        }
+        for pid, name, price, brand_name, image_url, webp, jpeg in (
+            Products.objects.order_by('-products_id').values_list(
+                'products_id', 'products_name', 'products_price',
+                'card__product_cards_brand_name', 'card__product_cards_image_url',
+                'card__product_cards_image_webp_srcset', 'card__product_cards_image_jpeg_srcset',
+            )[:LATEST_PRODUCTS_LIMIT]
+        )
+    ]
+
+    categories = list(
+        Categories.objects.exclude(categories_name__in=EXCLUDED_CATEGORY_NAMES)
+        .values_list('categories_id', 'categories_name')[:CATEGORIES_LIMIT]
+    )
+    images_by_category = {}
+    if categories:
+        # Первая (по ID) карточка категории с изображением
+        images_by_category = dict(
+            Productcards.objects
+            .filter(product_cards_product__products_category_id__in=[cid for cid, _ in categories],
+                    product_cards_image_url__isnull=False)
+            .exclude(product_cards_image_url='')
+            .order_by('product_cards_product__products_category_id', 'product_cards_product_id')
+            .distinct('product_cards_product__products_category_id')
+            .values_list('product_cards_product__products_category_id', 'product_cards_image_url')
+        )
+
+    brands = [
+        {'id': bid, 'name': name}
+        for bid, name in Brands.objects.values_list('brands_id', 'brands_name')[:BRANDS_LIMIT]
+    ]
+    return HomeSnapshot(
+        version,
+        latest_products,
+        [{'id': cid, 'name': name, 'image_url': images_by_category.get(cid, '')}
+         for cid, name in categories],
+        brands,
+    )
+
+
+def get_home_snapshot():
+    """
+    Актуальный снимок главной. Процесс сначала проверяет свою копию, затем
+    общий кеш и только при смене версии собирает снимок из БД.
+    """
+    global _snapshot
+    version = get_version(VERSION_NAME)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            key = _CACHE_KEY.format(version)
+            data = cache.get(key)
+            if data is None:
+                built = _build_snapshot(version)
+                data = (built.latest_products, built.categories, built.brands)
+                cache.set(key, data, HOME_SNAPSHOT_TIMEOUT)
+            _snapshot = HomeSnapshot(version, *data)
+        return _snapshot
+
+
+def invalidate_home_snapshot():
+    """Сбрасывает снимок во всех процессах (через штамп версии)."""
+    global _snapshot
+    bump_version(VERSION_NAME)
+    _snapshot = None
+
+
+@receiver(products_changed)
+@receiver(brands_changed)
+@receiver(categories_changed)
+def _on_catalog_changed(sender, **kwargs):
+    invalidate_home_snapshot()